@@ -0,0 +1,32 @@
+"""End-to-end benchmarks for the scanner pipeline on synthetic data.
+
+Run ``python -m benchmarks`` from the repository root.  Each stage of the
+pipeline (fetching through :mod:`fake_youtube_api`, parsing, classification,
+storage and Short mapping) is driven by a deterministic
+:class:`~benchmarks.synthetic.SyntheticDataset` at several sizes and reported
+with its throughput, latency percentiles and peak memory.  Results are saved
+as JSON and can be compared against a baseline from an earlier run.
+"""
+
+from .harness import (
+    StageResult,
+    StageTimer,
+    compare,
+    load_report,
+    run_benchmarks,
+    save_report,
+)
+from .stages import STAGES
+from .synthetic import SyntheticDataset, parse_size
+
+__all__ = [
+    "STAGES",
+    "StageResult",
+    "StageTimer",
+    "SyntheticDataset",
+    "compare",
+    "load_report",
+    "parse_size",
+    "run_benchmarks",
+    "save_report",
+]
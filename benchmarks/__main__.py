@@ -0,0 +1,88 @@
+"""Command line entry point: ``python -m benchmarks``."""
+
+import argparse
+import logging
+import sys
+
+from .harness import (
+    DEFAULT_TOLERANCE,
+    compare,
+    load_report,
+    run_benchmarks,
+    save_report,
+)
+from .stages import STAGES
+from .synthetic import parse_size
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the scanner pipeline on synthetic data"
+    )
+    parser.add_argument(
+        "--sizes", default="1k,100k,1M", help="comma separated dataset sizes"
+    )
+    parser.add_argument(
+        "--stages",
+        default=",".join(STAGES),
+        help=f"comma separated subset of {', '.join(STAGES)}",
+    )
+    parser.add_argument(
+        "--output", default="benchmark_results.json", help="where to save the report"
+    )
+    parser.add_argument(
+        "--baseline", help="report of an earlier run to compare against"
+    )
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument(
+        "--no-memory", action="store_true", help="skip tracemalloc peak tracking"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # Per-call logging inside the pipeline would dominate the measurements
+    prefixes = (
+        "youtube_scanner",
+        "src.",
+        "youtube_api",
+        "http_client",
+        "fake_youtube_api",
+    )
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith(prefixes):
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+    unknown = set(args.stages.split(",")) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    stages = {name: STAGES[name] for name in args.stages.split(",")}
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+
+    report = run_benchmarks(stages, sizes, memory=not args.no_memory, seed=args.seed)
+    save_report(report, args.output)
+
+    print(
+        f"{'size':>6} {'stage':<14} {'items/s':>12} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak MiB':>9}"
+    )
+    for size, results in report["results"].items():
+        for name, result in results.items():
+            peak = result["peak_memory"]
+            print(
+                f"{size:>6} {name:<14} {result['throughput']:>12.0f} "
+                f"{result['p50_ms']:>9.3f} {result['p95_ms']:>9.3f} "
+                f"{result['p99_ms']:>9.3f} "
+                f"{peak / 2**20 if peak is not None else float('nan'):>9.1f}"
+            )
+
+    if args.baseline:
+        regressions = compare(report, load_report(args.baseline), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""Timing, memory accounting and baseline comparison for benchmark stages."""
+
+import json
+import logging
+import math
+import platform
+import time
+import tracemalloc
+from array import array
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from .synthetic import SyntheticDataset, format_size
+
+logger = logging.getLogger(__name__)
+
+# Relative change beyond which a metric counts as a regression
+DEFAULT_TOLERANCE = 0.10
+
+Stage = Callable[[SyntheticDataset, "StageTimer"], None]
+
+
+class StageTimer:
+    """Collects the latency of each unit of work a stage performs.
+
+    Latencies are kept in a compact ``array`` so that recording a million
+    samples does not distort the stage's peak memory.
+    """
+
+    def __init__(self) -> None:
+        self.latencies = array("d")
+        self.items = 0
+
+    @contextmanager
+    def measure(self, items: int = 1) -> Iterator[None]:
+        """Time the enclosed block as one unit of work covering ``items``."""
+        start = time.perf_counter()
+        yield
+        self.latencies.append(time.perf_counter() - start)
+        self.items += items
+
+
+def percentile(samples: Iterable[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of ``samples`` (``0`` if empty)."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[max(1, math.ceil(fraction * len(ordered))) - 1]
+
+
+@dataclass
+class StageResult:
+    """Measurements of one stage at one dataset size.
+
+    Attributes:
+        items: Videos (or Shorts, for mapping) processed by the stage.
+        operations: Units of work timed, such as pages or appends.
+        seconds: Time spent inside timed units of work.
+        wall_seconds: Total time including data generation.
+        throughput: Items per second of timed work.
+        p50_ms: Median latency of a unit of work in milliseconds.
+        p95_ms: 95th percentile latency in milliseconds.
+        p99_ms: 99th percentile latency in milliseconds.
+        peak_memory: Peak traced allocation in bytes, ``None`` if not traced.
+    """
+
+    items: int
+    operations: int
+    seconds: float
+    wall_seconds: float
+    throughput: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    peak_memory: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StageResult":
+        return cls(**data)
+
+
+def run_stage(
+    stage: Stage, dataset: SyntheticDataset, memory: bool = True
+) -> StageResult:
+    """Run ``stage`` over ``dataset`` and summarise its measurements.
+
+    Tracing allocations slows Python code down several times over, so when
+    ``memory`` is set the peak is taken from a second, traced pass and the
+    timings always come from an untraced one.
+    """
+    timer = StageTimer()
+    started = time.perf_counter()
+    stage(dataset, timer)
+    wall = time.perf_counter() - started
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            stage(dataset, StageTimer())
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    busy = sum(timer.latencies)
+    return StageResult(
+        items=timer.items,
+        operations=len(timer.latencies),
+        seconds=busy,
+        wall_seconds=wall,
+        throughput=timer.items / busy if busy else 0.0,
+        p50_ms=percentile(timer.latencies, 0.50) * 1000,
+        p95_ms=percentile(timer.latencies, 0.95) * 1000,
+        p99_ms=percentile(timer.latencies, 0.99) * 1000,
+        peak_memory=peak,
+    )
+
+
+def run_benchmarks(
+    stages: Dict[str, Stage],
+    sizes: Iterable[int],
+    memory: bool = True,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Run every stage at every size and return a JSON-serialisable report."""
+    results: Dict[str, Dict[str, Any]] = {}
+    for size in sizes:
+        label = format_size(size)
+        dataset = SyntheticDataset(size, seed=seed)
+        results[label] = {}
+        for name, stage in stages.items():
+            logger.info("Running %s at %s videos", name, label)
+            result = run_stage(stage, dataset, memory=memory)
+            logger.info(
+                "%s at %s: %.0f items/s, p95 %.2f ms",
+                name,
+                label,
+                result.throughput,
+                result.p95_ms,
+            )
+            results[label][name] = result.to_dict()
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "results": results,
+    }
+
+
+def save_report(report: Dict[str, Any], path: Union[str, Path]) -> None:
+    with Path(path).open("w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+
+
+def load_report(path: Union[str, Path]) -> Dict[str, Any]:
+    with Path(path).open("r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> List[str]:
+    """Return a description of every metric that regressed against ``baseline``.
+
+    Throughput regresses when it drops, latency percentiles and peak memory
+    when they grow, by more than ``tolerance`` (a fraction).  Stages or sizes
+    missing from either report are ignored.
+    """
+    regressions = []
+    for size, stages in current["results"].items():
+        for name, result in stages.items():
+            old = baseline.get("results", {}).get(size, {}).get(name)
+            if old is None:
+                continue
+            if old["throughput"] and result["throughput"] < old["throughput"] * (
+                1 - tolerance
+            ):
+                regressions.append(
+                    f"{name}@{size}: throughput {result['throughput']:.0f}/s "
+                    f"vs {old['throughput']:.0f}/s"
+                )
+            for metric in ("p50_ms", "p95_ms", "p99_ms", "peak_memory"):
+                before, after = old.get(metric), result.get(metric)
+                if before and after is not None and after > before * (1 + tolerance):
+                    regressions.append(
+                        f"{name}@{size}: {metric} {after:.4g} vs {before:.4g}"
+                    )
+    return regressions
+
+
+__all__ = [
+    "DEFAULT_TOLERANCE",
+    "StageResult",
+    "StageTimer",
+    "compare",
+    "load_report",
+    "percentile",
+    "run_benchmarks",
+    "run_stage",
+    "save_report",
+]
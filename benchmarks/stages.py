@@ -0,0 +1,281 @@
+"""Benchmark stages covering the scanner pipeline.
+
+Each stage takes a :class:`~benchmarks.synthetic.SyntheticDataset` and a
+:class:`~benchmarks.harness.StageTimer` and times its units of work; data
+generation happens outside the timed blocks.  Stages whose cost grows faster
+than linearly stop after a fixed number of videos so that the 1M dataset
+still completes, and report the number of items they actually processed.
+"""
+
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import fake_youtube_api
+import http_client
+import youtube_api
+from fake_youtube_api import SyntheticChannel
+from youtube_scanner import (
+    channel_fetcher,
+    link_extractor,
+    mapping_cascade,
+    minhash,
+    short_mapper,
+    storage,
+    tfidf,
+    transcript_index,
+    video_classifier,
+)
+
+from .harness import Stage, StageTimer
+from .synthetic import SyntheticDataset
+
+# Videos served through the fake API; every page is a real HTTP round trip
+FETCH_MAX_VIDEOS = 20_000
+# The JSON backend rewrites the whole file on every append
+JSON_STORAGE_MAX_VIDEOS = 5_000
+# Shorts mapped against their channel's long videos
+MAP_MAX_SHORTS = 2_000
+
+
+def fetch(dataset: SyntheticDataset, timer: StageTimer) -> None:
+    """Page uploads and metadata from a local fake API, one page per unit."""
+    channels = list(dataset.channels(FETCH_MAX_VIDEOS))
+    previous_url = http_client.get_base_url()
+    # A bare client for the stage; the caller's client, with its budget and
+    # cache, is restored afterwards
+    client = http_client.HttpClient(conditional=False)
+    with fake_youtube_api.FakeYouTubeAPI(channels) as api, http_client.use_client(
+        client
+    ):
+        http_client.set_base_url(api.base_url)
+        try:
+            for channel in channels:
+                pages = channel_fetcher.iter_channel_videos(
+                    "benchmark", channel.channel_id
+                )
+                while True:
+                    with timer.measure(0):
+                        page = next(pages, None)
+                    if page is None:
+                        timer.latencies.pop()
+                        break
+                    timer.items += len(page)
+        finally:
+            http_client.set_base_url(previous_url)
+
+
+def parse(dataset: SyntheticDataset, timer: StageTimer) -> None:
+    """Turn raw ``videos.list`` items into ``VideoMetadata``, one page per unit."""
+    for channel, positions in dataset.pages():
+        items = [channel.video(position) for position in positions]
+        with timer.measure(len(items)):
+            for item in items:
+                youtube_api._parse_video_item(item)
+
+
+def classify(dataset: SyntheticDataset, timer: StageTimer) -> None:
+    """Classify videos as Shorts by duration, one page per unit."""
+    for channel, positions in dataset.pages():
+        durations = []
+        for p in positions:
+            details = channel.video(p)["contentDetails"]
+            seconds = youtube_api.parse_iso_duration(details["duration"]) or 0
+            durations.append({"duration": seconds})
+        with timer.measure(len(durations)):
+            for info in durations:
+                video_classifier.is_short(info)
+
+
+def extract_links(dataset: SyntheticDataset, timer: StageTimer) -> None:
+    """Pull linked video IDs out of descriptions, one page per unit."""
+    for channel, positions in dataset.pages():
+        videos = [
+            {
+                "id": channel.video_id(p),
+                "description": channel.video(p)["snippet"]["description"],
+            }
+            for p in positions
+        ]
+        with timer.measure(len(videos)):
+            link_extractor.extract_links_bulk(videos)
+
+
+def _store(
+    dataset: SyntheticDataset, timer: StageTimer, suffix: str, limit: int = 0
+) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / f"videos{suffix}"
+        for channel, positions in dataset.pages(limit):
+            records = [
+                youtube_api._parse_video_item(channel.video(p)) for p in positions
+            ]
+            with timer.measure(len(records)):
+                storage.append_video_metadata(records, path)
+        with timer.measure(0):
+            storage.load_video_metadata(path)
+        storage.close_stores()
+
+
+def store_json(dataset: SyntheticDataset, timer: StageTimer) -> None:
+    """Append pages of metadata to a JSON file and load it back once."""
+    _store(dataset, timer, ".json", JSON_STORAGE_MAX_VIDEOS)
+
+
+def store_jsonl(dataset: SyntheticDataset, timer: StageTimer) -> None:
+    """Append pages of metadata to a JSON Lines file and load it back once."""
+    _store(dataset, timer, ".jsonl")
+
+
+def store_sqlite(dataset: SyntheticDataset, timer: StageTimer) -> None:
+    """Append pages of metadata to an SQLite database and load it back once."""
+    _store(dataset, timer, ".db")
+
+
+def _split_channel(
+    channel: SyntheticChannel,
+) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+    """Return the ``(shorts, longs)`` of a channel as mapper input dicts."""
+    longs: List[Dict[str, str]] = []
+    shorts: List[Dict[str, str]] = []
+    for position in range(channel.video_count):
+        video = channel.video(position)
+        entry = {
+            "id": video["id"],
+            "title": video["snippet"]["title"],
+            "description": video["snippet"]["description"],
+        }
+        (shorts if channel.is_short(position) else longs).append(entry)
+    return shorts, longs
+
+
+def map_shorts(dataset: SyntheticDataset, timer: StageTimer) -> None:
+    """Map Shorts to long videos of the same channel, one Short per unit.
+
+    The channel's title index is built once, as one zero-item unit.
+    """
+    mapped = 0
+    for channel in dataset.channels():
+        shorts, longs = _split_channel(channel)
+        with timer.measure(0):
+            index = short_mapper.TitleIndex(longs)
+        for short in shorts:
+            if mapped >= MAP_MAX_SHORTS:
+                return
+            with timer.measure():
+                short_mapper.map_short_to_long(short, longs, index=index)
+            mapped += 1
+
+
+def near_duplicates(dataset: SyntheticDataset, timer: StageTimer) -> None:
+    """Look up similar long-video titles for Shorts through MinHash/LSH."""
+    mapped = 0
+    for channel in dataset.channels():
+        shorts, longs = _split_channel(channel)
+        with timer.measure(0):
+            matcher = minhash.NearDuplicateMatcher(longs)
+        for short in shorts:
+            if mapped >= MAP_MAX_SHORTS:
+                return
+            with timer.measure():
+                matcher.candidates(short)
+            mapped += 1
+
+
+def tfidf_batch(dataset: SyntheticDataset, timer: StageTimer) -> None:
+    """Score all Shorts of a channel against its long videos, one channel per unit."""
+    mapped = 0
+    for channel in dataset.channels():
+        if mapped >= MAP_MAX_SHORTS:
+            return
+        shorts, longs = _split_channel(channel)
+        with timer.measure(len(shorts)):
+            tfidf.rank_tfidf_candidates(shorts, longs)
+        mapped += len(shorts)
+
+
+def cascade(dataset: SyntheticDataset, timer: StageTimer) -> None:
+    """Run the full mapping cascade over a channel's Shorts, one channel per unit.
+
+    Owner comments and transcripts come from the synthetic channel instead
+    of the API; transcripts are generated before timing starts.
+    """
+    mapped = 0
+    for channel in dataset.channels():
+        if mapped >= MAP_MAX_SHORTS:
+            return
+        shorts, longs = _split_channel(channel)
+        positions = {channel.video_id(p): p for p in range(channel.video_count)}
+
+        def fetch_comments(ids: List[str]) -> Dict[str, List[str]]:
+            comments = {}
+            for video_id in ids:
+                threads = channel.comment_threads(positions[video_id], 20)
+                comments[video_id] = [
+                    thread["snippet"]["topLevelComment"]["snippet"]["textOriginal"]
+                    for thread in threads
+                    if thread["snippet"]["topLevelComment"]["snippet"][
+                        "authorChannelId"
+                    ]["value"]
+                    == channel.channel_id
+                ]
+            return comments
+
+        transcripts = {
+            video_id: dataset.transcript(channel, p)
+            for video_id, p in positions.items()
+        }
+        strategies = mapping_cascade.default_strategies(
+            fetch_comments, transcripts.__getitem__
+        )
+        with timer.measure(len(shorts)):
+            mapping_cascade.MappingCascade(strategies).map_channel(shorts, longs)
+        mapped += len(shorts)
+
+
+def transcript_match(dataset: SyntheticDataset, timer: StageTimer) -> None:
+    """Find the source of Shorts by transcript n-grams, one Short per unit.
+
+    Each channel's long-video transcripts are indexed once, as one zero-item
+    unit; generating the transcripts is not timed.
+    """
+    mapped = 0
+    for channel in dataset.channels():
+        if mapped >= MAP_MAX_SHORTS:
+            return
+        positions = range(channel.video_count)
+        longs = {
+            channel.video(p)["id"]: dataset.transcript(channel, p)
+            for p in positions
+            if not channel.is_short(p)
+        }
+        shorts = [
+            dataset.transcript(channel, p) for p in positions if channel.is_short(p)
+        ]
+        with timer.measure(0):
+            index = transcript_index.TranscriptIndex.build(longs, longs.__getitem__)
+        for lines in shorts:
+            if mapped >= MAP_MAX_SHORTS:
+                return
+            with timer.measure():
+                index.query(lines)
+            mapped += 1
+
+
+STAGES: Dict[str, Stage] = {
+    "fetch": fetch,
+    "parse": parse,
+    "classify": classify,
+    "extract_links": extract_links,
+    "store_json": store_json,
+    "store_jsonl": store_jsonl,
+    "store_sqlite": store_sqlite,
+    "map": map_shorts,
+    "near_duplicates": near_duplicates,
+    "tfidf": tfidf_batch,
+    "cascade": cascade,
+    "transcript_match": transcript_match,
+}
+
+
+__all__ = ["STAGES"]
@@ -0,0 +1,120 @@
+"""Deterministic synthetic channels, videos, descriptions and transcripts.
+
+A :class:`SyntheticDataset` of ``size`` videos is split into channels of
+``channel_size`` uploads built on :class:`fake_youtube_api.SyntheticChannel`,
+so the same data can be served over HTTP or consumed directly.  Everything is
+generated lazily from ``(seed, channel, position)`` and nothing is held in
+memory, which keeps a million-video dataset cheap to iterate.
+
+Transcripts of long videos are sequences of caption lines about the video's
+topic; the transcript of a Short is an excerpt of the long video it was cut
+from, mirroring how Shorts are produced in practice.
+"""
+
+import random
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Tuple
+
+from fake_youtube_api import SyntheticChannel
+
+DEFAULT_CHANNEL_SIZE = 1000
+TRANSCRIPT_LINES = (40, 200)
+SHORT_TRANSCRIPT_LINES = 8
+_SIZE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kKmM]?)\s*$")
+_MULTIPLIERS = {"": 1, "k": 1_000, "m": 1_000_000}
+_WORDS = (
+    "so the interesting thing here is that most people never notice how much "
+    "this changes once you look at the numbers and the history behind them and "
+    "that is exactly what we are going to break down step by step today"
+).split()
+
+
+def parse_size(value: str) -> int:
+    """Parse a dataset size such as ``"1k"``, ``"100k"`` or ``"1M"``."""
+    match = _SIZE.match(value)
+    if not match:
+        raise ValueError(f"Invalid dataset size: {value!r}")
+    return int(float(match.group(1)) * _MULTIPLIERS[match.group(2).lower()])
+
+
+def format_size(size: int) -> str:
+    """Inverse of :func:`parse_size` for round sizes."""
+    for suffix, factor in (("M", 1_000_000), ("k", 1_000)):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{suffix}"
+    return str(size)
+
+
+@dataclass
+class SyntheticDataset:
+    """A lazily generated corpus of ``size`` videos.
+
+    Attributes:
+        size: Total number of videos across all channels.
+        channel_size: Uploads per channel; the last channel may be smaller.
+        short_ratio: Fraction of uploads that are Shorts.
+        seed: Seed mixed into every generated attribute.
+    """
+
+    size: int
+    channel_size: int = DEFAULT_CHANNEL_SIZE
+    short_ratio: float = 0.4
+    seed: int = 0
+
+    @property
+    def channel_count(self) -> int:
+        return -(-self.size // self.channel_size)
+
+    def channels(self, limit: int = 0) -> Iterator[SyntheticChannel]:
+        """Yield the dataset's channels, stopping after ``limit`` videos if set."""
+        remaining = min(self.size, limit) if limit else self.size
+        index = 0
+        while remaining > 0:
+            count = min(self.channel_size, remaining)
+            yield SyntheticChannel(
+                index, count, short_ratio=self.short_ratio, seed=self.seed
+            )
+            remaining -= count
+            index += 1
+
+    def pages(
+        self, limit: int = 0, page_size: int = 50
+    ) -> Iterator[Tuple[SyntheticChannel, range]]:
+        """Yield ``(channel, positions)`` pages in uploads playlist order."""
+        for channel in self.channels(limit):
+            for start in range(0, channel.video_count, page_size):
+                yield channel, range(start, min(start + page_size, channel.video_count))
+
+    def video_items(self, limit: int = 0) -> Iterator[Dict]:
+        """Yield raw ``videos.list`` items for every video."""
+        for channel, positions in self.pages(limit):
+            for position in positions:
+                yield channel.video(position)
+
+    def _rng(self, channel: SyntheticChannel, position: int) -> random.Random:
+        return random.Random(
+            (self.seed * 1_000_003 + channel.index) * 10_000_019 + position + 104729
+        )
+
+    def transcript(self, channel: SyntheticChannel, position: int) -> List[str]:
+        """Return the caption lines of the video at ``position``."""
+        if channel.is_short(position):
+            source = channel.source_position(position)
+            if source is not None:
+                lines = self.transcript(channel, source)
+                span = max(1, len(lines) - SHORT_TRANSCRIPT_LINES)
+                start = self._rng(channel, position).randrange(span)
+                return lines[start : start + SHORT_TRANSCRIPT_LINES]
+        rng = self._rng(channel, position)
+        topic = channel.topic(position).lower()
+        lines = []
+        for _ in range(rng.randint(*TRANSCRIPT_LINES)):
+            words = [rng.choice(_WORDS) for _ in range(rng.randint(5, 11))]
+            if rng.random() < 0.3:
+                words.insert(rng.randrange(len(words)), topic)
+            lines.append(" ".join(words))
+        return lines
+
+
+__all__ = ["SyntheticDataset", "format_size", "parse_size"]
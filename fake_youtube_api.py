@@ -0,0 +1,512 @@
+"""Local stand-in for the YouTube Data API used by load tests and benchmarks.
+
+:class:`FakeYouTubeAPI` serves the ``channels``, ``playlistItems``,
+``videos``, ``commentThreads`` and ``search`` endpoints over HTTP from
+deterministic :class:`SyntheticChannel` data.  Videos are generated on demand
+from their position in the uploads playlist, so channels with a million
+uploads cost no memory.  Latency, random server errors and a quota limit that
+triggers ``quotaExceeded`` responses can be injected to exercise concurrency,
+pagination depth, retries and quota handling.
+
+Point the fetchers at the server through the base URL setting::
+
+    with FakeYouTubeAPI([SyntheticChannel(0, 5000)], latency=0.02) as api:
+        http_client.set_base_url(api.base_url)
+        youtube_api.fetch_uploads_playlist_video_ids(api.channels[0].channel_id, "key")
+
+or run it standalone with ``python fake_youtube_api.py --videos 1000`` and set
+``YOUTUBE_API_BASE_URL`` to the printed URL.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from quota import endpoint_cost
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 50
+_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+_TOPICS = [
+    "Black Holes",
+    "Compound Interest",
+    "Quantum Computing",
+    "Ancient Rome",
+    "Sleep",
+    "Inflation",
+    "Volcanoes",
+    "Neural Networks",
+    "The Stock Market",
+    "Mars",
+    "Coffee",
+    "Startups",
+    "Climate Change",
+    "Chess Openings",
+    "The Immune System",
+    "Index Funds",
+    "Dinosaurs",
+    "Nuclear Fusion",
+    "Productivity",
+    "Octopuses",
+]
+_LONG_FORMATS = [
+    "The Truth About {}",
+    "{} Explained",
+    "Everything You Need to Know About {}",
+    "Why {} Matters",
+    "A Deep Dive Into {}",
+    "{}: The Full Story",
+]
+_SHORT_FORMATS = [
+    "{} in 60 Seconds",
+    "{} #shorts",
+    "The Craziest Fact About {}",
+    "{} in 1 Minute",
+]
+_FILLER = (
+    "in this video we look at the history the science and the people behind it "
+    "with interviews charts and a few surprises along the way"
+).split()
+
+
+@dataclass
+class SyntheticChannel:
+    """A deterministic synthetic channel whose uploads are generated on demand.
+
+    Attributes:
+        index: Channel number, encoded into channel and video IDs.
+        video_count: Number of uploads; position ``0`` is the newest.
+        short_ratio: Fraction of uploads that are Shorts.
+        link_ratio: Fraction of Shorts whose description links to the long
+            video they were cut from; the others link from a pinned comment.
+        seed: Seed mixed into every generated attribute.
+    """
+
+    index: int
+    video_count: int
+    short_ratio: float = 0.4
+    link_ratio: float = 0.5
+    seed: int = 0
+
+    @property
+    def channel_id(self) -> str:
+        return f"UCfake{self.index:018d}"
+
+    @property
+    def uploads_playlist_id(self) -> str:
+        return "UU" + self.channel_id[2:]
+
+    @property
+    def title(self) -> str:
+        return f"Synthetic Channel {self.index}"
+
+    # ------------------------------------------------------------------
+    # Video generation
+    # ------------------------------------------------------------------
+    def video_id(self, position: int) -> str:
+        return f"{self.index:04d}{position:07d}"
+
+    def _rng(self, position: int) -> random.Random:
+        return random.Random(
+            (self.seed * 1_000_003 + self.index) * 10_000_019 + position
+        )
+
+    def is_short(self, position: int) -> bool:
+        return (position * 2654435761 + self.index) % 1000 < self.short_ratio * 1000
+
+    def source_position(self, position: int) -> Optional[int]:
+        """Return the position of the long video a Short was cut from."""
+        for candidate in range(position + 1, self.video_count):
+            if not self.is_short(candidate):
+                return candidate
+        return None
+
+    def topic(self, position: int) -> str:
+        return _TOPICS[self._rng(position).randrange(len(_TOPICS))]
+
+    def published_at(self, position: int) -> datetime:
+        return _EPOCH - timedelta(hours=position * 7)
+
+    def video(self, position: int) -> Dict[str, Any]:
+        """Return the ``videos.list`` item for the upload at ``position``."""
+        rng = self._rng(position)
+        vid = self.video_id(position)
+        if self.is_short(position):
+            source = self.source_position(position)
+            topic = self.topic(source) if source is not None else self.topic(position)
+            title = rng.choice(_SHORT_FORMATS).format(topic)
+            duration = f"PT{rng.randint(15, 59)}S"
+            views = int(10 ** rng.uniform(2, 6.5))
+            description = "#shorts"
+            if source is not None and self.links_in_description(position):
+                description = (
+                    f"Full video: https://youtu.be/{self.video_id(source)} #shorts"
+                )
+        else:
+            topic = self.topic(position)
+            title = rng.choice(_LONG_FORMATS).format(topic)
+            minutes = rng.randint(2, 120)
+            duration = f"PT{minutes // 60}H{minutes % 60}M{rng.randint(0, 59)}S"
+            views = int(10 ** rng.uniform(3, 6))
+            description = " ".join(rng.choice(_FILLER) for _ in range(40))
+        return {
+            "kind": "youtube#video",
+            "id": vid,
+            "snippet": {
+                "publishedAt": self.published_at(position).strftime(
+                    "%Y-%m-%dT%H:%M:%SZ"
+                ),
+                "channelId": self.channel_id,
+                "channelTitle": self.title,
+                "title": title,
+                "description": description,
+            },
+            "contentDetails": {"duration": duration},
+            "statistics": {
+                "viewCount": str(views),
+                "likeCount": str(views // 40),
+                "commentCount": str(views // 400),
+            },
+        }
+
+    def links_in_description(self, position: int) -> bool:
+        return self._rng(position + 7919).random() < self.link_ratio
+
+    def comment_threads(self, position: int, limit: int) -> List[Dict[str, Any]]:
+        """Return comment threads for a video; Shorts get an owner comment."""
+        vid = self.video_id(position)
+        threads: List[Tuple[str, str]] = []
+        source = self.source_position(position) if self.is_short(position) else None
+        if source is not None and not self.links_in_description(position):
+            link = f"https://www.youtube.com/watch?v={self.video_id(source)}"
+            threads.append((self.channel_id, f"Watch the full video here: {link}"))
+        threads.append(("UCviewer00000000000000001", "Great video!"))
+        threads.append(("UCviewer00000000000000002", "Where is this from?"))
+        return [
+            {
+                "kind": "youtube#commentThread",
+                "id": f"{vid}-c{number}",
+                "snippet": {
+                    "channelId": self.channel_id,
+                    "videoId": vid,
+                    "topLevelComment": {
+                        "snippet": {
+                            "authorChannelId": {"value": author},
+                            "textOriginal": text,
+                            "textDisplay": text,
+                        }
+                    },
+                },
+            }
+            for number, (author, text) in enumerate(threads[:limit])
+        ]
+
+
+class FakeYouTubeAPI:
+    """Threaded HTTP server imitating the YouTube Data API.
+
+    Args:
+        channels: Synthetic channels to serve.
+        latency: Seconds to sleep before answering each request.
+        error_rate: Probability of answering with a ``500 backendError``.
+        quota_limit: Units after which requests fail with ``quotaExceeded``.
+        host: Interface to bind to.
+        port: Port to bind to; ``0`` picks a free one.
+        seed: Seed for the error injection.
+    """
+
+    def __init__(
+        self,
+        channels: Iterable[SyntheticChannel],
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        quota_limit: Optional[int] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int = 0,
+    ) -> None:
+        self.channels = list(channels)
+        self.host = host
+        self.latency = latency
+        self.error_rate = error_rate
+        self.quota_limit = quota_limit
+        self.units_used = 0
+        self.requests: Counter = Counter()
+        self._by_channel = {channel.channel_id: channel for channel in self.channels}
+        self._by_playlist = {
+            channel.uploads_playlist_id: channel for channel in self.channels
+        }
+        self._by_index = {channel.index: channel for channel in self.channels}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self._server.server_port}/youtube/v3"
+
+    def start(self) -> "FakeYouTubeAPI":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info("Fake YouTube API listening on %s", self.base_url)
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeYouTubeAPI":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # Request handling
+    # ------------------------------------------------------------------
+    def _locate(self, video_id: str) -> Optional[Tuple[SyntheticChannel, int]]:
+        if len(video_id) != 11 or not video_id.isdigit():
+            return None
+        channel = self._by_index.get(int(video_id[:4]))
+        position = int(video_id[4:])
+        if channel is None or position >= channel.video_count:
+            return None
+        return channel, position
+
+    def handle(
+        self, endpoint: str, params: Dict[str, str]
+    ) -> Tuple[int, Dict[str, Any]]:
+        """Return the status code and JSON payload for a request."""
+        with self._lock:
+            self.requests[endpoint] += 1
+            cost = endpoint_cost(endpoint)
+            if (
+                self.quota_limit is not None
+                and self.units_used + cost > self.quota_limit
+            ):
+                return 403, _error(
+                    403,
+                    "quotaExceeded",
+                    "The request cannot be completed because you have exceeded "
+                    "your quota.",
+                )
+            self.units_used += cost
+            failed = self.error_rate and self._random.random() < self.error_rate
+        if failed:
+            return 500, _error(500, "backendError", "Backend Error")
+
+        handler = getattr(self, f"_{endpoint}", None)
+        if handler is None:
+            return 404, _error(404, "notFound", f"Unknown endpoint {endpoint}")
+        try:
+            return 200, handler(params)
+        except _BadRequest as exc:
+            return 400, _error(400, exc.reason, str(exc))
+
+    def _channels(self, params: Dict[str, str]) -> Dict[str, Any]:
+        items = []
+        for channel_id in params.get("id", "").split(","):
+            channel = self._by_channel.get(channel_id)
+            if channel is not None:
+                items.append(
+                    {
+                        "kind": "youtube#channel",
+                        "id": channel.channel_id,
+                        "snippet": {"title": channel.title},
+                        "contentDetails": {
+                            "relatedPlaylists": {"uploads": channel.uploads_playlist_id}
+                        },
+                        "statistics": {"videoCount": str(channel.video_count)},
+                    }
+                )
+        return {"kind": "youtube#channelListResponse", "items": items}
+
+    def _playlistItems(self, params: Dict[str, str]) -> Dict[str, Any]:
+        channel = self._by_playlist.get(params.get("playlistId", ""))
+        if channel is None:
+            return {"kind": "youtube#playlistItemListResponse", "items": []}
+        page_size = min(_int_param(params, "maxResults", 5), PAGE_SIZE)
+        start = _int_param(params, "pageToken", 0, reason="invalidPageToken")
+        end = min(start + page_size, channel.video_count)
+        items = [
+            {
+                "kind": "youtube#playlistItem",
+                "contentDetails": {
+                    "videoId": channel.video_id(position),
+                    "videoPublishedAt": channel.published_at(position).strftime(
+                        "%Y-%m-%dT%H:%M:%SZ"
+                    ),
+                },
+            }
+            for position in range(start, end)
+        ]
+        response: Dict[str, Any] = {
+            "kind": "youtube#playlistItemListResponse",
+            "items": items,
+            "pageInfo": {
+                "totalResults": channel.video_count,
+                "resultsPerPage": page_size,
+            },
+        }
+        if end < channel.video_count:
+            response["nextPageToken"] = str(end)
+        return response
+
+    def _videos(self, params: Dict[str, str]) -> Dict[str, Any]:
+        items = []
+        for video_id in params.get("id", "").split(",")[:PAGE_SIZE]:
+            located = self._locate(video_id)
+            if located is not None:
+                channel, position = located
+                items.append(channel.video(position))
+        return {"kind": "youtube#videoListResponse", "items": items}
+
+    def _commentThreads(self, params: Dict[str, str]) -> Dict[str, Any]:
+        located = self._locate(params.get("videoId", ""))
+        limit = min(_int_param(params, "maxResults", 20), 100)
+        items = located[0].comment_threads(located[1], limit) if located else []
+        return {"kind": "youtube#commentThreadListResponse", "items": items}
+
+    def _search(self, params: Dict[str, str]) -> Dict[str, Any]:
+        channel = self._by_channel.get(params.get("channelId", ""))
+        query = params.get("q", "").lower()
+        limit = min(_int_param(params, "maxResults", 5), PAGE_SIZE)
+        items = []
+        if channel is not None:
+            for position in range(channel.video_count):
+                video = channel.video(position)
+                if query in video["snippet"]["title"].lower():
+                    items.append(
+                        {
+                            "kind": "youtube#searchResult",
+                            "id": {"kind": "youtube#video", "videoId": video["id"]},
+                            "snippet": video["snippet"],
+                        }
+                    )
+                    if len(items) >= limit:
+                        break
+        return {"kind": "youtube#searchListResponse", "items": items}
+
+
+class _BadRequest(ValueError):
+    """A request parameter the Data API would reject with ``400``."""
+
+    def __init__(self, reason: str, message: str) -> None:
+        super().__init__(message)
+        self.reason = reason
+
+
+def _int_param(
+    params: Dict[str, str], name: str, default: int, reason: str = "invalidParameter"
+) -> int:
+    """Return the non-negative integer query parameter ``name``."""
+    value = params.get(name) or str(default)
+    try:
+        number = int(value)
+    except ValueError:
+        number = -1
+    if number < 0:
+        raise _BadRequest(reason, f"Invalid value '{value}' for parameter {name}")
+    return number
+
+
+def _error(code: int, reason: str, message: str) -> Dict[str, Any]:
+    return {
+        "error": {
+            "code": code,
+            "message": message,
+            "errors": [{"reason": reason, "message": message}],
+        }
+    }
+
+
+def _make_handler(api: FakeYouTubeAPI) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are written separately; avoid delayed-ACK stalls
+        disable_nagle_algorithm = True
+
+        def do_GET(self) -> None:  # noqa: N802 - http.server naming
+            parsed = urlparse(self.path)
+            endpoint = parsed.path.rstrip("/").rsplit("/", 1)[-1]
+            params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+            if api.latency:
+                time.sleep(api.latency)
+            status, payload = api.handle(endpoint, params)
+            body = json.dumps(payload).encode("utf-8")
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            if status == 200 and self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=UTF-8")
+            self.send_header("Content-Length", str(len(body)))
+            if status == 200:
+                self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            logger.debug("%s - %s", self.address_string(), format % args)
+
+    return Handler
+
+
+def main() -> None:  # pragma: no cover - manual execution only
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--channels", type=int, default=3, help="number of synthetic channels"
+    )
+    parser.add_argument("--videos", type=int, default=1000, help="uploads per channel")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds per request"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--quota", type=int, default=None, help="units before quotaExceeded"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    channels = [SyntheticChannel(index, args.videos) for index in range(args.channels)]
+    api = FakeYouTubeAPI(
+        channels,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        quota_limit=args.quota,
+        port=args.port,
+    ).start()
+    print(f"YOUTUBE_API_BASE_URL={api.base_url}")
+    for channel in channels:
+        print(f"{channel.channel_id}\t{channel.video_count} videos")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        api.stop()
+
+
+__all__ = ["FakeYouTubeAPI", "SyntheticChannel"]
+
+
+if __name__ == "__main__":  # pragma: no cover - manual execution only
+    main()
@@ -0,0 +1,344 @@
+"""Shared HTTP client for YouTube Data API calls.
+
+Every API caller goes through a single :class:`HttpClient` so that TLS
+connections are pooled and kept alive between requests instead of being
+re-established for every page.  Use :func:`get_client` to obtain the shared
+instance and :func:`configure` to replace it with different settings.
+
+When the client carries a :class:`quota.QuotaBudget`, each request is charged
+to it before being sent, and a ``quotaExceeded`` response marks the budget as
+exhausted so that later calls fail fast.
+
+Responses carrying an ``ETag`` are remembered in an :class:`ETagStore`.  The
+next identical request is sent with ``If-None-Match`` and a ``304 Not
+Modified`` answer is replayed from the stored body, so callers always see a
+regular ``200`` response.
+
+Requests are addressed relative to a configurable base URL (see
+:func:`api_url`), so every fetcher can be pointed at a local stand-in such as
+:mod:`fake_youtube_api` through ``YOUTUBE_API_BASE_URL`` or
+:func:`set_base_url`.
+
+An optional :class:`response_cache.ResponseCache` adds a persistent layer
+underneath: fresh entries are served without a request (and without quota),
+stale entries are revalidated with their ETag, and in offline mode misses
+raise :class:`response_cache.CacheMiss` instead of reaching the network.
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from quota import QuotaBudget
+from response_cache import CacheMiss, ResponseCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = 10
+DEFAULT_BASE_URL = "https://www.googleapis.com/youtube/v3"
+DEFAULT_ETAG_ENTRIES = 2048
+# Query parameters that do not identify the requested resource
+_UNKEYED_PARAMS = {"key"}
+
+
+_base_url = os.environ.get("YOUTUBE_API_BASE_URL", DEFAULT_BASE_URL).rstrip("/")
+
+
+def set_base_url(url: Optional[str]) -> None:
+    """Point all API calls at ``url``; ``None`` restores the default."""
+    global _base_url
+    _base_url = (url or DEFAULT_BASE_URL).rstrip("/")
+    logger.info("Using YouTube API base URL %s", _base_url)
+
+
+def get_base_url() -> str:
+    return _base_url
+
+
+def api_url(endpoint: str) -> str:
+    """Return the URL of a Data API ``endpoint`` such as ``videos``."""
+    return f"{_base_url}/{endpoint}"
+
+
+def error_reason(response: requests.Response) -> Optional[str]:
+    """Return the ``reason`` of the first error in an API error payload."""
+    try:
+        return response.json()["error"]["errors"][0].get("reason")
+    except Exception:  # pragma: no cover - malformed error payload
+        return None
+
+
+def is_quota_exceeded(response: requests.Response) -> bool:
+    """Return ``True`` if the API rejected the call because of the quota."""
+    return response.status_code == 403 and error_reason(response) == "quotaExceeded"
+
+
+def endpoint_name(url: str) -> str:
+    """Return the Data API endpoint (``videos``, ``search`` ...) of ``url``."""
+    return url.rstrip("/").rsplit("/", 1)[-1]
+
+
+def request_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """Return a stable cache key for a GET request, ignoring the API key."""
+    items = sorted(
+        (name, str(value))
+        for name, value in (params or {}).items()
+        if name not in _UNKEYED_PARAMS
+    )
+    return f"{url}?{urlencode(items)}" if items else url
+
+
+def replay_response(
+    body: bytes, url: str, template: Optional[requests.Response] = None
+) -> requests.Response:
+    """Build a ``200`` response for ``url`` whose body is ``body``.
+
+    Headers and the originating request are copied from ``template``, such as
+    the ``304`` answer being replayed, when one is given.
+    """
+    replayed = requests.Response()
+    replayed.status_code = 200
+    replayed._content = body
+    replayed.encoding = "utf-8"
+    replayed.url = url
+    replayed.reason = "OK"
+    if template is not None:
+        replayed.headers = template.headers
+        replayed.request = template.request
+    return replayed
+
+
+class ETagStore:
+    """Thread-safe LRU store of ETags and bodies keyed by request.
+
+    Args:
+        max_entries: Number of responses kept before the least recently
+            used one is evicted.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_ETAG_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        """Return the ``(etag, body)`` stored for ``key``, if any."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, etag: str, body: bytes) -> None:
+        with self._lock:
+            self._entries[key] = (etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the number of stored responses."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class HttpClient:
+    """Connection-pooling wrapper around :class:`requests.Session`.
+
+    Args:
+        pool_size: Maximum number of connections kept alive per host.
+        gzip: Ask the server for gzip-compressed responses.
+        timeout: Default timeout in seconds for each request.
+        budget: Optional quota budget every request is charged to.
+        conditional: Send conditional requests using remembered ETags.
+        etag_store: Store to remember ETags in; a new one is created if
+            omitted and ``conditional`` is enabled.
+        cache: Optional persistent response cache.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        gzip: bool = True,
+        timeout: float = DEFAULT_TIMEOUT,
+        budget: Optional[QuotaBudget] = None,
+        conditional: bool = True,
+        etag_store: Optional[ETagStore] = None,
+        cache: Optional[ResponseCache] = None,
+    ) -> None:
+        self.pool_size = pool_size
+        self.gzip = gzip
+        self.timeout = timeout
+        self.budget = budget
+        self.etag_store = (etag_store or ETagStore()) if conditional else None
+        self.cache = cache
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Connection"] = "keep-alive"
+        if gzip:
+            # Google APIs only compress responses when the user agent mentions gzip
+            self.session.headers["Accept-Encoding"] = "gzip"
+            self.session.headers["User-Agent"] = "youtube-scanner (gzip)"
+        else:
+            self.session.headers["Accept-Encoding"] = "identity"
+
+    def get(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> requests.Response:
+        """Issue a GET request over the pooled session.
+
+        Raises :class:`quota.QuotaExhausted` if the budget cannot cover the
+        call, and :class:`response_cache.CacheMiss` for uncached requests in
+        offline mode.
+        """
+        key = request_key(url, params)
+        endpoint = endpoint_name(url)
+        stale = None
+        if self.cache is not None:
+            stale = self.cache.get(key)
+            if stale is not None and (self.cache.offline or self.cache.is_fresh(stale)):
+                logger.debug("Serving %s from response cache", url)
+                return replay_response(stale.body, url)
+            if self.cache.offline:
+                raise CacheMiss(f"{key} is not cached and the client is offline")
+
+        if self.budget is not None:
+            self.budget.charge(endpoint)
+        cached = self.etag_store.get(key) if self.etag_store is not None else None
+        if cached is None and stale is not None and stale.etag:
+            cached = (stale.etag, stale.body)
+        kwargs: Dict[str, Any] = {"params": params, "timeout": timeout or self.timeout}
+        if cached is not None:
+            kwargs["headers"] = {"If-None-Match": cached[0]}
+        response = self.session.get(url, **kwargs)
+        if self.budget is not None and is_quota_exceeded(response):
+            self.budget.mark_exhausted()
+
+        if cached is not None and response.status_code == 304:
+            if self.etag_store is not None:
+                self.etag_store.record(hit=True)
+            if self.cache is not None:
+                self.cache.put(key, endpoint, cached[1], cached[0])
+            logger.debug("Serving %s from ETag cache", url)
+            return replay_response(cached[1], url, template=response)
+        if response.status_code == 200:
+            etag = response.headers.get("ETag")
+            etag = etag if isinstance(etag, str) and etag else None
+            if self.etag_store is not None:
+                self.etag_store.record(hit=False)
+                if etag:
+                    self.etag_store.put(key, etag, response.content)
+            if self.cache is not None:
+                self.cache.put(key, endpoint, response.content, etag)
+        return response
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self.session.close()
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """Return the shared :class:`HttpClient`, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def configure(
+    pool_size: int = DEFAULT_POOL_SIZE,
+    gzip: bool = True,
+    timeout: float = DEFAULT_TIMEOUT,
+    budget: Optional[QuotaBudget] = None,
+    conditional: bool = True,
+    etag_store: Optional[ETagStore] = None,
+    cache: Optional[ResponseCache] = None,
+) -> HttpClient:
+    """Replace the shared client with one using the given settings."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = HttpClient(
+            pool_size=pool_size,
+            gzip=gzip,
+            timeout=timeout,
+            budget=budget,
+            conditional=conditional,
+            etag_store=etag_store,
+            cache=cache,
+        )
+        logger.info(
+            "Configured HTTP client with pool size %d (gzip=%s)", pool_size, gzip
+        )
+        return _client
+
+
+@contextmanager
+def use_client(client: HttpClient) -> Iterator[HttpClient]:
+    """Share ``client`` inside the block, then restore the previous client.
+
+    The previous client is put back as it was, with its budget, cache and
+    pooled connections; ``client`` is closed on exit.
+    """
+    global _client
+    with _client_lock:
+        previous, _client = _client, client
+    try:
+        yield client
+    finally:
+        with _client_lock:
+            _client = previous
+        client.close()
+
+
+__all__ = [
+    "ETagStore",
+    "HttpClient",
+    "api_url",
+    "configure",
+    "endpoint_name",
+    "error_reason",
+    "get_base_url",
+    "get_client",
+    "is_quota_exceeded",
+    "replay_response",
+    "request_key",
+    "set_base_url",
+    "use_client",
+]
@@ -0,0 +1,387 @@
+"""Quota accounting and throttling for YouTube Data API calls.
+
+Every Data API request costs a fixed number of quota units depending on the
+endpoint (``search.list`` costs 100, most ``list`` calls cost 1) and each
+project has a daily allowance that resets at midnight Pacific time.
+:class:`QuotaBudget` charges calls against that allowance, records the units
+spent per endpoint and per channel, and plans scans up front so that the most
+valuable work runs first while low-priority work is deferred.
+
+The channel a call is charged to is taken from :data:`current_channel`, which
+callers set with :func:`charging_channel` (or ``current_channel.set``) before
+issuing requests.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import pytz
+
+logger = logging.getLogger(__name__)
+
+# Quota cost of a single call to each Data API endpoint
+ENDPOINT_COSTS: Dict[str, int] = {
+    "activities": 1,
+    "captions": 50,
+    "channels": 1,
+    "commentThreads": 1,
+    "comments": 1,
+    "playlistItems": 1,
+    "playlists": 1,
+    "search": 100,
+    "videos": 1,
+}
+# Default daily allowance of a Google Cloud project
+DEFAULT_DAILY_BUDGET = 10_000
+
+# Task priorities used when planning a scan; lower values run first
+PRIORITY_TOP_SHORTS = 0
+PRIORITY_UPLOADS = 10
+PRIORITY_METADATA = 20
+PRIORITY_MAPPING = 30
+
+# Channel that API calls made in the current context are charged to
+current_channel: ContextVar[Optional[str]] = ContextVar("current_channel", default=None)
+
+_PACIFIC = pytz.timezone("America/Los_Angeles")
+
+
+class QuotaExhausted(RuntimeError):
+    """Raised when a call cannot be made within the remaining quota."""
+
+
+def endpoint_cost(endpoint: str) -> int:
+    """Return the quota cost of one call to ``endpoint``."""
+    return ENDPOINT_COSTS.get(endpoint, 1)
+
+
+def seconds_until_reset(now: Optional[datetime] = None) -> float:
+    """Return the seconds until the daily quota resets at midnight Pacific time."""
+    now = (now or datetime.now(_PACIFIC)).astimezone(_PACIFIC)
+    tomorrow = (now + timedelta(days=1)).date()
+    midnight = _PACIFIC.localize(datetime(tomorrow.year, tomorrow.month, tomorrow.day))
+    return max((midnight - now).total_seconds(), 0.0)
+
+
+@contextmanager
+def charging_channel(channel_id: Optional[str]) -> Iterator[None]:
+    """Charge API calls made inside the ``with`` block to ``channel_id``."""
+    token = current_channel.set(channel_id)
+    try:
+        yield
+    finally:
+        current_channel.reset(token)
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    Args:
+        capacity: Maximum number of tokens the bucket holds.
+        refill_rate: Tokens added per second.
+        clock: Monotonic time source, injectable for tests.
+        sleep: Sleep function, injectable for tests.
+    """
+
+    def __init__(
+        self,
+        capacity: float,
+        refill_rate: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.refill_rate)
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def try_acquire(self, amount: float = 1) -> bool:
+        """Take ``amount`` tokens if available without waiting."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return True
+            return False
+
+    def acquire(self, amount: float = 1, timeout: Optional[float] = None) -> bool:
+        """Wait until ``amount`` tokens are available and take them.
+
+        Returns ``False`` if they cannot be obtained within ``timeout`` seconds.
+        """
+        if amount > self.capacity:
+            return False
+        deadline = None if timeout is None else self._clock() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return True
+                wait = (
+                    (amount - self._tokens) / self.refill_rate
+                    if self.refill_rate
+                    else float("inf")
+                )
+            if deadline is not None:
+                remaining = deadline - self._clock()
+                if remaining <= 0 or wait > remaining:
+                    return False
+            self._sleep(wait)
+
+    def drain(self) -> None:
+        """Remove all tokens from the bucket."""
+        with self._lock:
+            self._refill()
+            self._tokens = 0.0
+
+
+@dataclass
+class ScanTask:
+    """A unit of planned API work.
+
+    Attributes:
+        name: Human readable description used in logs.
+        endpoint: Data API endpoint the task calls.
+        priority: Lower values are scheduled first.
+        calls: Number of calls the task is expected to make.
+        channel_id: Channel the work belongs to.
+    """
+
+    name: str
+    endpoint: str
+    priority: int = PRIORITY_METADATA
+    calls: int = 1
+    channel_id: Optional[str] = None
+
+    @property
+    def cost(self) -> int:
+        return self.calls * endpoint_cost(self.endpoint)
+
+
+@dataclass
+class ScanPlan:
+    """Tasks that fit into the available quota and those deferred."""
+
+    scheduled: List[ScanTask] = field(default_factory=list)
+    deferred: List[ScanTask] = field(default_factory=list)
+
+    @property
+    def units(self) -> int:
+        return sum(task.cost for task in self.scheduled)
+
+
+class QuotaBudget:
+    """Charge API calls against a daily quota allowance.
+
+    Like the Data API quota, the ``daily_budget`` units are refilled in full
+    at midnight Pacific time rather than trickling back during the day, so
+    units spent early are gone until the reset.  A call that does not fit
+    waits for the reset if it is at most ``max_wait`` seconds away (``None``
+    waits for it whenever it comes) and raises :class:`QuotaExhausted`
+    otherwise.  Once the API itself reports ``quotaExceeded``,
+    :meth:`mark_exhausted` makes every further call fail fast until the
+    quota resets.
+
+    Args:
+        daily_budget: Units available per Pacific day.
+        max_wait: Seconds a call may wait for the daily reset.
+        clock: Monotonic time source, injectable for tests.
+        sleep: Sleep function, injectable for tests.
+        now: Returns the current aware datetime, injectable for tests.
+    """
+
+    def __init__(
+        self,
+        daily_budget: int = DEFAULT_DAILY_BUDGET,
+        max_wait: Optional[float] = 0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        now: Optional[Callable[[], datetime]] = None,
+    ) -> None:
+        self.daily_budget = daily_budget
+        self.max_wait = max_wait
+        self._clock = clock
+        self._sleep = sleep
+        self._now = now or (lambda: datetime.now(_PACIFIC))
+        self._day = self._today()
+        self._available = daily_budget
+        self._spent_by_endpoint: Dict[str, int] = {}
+        self._spent_by_channel: Dict[str, int] = {}
+        self._exhausted_until: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _today(self) -> date:
+        return self._now().astimezone(_PACIFIC).date()
+
+    def _roll_over(self) -> None:
+        """Refill the allowance once the Pacific day has changed; needs the lock."""
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self._available = self.daily_budget
+            self._exhausted_until = None
+
+    def _is_exhausted(self) -> bool:
+        return (
+            self._exhausted_until is not None and self._clock() < self._exhausted_until
+        )
+
+    # ------------------------------------------------------------------
+    # Charging
+    # ------------------------------------------------------------------
+    def charge(
+        self,
+        endpoint: str,
+        channel_id: Optional[str] = None,
+        units: Optional[int] = None,
+    ) -> int:
+        """Take the cost of one ``endpoint`` call from the budget.
+
+        Returns the number of units charged.  Raises :class:`QuotaExhausted`
+        if the units are not available within ``max_wait`` seconds.
+        """
+        cost = endpoint_cost(endpoint) if units is None else units
+        channel_id = channel_id if channel_id is not None else current_channel.get()
+        while True:
+            with self._lock:
+                self._roll_over()
+                if self._is_exhausted():
+                    raise QuotaExhausted(
+                        "YouTube API quota exhausted until the daily reset"
+                    )
+                if cost <= self._available:
+                    self._available -= cost
+                    self._spent_by_endpoint[endpoint] = (
+                        self._spent_by_endpoint.get(endpoint, 0) + cost
+                    )
+                    if channel_id:
+                        self._spent_by_channel[channel_id] = (
+                            self._spent_by_channel.get(channel_id, 0) + cost
+                        )
+                    return cost
+            wait = seconds_until_reset(self._now())
+            if cost > self.daily_budget or (
+                self.max_wait is not None and wait > self.max_wait
+            ):
+                logger.error(
+                    "Quota budget cannot cover %d units for %s", cost, endpoint
+                )
+                raise QuotaExhausted(f"Not enough quota for {endpoint} ({cost} units)")
+            self._sleep(wait)
+
+    def mark_exhausted(self, reset_in: Optional[float] = None) -> None:
+        """Record that the API rejected a call with ``quotaExceeded``."""
+        reset_in = seconds_until_reset(self._now()) if reset_in is None else reset_in
+        with self._lock:
+            self._roll_over()
+            self._available = 0
+            self._exhausted_until = self._clock() + reset_in
+        logger.error(
+            "YouTube API quota exhausted; deferring calls for %.0f seconds", reset_in
+        )
+
+    @property
+    def exhausted(self) -> bool:
+        with self._lock:
+            self._roll_over()
+            return self._is_exhausted()
+
+    @property
+    def remaining(self) -> int:
+        """Units left until the next daily reset."""
+        with self._lock:
+            self._roll_over()
+            return 0 if self._is_exhausted() else self._available
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+    @property
+    def spent(self) -> int:
+        with self._lock:
+            return sum(self._spent_by_endpoint.values())
+
+    def spent_by_endpoint(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._spent_by_endpoint)
+
+    def spent_by_channel(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._spent_by_channel)
+
+    def report(self) -> Dict[str, object]:
+        """Return a summary suitable for logging or sizing the quota."""
+        return {
+            "spent": self.spent,
+            "remaining": self.remaining,
+            "by_endpoint": self.spent_by_endpoint(),
+            "by_channel": self.spent_by_channel(),
+        }
+
+    # ------------------------------------------------------------------
+    # Planning
+    # ------------------------------------------------------------------
+    def plan(self, tasks: Iterable[ScanTask]) -> ScanPlan:
+        """Select the tasks that fit into the remaining quota.
+
+        Tasks are considered in priority order (stable for equal priorities);
+        any task whose cost no longer fits is deferred, while cheaper tasks
+        behind it may still be scheduled.
+        """
+        plan = ScanPlan()
+        available = self.remaining
+        for task in sorted(tasks, key=lambda t: t.priority):
+            if task.cost <= available:
+                plan.scheduled.append(task)
+                available -= task.cost
+            else:
+                plan.deferred.append(task)
+        if plan.deferred:
+            logger.warning(
+                "Deferred %d tasks that do not fit into %d remaining quota units",
+                len(plan.deferred),
+                self.remaining,
+            )
+        return plan
+
+
+__all__ = [
+    "DEFAULT_DAILY_BUDGET",
+    "ENDPOINT_COSTS",
+    "PRIORITY_MAPPING",
+    "PRIORITY_METADATA",
+    "PRIORITY_TOP_SHORTS",
+    "PRIORITY_UPLOADS",
+    "QuotaBudget",
+    "QuotaExhausted",
+    "ScanPlan",
+    "ScanTask",
+    "TokenBucket",
+    "charging_channel",
+    "current_channel",
+    "endpoint_cost",
+    "seconds_until_reset",
+]
@@ -0,0 +1,218 @@
+"""Persistent SQLite cache for YouTube Data API responses.
+
+The cache sits underneath :class:`http_client.HttpClient`.  Responses are
+stored compressed, keyed by request, and served without touching the network
+(or the quota) while they are younger than their endpoint's TTL.  Stale
+entries are revalidated with their ETag.  The total size of cached bodies is
+capped and the least recently used entries are evicted first.  Cache hits
+only record their access time in memory; the times are written in one
+transaction with the next ``put``, every :data:`TOUCH_BATCH` hits and on
+:meth:`ResponseCache.close`, so reads never wait for a disk sync.
+
+In offline mode every request is answered from the cache regardless of age
+and a miss raises :class:`CacheMiss` immediately, which makes it possible to
+replay a previously recorded scan locally without any quota.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# How long responses of each endpoint are served without revalidation
+DEFAULT_TTLS: Dict[str, float] = {
+    "channels": 7 * DAY,
+    "commentThreads": DAY,
+    "playlistItems": 6 * HOUR,
+    "search": DAY,
+    "videos": 6 * HOUR,
+}
+DEFAULT_TTL = 6 * HOUR
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Cache hits whose access times are kept in memory before being written out
+TOUCH_BATCH = 1024
+
+
+class CacheMiss(LookupError):
+    """Raised in offline mode when a request is not in the cache."""
+
+
+@dataclass
+class CachedResponse:
+    """A response body stored in the cache."""
+
+    body: bytes
+    etag: Optional[str]
+    endpoint: str
+    stored_at: float
+
+
+class ResponseCache:
+    """On-disk response cache with per-endpoint TTLs and LRU eviction.
+
+    Args:
+        path: SQLite database file.
+        ttls: TTL in seconds per endpoint, merged over :data:`DEFAULT_TTLS`.
+        default_ttl: TTL for endpoints without an explicit entry.
+        max_bytes: Cap on the total size of stored (compressed) bodies.
+        offline: Serve only from the cache and fail fast on misses.
+        clock: Wall-clock time source, injectable for tests.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        offline: bool = False,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = Path(path)
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._touched: Dict[str, float] = {}
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT,
+                etag TEXT,
+                body BLOB,
+                size INTEGER,
+                stored_at REAL,
+                accessed_at REAL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_accessed "
+            "ON responses(accessed_at)"
+        )
+        self._conn.commit()
+        self._size = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def ttl(self, endpoint: str) -> float:
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        """Return ``True`` if ``entry`` may be served without revalidation."""
+        return self._clock() - entry.stored_at < self.ttl(entry.endpoint)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Return the cached response for ``key`` and mark it as recently used."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT endpoint, etag, body, stored_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[key] = self._clock()
+            if len(self._touched) >= TOUCH_BATCH:
+                self._write_touches()
+                self._conn.commit()
+        return CachedResponse(
+            body=zlib.decompress(row[2]), etag=row[1], endpoint=row[0], stored_at=row[3]
+        )
+
+    def put(
+        self, key: str, endpoint: str, body: bytes, etag: Optional[str] = None
+    ) -> None:
+        """Store ``body`` for ``key`` and evict old entries beyond the size cap."""
+        blob = zlib.compress(body)
+        now = self._clock()
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?,?,?,?,?,?,?)",
+                (key, endpoint, etag, blob, len(blob), now, now),
+            )
+            self._size += len(blob) - (previous[0] if previous else 0)
+            self._touched.pop(key, None)
+            self._write_touches()
+            self._evict()
+            self._conn.commit()
+
+    def _write_touches(self) -> None:
+        """Write the access times recorded by cache hits since the last write."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits ``max_bytes``."""
+        while self._size > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            self._size -= row[1]
+            self.evictions += 1
+
+    @property
+    def size(self) -> int:
+        """Total size of the stored, compressed bodies in bytes."""
+        with self._lock:
+            return self._size
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": entries,
+                "bytes": self._size,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._touched.clear()
+            self._size = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._write_touches()
+            self._conn.commit()
+            self._conn.close()
+
+
+__all__ = [
+    "CacheMiss",
+    "CachedResponse",
+    "DEFAULT_TTLS",
+    "ResponseCache",
+]
@@ -1,5 +1,6 @@
 """Executable entry point for coordinating YouTube Scanner modules."""
 
+from functools import partial
 import logging
 from logging.handlers import RotatingFileHandler
 
@@ -7,7 +8,8 @@ from youtube_scanner.channel_fetcher import fetch_uploads
 from youtube_scanner.video_classifier import classify_video
 from youtube_scanner.metadata_collector import collect_metadata
 from youtube_scanner.short_mapper import map_shorts_to_full
-from youtube_scanner.transcript_fetcher import fetch_transcript
+from youtube_scanner.transcript_fetcher import fetch_transcripts
+from youtube_scanner.transcript_store import get_transcript_store
 from youtube_scanner.scheduler import schedule_monthly
 from youtube_scanner.storage import save_results
 
@@ -19,6 +21,9 @@ if not logger.handlers:
     logger.addHandler(handler)
 logger.setLevel(logging.INFO)
 
+TRANSCRIPT_STORE_DIR = "transcripts"
+
+
 def main() -> None:
     """Coordinate scanning workflow."""
     channel_id = "UC_x5XG1OV2P6uZZ5FSM9Ttw"  # Placeholder channel ID
@@ -33,12 +38,20 @@ def main() -> None:
             shorts.append(video_id)
         else:
             longs.append(video_id)
-        fetch_transcript(video_id)
 
-    mapping = map_shorts_to_full(shorts, longs)
+    # Transcripts are fetched concurrently, and only for Shorts that reach the
+    # transcript step of the mapping cascade and their candidate long videos,
+    # the Shorts first and then the long videos by candidate rank.
+    # Fetched transcripts are kept so later scans do not download them again.
+    store = get_transcript_store(TRANSCRIPT_STORE_DIR)
+    mapping = map_shorts_to_full(
+        shorts, longs, fetch_transcripts=partial(fetch_transcripts, store=store)
+    )
+    store.flush()
     save_results({"mapping": mapping})
     schedule_monthly(main)
     logger.info("Scan complete")
 
+
 if __name__ == "__main__":
     main()
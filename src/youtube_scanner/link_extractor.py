@@ -0,0 +1,132 @@
+"""Extract YouTube video links from descriptions and comments.
+
+README steps 3a and 3b look for a link to the full video in a Short's
+description or in the creator's pinned comment.  Creators write those links
+in many forms: ``youtu.be/ID``, ``youtube.com/watch?v=ID`` (with ``v`` in any
+position), ``/shorts/ID``, ``/live/ID``, ``/embed/ID``, with or without a
+scheme, with a ``t=`` timestamp, or wrapped in a redirect such as
+``youtube.com/redirect?q=…`` or ``google.com/url?q=…`` whose target is
+percent-encoded.
+
+One precompiled pattern finds every direct form in a single pass over the
+text.  Only text containing ``%`` gets a second pass, over its decoded
+redirect targets.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import unquote
+
+from .title_index import video_fields
+
+logger = logging.getLogger(__name__)
+
+_ID = r"[A-Za-z0-9_-]{11}(?![A-Za-z0-9_-])"
+_LINK = re.compile(
+    r"""
+    (?<![\w.-])(?:https?://)?(?:(?:www|m|music)\.)?
+    (?:
+        youtu\.be/(?P<short>"""
+    + _ID
+    + r""")
+      | youtube(?:-nocookie)?\.com/
+        (?:
+            (?P<kind>shorts|live|embed|v|e)/(?P<path>"""
+    + _ID
+    + r""")
+          | watch/?\?(?P<query>[^\s"'<>\#]*)
+        )
+    )
+    (?P<rest>[^\s"'<>]*)
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+_WATCH_ID = re.compile(r"(?:^|&)v=(" + _ID + r")")
+_TIMESTAMP = re.compile(
+    r"[?&#](?:t|start|time_continue)=(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s?)?(?![\w])"
+)
+# Percent-encoded URLs carried in the query string of a redirect wrapper
+_ENCODED = re.compile(
+    r"https?%3A%2F%2F[^\s&\"'<>]+|%2F(?:watch|shorts|live|embed)[^\s&\"'<>]*",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class VideoLink:
+    """A link to a YouTube video.
+
+    Attributes:
+        video_id: ID of the linked video.
+        kind: ``watch``, ``youtu.be``, ``shorts``, ``live`` or ``embed``.
+        start: Position the link starts playback at, in seconds.
+    """
+
+    video_id: str
+    kind: str
+    start: Optional[int] = None
+
+
+def _timestamp(text: str) -> Optional[int]:
+    match = _TIMESTAMP.search(text)
+    if not match or not any(match.groups()):
+        return None
+    hours, minutes, seconds = (int(value) if value else 0 for value in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def _scan(text: str, links: List[VideoLink]) -> None:
+    for match in _LINK.finditer(text):
+        rest = match.group("rest")
+        if match.group("short"):
+            video_id, kind = match.group("short"), "youtu.be"
+        elif match.group("path"):
+            video_id, kind = match.group("path"), match.group("kind").lower()
+            if kind in ("v", "e"):
+                kind = "embed"
+        else:
+            query = match.group("query")
+            found = _WATCH_ID.search(query)
+            if not found:
+                continue
+            video_id, kind, rest = found.group(1), "watch", "?" + query + rest
+        links.append(VideoLink(video_id, kind, _timestamp(rest)))
+
+
+def extract_links(text: Optional[str]) -> List[VideoLink]:
+    """Return every YouTube video link in ``text``, in order of appearance."""
+    if not text:
+        return []
+    links: List[VideoLink] = []
+    _scan(text, links)
+    if "%" in text:
+        for encoded in _ENCODED.findall(text):
+            _scan(unquote(encoded), links)
+    return links
+
+
+def extract_video_ids(text: Optional[str]) -> List[str]:
+    """Return the distinct IDs of videos linked in ``text``, in order."""
+    return list(dict.fromkeys(link.video_id for link in extract_links(text)))
+
+
+def extract_links_bulk(videos: Iterable[Any]) -> Dict[str, List[str]]:
+    """Return the linked video IDs of every video whose description has any.
+
+    ``videos`` are dicts or :class:`VideoMetadata` records, typically all
+    Shorts of a channel.  Links a video makes to itself are left out.
+    """
+    found: Dict[str, List[str]] = {}
+    for video in videos:
+        video_id, _, description = video_fields(video)
+        ids = [
+            linked for linked in extract_video_ids(description) if linked != video_id
+        ]
+        if ids:
+            found[video_id] = ids
+    return found
+
+
+__all__ = ["VideoLink", "extract_links", "extract_links_bulk", "extract_video_ids"]
@@ -0,0 +1,548 @@
+"""Cost-ordered cascade of Short → long-form mapping strategies.
+
+README steps 3a–3d differ widely in cost.  A link in the Short's description
+is free to find, and so is a title match against a local index over the
+channel's long videos (first by shared tokens, then by MinHash similarity for
+reworded titles).  The owner's pinned comment costs one
+``commentThreads.list`` unit per Short, and a transcript match needs the
+transcripts of the candidate long videos.  :class:`MappingCascade` runs the
+strategies in that order over all Shorts of a channel at once.  Each Short
+leaves the cascade as soon as one strategy reports a confident match, so the
+expensive strategies only see the Shorts that the cheap ones could not map.
+
+Every strategy records its hits, the time it spent and the API units it used
+in a :class:`StrategyStats`, which shows whether its cost is worth paying.
+
+A strategy may also report weaker candidates, such as a link to a video on
+another channel.  They do not stop the cascade and are only used for Shorts
+that no later step maps confidently.
+"""
+
+import abc
+import itertools
+import logging
+import time
+from bisect import bisect_left
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+import requests
+
+from .link_extractor import extract_links_bulk, extract_video_ids
+from .minhash import DEFAULT_THRESHOLD, SOURCE_SIMILAR_TITLE, NearDuplicateMatcher
+from .tfidf import TfidfScorer
+from .title_index import DEFAULT_MIN_SCORE, MatchCandidate, TitleIndex, video_fields
+from .transcript_index import TranscriptIndex
+
+logger = logging.getLogger(__name__)
+
+SOURCE_DESCRIPTION_LINK = "description_link"
+SOURCE_PINNED_COMMENT = "pinned_comment"
+
+# Quota units of the single commentThreads.list page read per Short
+COMMENT_THREADS_UNITS = 1
+# Minimum transcript coverage accepted as the source of a Short
+TRANSCRIPT_MIN_COVERAGE = 0.5
+# Long videos per Short whose transcripts the transcript step fetches
+TRANSCRIPT_CANDIDATES = 5
+# Score of a link to a video outside the channel; used only as a fallback
+OUTSIDE_LINK_SCORE = 0.5
+
+# Failures of a single strategy that should not stop the cascade.  Anything
+# else, notably quota exhaustion and offline cache misses, propagates.
+STRATEGY_ERRORS = (requests.exceptions.RequestException, ValueError)
+
+CommentFetcher = Callable[[List[str]], Dict[str, List[str]]]
+TranscriptFetcher = Callable[[str], List[str]]
+# Called as ``fetch(video_ids, priority=...)``, lower priorities fetched first
+BatchTranscriptFetcher = Callable[..., Dict[str, List[str]]]
+
+
+@dataclass
+class StrategyStats:
+    """What one strategy of the cascade achieved and what it cost.
+
+    Attributes:
+        name: Name of the strategy.
+        attempted: Shorts the strategy was asked to map.
+        hits: Shorts it mapped confidently.
+        fallbacks: Shorts mapped through one of its fallback candidates
+            after no strategy matched them confidently.
+        seconds: Wall-clock time spent in the strategy.
+        api_units: Data API quota units it spent.
+    """
+
+    name: str
+    attempted: int = 0
+    hits: int = 0
+    fallbacks: int = 0
+    seconds: float = 0.0
+    api_units: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.attempted if self.attempted else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["hit_rate"] = self.hit_rate
+        return data
+
+
+class Strategy(abc.ABC):
+    """One step of the cascade.
+
+    Subclasses implement :meth:`match` for a batch of Shorts of one channel.
+    Matches scoring below ``min_score`` do not stop the cascade; those
+    scoring at least ``fallback_score`` are kept as fallbacks.
+    """
+
+    name = "strategy"
+    min_score = 1.0
+    fallback_score: Optional[float] = None
+
+    @abc.abstractmethod
+    def match(
+        self, shorts: List[Any], longs: List[Any], stats: StrategyStats
+    ) -> Dict[str, MatchCandidate]:
+        """Return the best candidate of each Short the strategy could match."""
+
+
+def _link_candidate(
+    short_id: str,
+    linked: Iterable[str],
+    longs: Dict[str, Any],
+    shorts: Set[str],
+    source: str,
+) -> Optional[MatchCandidate]:
+    """Return the first linked long video, preferring ones of the channel.
+
+    Links to the Short itself or to other Shorts are ignored.  A link to a
+    video outside ``longs`` (for example on another channel) is returned with
+    :data:`OUTSIDE_LINK_SCORE`, so it only maps the Short as a fallback.
+    """
+    outside = None
+    for video_id in linked:
+        if video_id == short_id or video_id in shorts:
+            continue
+        if video_id in longs:
+            return MatchCandidate(video_id, 1.0, source, longs[video_id])
+        if outside is None:
+            outside = MatchCandidate(video_id, OUTSIDE_LINK_SCORE, source)
+    return outside
+
+
+class DescriptionLinkStrategy(Strategy):
+    """README step 3a: a video link in the Short's description."""
+
+    name = SOURCE_DESCRIPTION_LINK
+    fallback_score = OUTSIDE_LINK_SCORE
+
+    def match(
+        self, shorts: List[Any], longs: List[Any], stats: StrategyStats
+    ) -> Dict[str, MatchCandidate]:
+        by_id = {video_fields(video)[0]: video for video in longs}
+        short_ids = {video_fields(short)[0] for short in shorts}
+        found = {}
+        for short_id, linked in extract_links_bulk(shorts).items():
+            candidate = _link_candidate(short_id, linked, by_id, short_ids, self.name)
+            if candidate is not None:
+                found[short_id] = candidate
+        return found
+
+
+class PinnedCommentStrategy(Strategy):
+    """README step 3b: a video link in a comment by the channel owner.
+
+    Args:
+        fetch_comments: Returns the owner's comment texts per Short ID for a
+            batch of Short IDs, with an entry for every Short whose comments
+            it read.
+        units_per_short: Quota units spent per Short looked up.
+    """
+
+    name = SOURCE_PINNED_COMMENT
+    fallback_score = OUTSIDE_LINK_SCORE
+
+    def __init__(
+        self,
+        fetch_comments: CommentFetcher,
+        units_per_short: int = COMMENT_THREADS_UNITS,
+    ) -> None:
+        self.fetch_comments = fetch_comments
+        self.units_per_short = units_per_short
+
+    def match(
+        self, shorts: List[Any], longs: List[Any], stats: StrategyStats
+    ) -> Dict[str, MatchCandidate]:
+        by_id = {video_fields(video)[0]: video for video in longs}
+        ordered = [video_fields(short)[0] for short in shorts]
+        all_shorts = set(ordered)
+        # A Short whose description links elsewhere (to another Short, say)
+        # is not worth a comment call either
+        with_links = extract_links_bulk(shorts)
+        short_ids = [short_id for short_id in ordered if short_id not in with_links]
+        if not short_ids:
+            return {}
+        comments = self.fetch_comments(short_ids)
+        # The fetcher may skip Shorts or stop early on quota; only charge
+        # for the Shorts it read
+        stats.api_units += self.units_per_short * len(comments)
+        found = {}
+        for short_id in short_ids:
+            linked = [
+                video_id
+                for text in comments.get(short_id, ())
+                for video_id in extract_video_ids(text)
+            ]
+            candidate = _link_candidate(short_id, linked, by_id, all_shorts, self.name)
+            if candidate is not None:
+                found[short_id] = candidate
+        return found
+
+
+class TitleStrategy(Strategy):
+    """README step 3c: title and description tokens of the channel's videos.
+
+    The channel's long videos are indexed locally instead of calling
+    ``search.list`` (100 units) for every Short.
+    """
+
+    name = "title"
+
+    def __init__(self, min_score: float = DEFAULT_MIN_SCORE) -> None:
+        self.min_score = min_score
+
+    def match(
+        self, shorts: List[Any], longs: List[Any], stats: StrategyStats
+    ) -> Dict[str, MatchCandidate]:
+        index = TitleIndex(longs)
+        found = {}
+        for short in shorts:
+            short_id, title, _ = video_fields(short)
+            candidate = index.best(title, self.min_score)
+            if candidate is not None:
+                found[short_id] = candidate
+        return found
+
+
+class SimilarTitleStrategy(Strategy):
+    """README step 3c for reworded titles, via MinHash/LSH.
+
+    Titles such as "Black holes: the quick truth" for "The Truth About Black
+    Holes" share too few weighted tokens for :class:`TitleStrategy`.  This
+    step compares token sets by Jaccard similarity through a
+    :class:`NearDuplicateMatcher` over the channel's long videos, a local
+    lookup instead of a 100-unit ``search.list`` call per Short.  A Short
+    whose best similarity is shared by several videos stays unmapped.
+
+    Args:
+        min_score: Minimum Jaccard similarity of a confident match.
+        include_description: Add description tokens to the long-form side.
+    """
+
+    name = SOURCE_SIMILAR_TITLE
+
+    def __init__(
+        self, min_score: float = DEFAULT_THRESHOLD, include_description: bool = False
+    ) -> None:
+        self.min_score = min_score
+        self.include_description = include_description
+
+    def match(
+        self, shorts: List[Any], longs: List[Any], stats: StrategyStats
+    ) -> Dict[str, MatchCandidate]:
+        matcher = NearDuplicateMatcher(
+            longs,
+            threshold=self.min_score,
+            include_description=self.include_description,
+        )
+        found = {}
+        for short_id, candidates in matcher.match_all(shorts, limit=2).items():
+            if candidates and (
+                len(candidates) == 1 or candidates[0].score > candidates[1].score
+            ):
+                found[short_id] = candidates[0]
+        return found
+
+
+def _published(video: Any) -> Optional[float]:
+    """Return the publish time of a video as a POSIX timestamp, if known."""
+    value = (
+        video.get("publish_date")
+        if isinstance(video, dict)
+        else getattr(video, "publish_date", None)
+    )
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _nearest(published: float, dated: List[Tuple[float, int]]) -> Iterator[int]:
+    """Yield the documents of ``dated`` by distance of their date to ``published``.
+
+    ``dated`` holds ``(timestamp, document)`` pairs sorted by timestamp; the
+    walk starts at the insertion point of ``published`` and moves outwards.
+    """
+    left = bisect_left(dated, (published, -1)) - 1
+    right = left + 1
+    while left >= 0 or right < len(dated):
+        if right >= len(dated) or (
+            left >= 0 and published - dated[left][0] <= dated[right][0] - published
+        ):
+            yield dated[left][1]
+            left -= 1
+        else:
+            yield dated[right][1]
+            right += 1
+
+
+def rank_transcript_candidates(
+    shorts: List[Any], longs: List[Any], limit: int = TRANSCRIPT_CANDIDATES
+) -> Dict[str, List[str]]:
+    """Return the long videos worth a transcript lookup for each Short.
+
+    All Shorts are scored against all long videos on title and description
+    terms in one batch (:class:`~.tfidf.TfidfScorer`).  A clip's words often
+    do not appear in the long video's title, so Shorts with fewer than
+    ``limit`` scored candidates are topped up with the long videos published
+    closest to them (in the given order when dates are unknown).  The long
+    videos are sorted by date once per channel and searched with
+    :func:`bisect.bisect_left` for each Short.
+    """
+    ranked = TfidfScorer(longs).score(shorts, limit=limit) if longs else {}
+    long_ids = [video_fields(video)[0] for video in longs]
+    dated: List[Tuple[float, int]] = []
+    undated: List[int] = []
+    for doc, video in enumerate(longs):
+        timestamp = _published(video)
+        if timestamp is None:
+            undated.append(doc)
+        else:
+            dated.append((timestamp, doc))
+    dated.sort()
+    candidates: Dict[str, List[str]] = {}
+    for short in shorts:
+        short_id = video_fields(short)[0]
+        chosen = [candidate.video_id for candidate in ranked.get(short_id, [])]
+        if len(chosen) < limit:
+            published = _published(short)
+            nearby: Iterable[int] = range(len(longs))
+            if published is not None:
+                nearby = itertools.chain(_nearest(published, dated), undated)
+            for doc in nearby:
+                if len(chosen) >= limit:
+                    break
+                if long_ids[doc] not in chosen:
+                    chosen.append(long_ids[doc])
+        candidates[short_id] = chosen
+    return candidates
+
+
+class TranscriptStrategy(Strategy):
+    """README step 3d: the Short's words inside a long video's transcript.
+
+    Transcripts are only fetched when Shorts reach this step, and only for
+    the candidate long videos of each remaining Short (see
+    :func:`rank_transcript_candidates`) rather than the whole channel.
+
+    Args:
+        fetch_transcript: Returns the caption lines of a video.
+        min_coverage: Minimum share of the Short's n-grams found in the long
+            video for a confident match.
+        fetch_transcripts: Returns the caption lines of many videos at once,
+            such as ``transcript_fetcher.fetch_transcripts``.  When given,
+            every transcript the step needs is fetched in one batch with a
+            ``priority`` mapping: the remaining Shorts first, then the
+            candidate long videos by their best rank for any Short.
+        candidates: Long videos considered per Short; ``None`` considers
+            every long video of the channel.
+    """
+
+    name = "transcript"
+
+    def __init__(
+        self,
+        fetch_transcript: Optional[TranscriptFetcher] = None,
+        min_coverage: float = TRANSCRIPT_MIN_COVERAGE,
+        fetch_transcripts: Optional[BatchTranscriptFetcher] = None,
+        candidates: Optional[int] = TRANSCRIPT_CANDIDATES,
+    ) -> None:
+        if fetch_transcript is None and fetch_transcripts is None:
+            raise ValueError(
+                "TranscriptStrategy needs fetch_transcript or fetch_transcripts"
+            )
+        self.fetch_transcript = fetch_transcript
+        self.fetch_transcripts = fetch_transcripts
+        self.min_score = min_coverage
+        self.candidates = candidates
+
+    def match(
+        self, shorts: List[Any], longs: List[Any], stats: StrategyStats
+    ) -> Dict[str, MatchCandidate]:
+        by_id = {video_fields(video)[0]: video for video in longs}
+        short_ids = [video_fields(short)[0] for short in shorts]
+        priority = dict.fromkeys(short_ids, 0)
+        if self.candidates is None:
+            long_ids = list(by_id)
+            priority.update(dict.fromkeys(long_ids, 1))
+        else:
+            ranked = rank_transcript_candidates(shorts, longs, self.candidates)
+            for short_id in short_ids:
+                for rank, video_id in enumerate(ranked[short_id], 1):
+                    priority[video_id] = min(rank, priority.get(video_id, rank))
+            shorts_set = set(short_ids)
+            long_ids = [video_id for video_id in priority if video_id not in shorts_set]
+        fetch: TranscriptFetcher
+        if self.fetch_transcripts is not None:
+            transcripts = self.fetch_transcripts(
+                short_ids + long_ids, priority=priority
+            )
+
+            def lookup(video_id: str) -> List[str]:
+                return transcripts.get(video_id) or []
+
+            fetch = lookup
+        elif self.fetch_transcript is not None:
+            fetch = self.fetch_transcript
+        else:
+            raise ValueError(
+                "TranscriptStrategy needs fetch_transcript or fetch_transcripts"
+            )
+        index = TranscriptIndex.build(long_ids, fetch)
+        found = {}
+        for short_id in short_ids:
+            matches = index.query(fetch(short_id), limit=1, exclude=short_id)
+            if matches:
+                matches[0].video = by_id[matches[0].video_id]
+                found[short_id] = matches[0]
+        return found
+
+
+class MappingCascade:
+    """Run mapping strategies in order, cheapest first.
+
+    Args:
+        strategies: Strategies in the order they should run.  Statistics are
+            accumulated per strategy name across calls.
+    """
+
+    def __init__(self, strategies: Sequence[Strategy]) -> None:
+        self.strategies = list(strategies)
+        self.stats: Dict[str, StrategyStats] = {
+            strategy.name: StrategyStats(strategy.name) for strategy in self.strategies
+        }
+
+    def map_channel(
+        self, shorts: Iterable[Any], longs: Iterable[Any]
+    ) -> Dict[str, MatchCandidate]:
+        """Map the Shorts of one channel to its long-form videos.
+
+        Returns the match of every mapped Short, keyed by Short ID: its first
+        confident match or, failing that, the first fallback candidate.  A
+        strategy failing with one of :data:`STRATEGY_ERRORS` is logged and
+        skipped; other errors propagate.
+        """
+        remaining = list(shorts)
+        longs = list(longs)
+        results: Dict[str, MatchCandidate] = {}
+        fallbacks: Dict[str, MatchCandidate] = {}
+        fallback_stats: Dict[str, StrategyStats] = {}
+        for strategy in self.strategies:
+            if not remaining:
+                break
+            stats = self.stats[strategy.name]
+            started = time.perf_counter()
+            try:
+                found = strategy.match(remaining, longs, stats)
+            except STRATEGY_ERRORS as exc:
+                logger.error("Mapping strategy %s failed: %s", strategy.name, exc)
+                found = {}
+            finally:
+                stats.seconds += time.perf_counter() - started
+            stats.attempted += len(remaining)
+            confident = {}
+            for short_id, candidate in found.items():
+                if candidate.score >= strategy.min_score:
+                    confident[short_id] = candidate
+                elif (
+                    strategy.fallback_score is not None
+                    and candidate.score >= strategy.fallback_score
+                    and short_id not in fallbacks
+                ):
+                    fallbacks[short_id] = candidate
+                    fallback_stats[short_id] = stats
+            stats.hits += len(confident)
+            results.update(confident)
+            remaining = [
+                short for short in remaining if video_fields(short)[0] not in confident
+            ]
+        for short in remaining:
+            short_id = video_fields(short)[0]
+            if short_id in fallbacks:
+                results[short_id] = fallbacks[short_id]
+                fallback_stats[short_id].fallbacks += 1
+        return results
+
+    def report(self) -> List[Dict[str, Any]]:
+        """Return the statistics of every strategy, in cascade order."""
+        return [self.stats[strategy.name].to_dict() for strategy in self.strategies]
+
+
+def default_strategies(
+    fetch_comments: Optional[CommentFetcher] = None,
+    fetch_transcript: Optional[TranscriptFetcher] = None,
+    fetch_transcripts: Optional[BatchTranscriptFetcher] = None,
+) -> List[Strategy]:
+    """Return the README strategies in cost order.
+
+    The free steps come first: description links, then the local title and
+    similar title indexes.  The pinned comment step, which spends a quota
+    unit per Short, and the transcript step follow and are included only
+    when a fetcher for them is given.
+    """
+    strategies: List[Strategy] = [
+        DescriptionLinkStrategy(),
+        TitleStrategy(),
+        SimilarTitleStrategy(),
+    ]
+    if fetch_comments is not None:
+        strategies.append(PinnedCommentStrategy(fetch_comments))
+    if fetch_transcript is not None or fetch_transcripts is not None:
+        strategies.append(
+            TranscriptStrategy(fetch_transcript, fetch_transcripts=fetch_transcripts)
+        )
+    return strategies
+
+
+__all__ = [
+    "DescriptionLinkStrategy",
+    "MappingCascade",
+    "OUTSIDE_LINK_SCORE",
+    "PinnedCommentStrategy",
+    "SOURCE_DESCRIPTION_LINK",
+    "SOURCE_PINNED_COMMENT",
+    "STRATEGY_ERRORS",
+    "SimilarTitleStrategy",
+    "Strategy",
+    "StrategyStats",
+    "TitleStrategy",
+    "TRANSCRIPT_CANDIDATES",
+    "TranscriptStrategy",
+    "default_strategies",
+    "rank_transcript_candidates",
+]
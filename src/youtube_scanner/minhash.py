@@ -0,0 +1,223 @@
+"""MinHash signatures and LSH banding for near-duplicate title matching.
+
+README step 3c looks for long-form videos whose titles resemble a Short's
+("Black Holes in 1 Minute" → "The Truth About Black Holes").  Doing that
+through ``search.list`` costs 100 quota units per Short, and comparing every
+pair locally is quadratic.  :class:`MinHashLSH` summarises each video's token
+set in a fixed-size MinHash signature and buckets signature bands, so only
+videos sharing a bucket are compared.  Those candidates are verified with
+their exact Jaccard similarity.
+
+:class:`NearDuplicateMatcher` applies this to Shorts and long-form videos,
+within one channel or across channels.
+"""
+
+import logging
+import random
+import zlib
+from collections import defaultdict
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from .title_index import MatchCandidate, tokenize, video_fields
+
+logger = logging.getLogger(__name__)
+
+SOURCE_SIMILAR_TITLE = "similar_title"
+
+DEFAULT_NUM_PERM = 128
+DEFAULT_THRESHOLD = 0.3
+# Mersenne prime used by the permutation hashes
+_PRIME = (1 << 31) - 1
+
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """Return ``(bands, rows)`` whose LSH threshold best fits ``threshold``.
+
+    Two signatures with Jaccard similarity ``s`` share at least one bucket
+    with probability ``1 - (1 - s**rows) ** bands``, which rises steeply
+    around ``(1 / bands) ** (1 / rows)``.  The returned split puts that point
+    at or just below ``threshold`` so that true matches are rarely missed.
+    """
+    best = (num_perm, 1)
+    best_gap = float("inf")
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        knee = (1 / bands) ** (1 / rows)
+        if knee <= threshold and threshold - knee < best_gap:
+            best, best_gap = (bands, rows), threshold - knee
+    return best
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MinHashLSH:
+    """Index of token sets supporting sub-quadratic similarity lookups.
+
+    Args:
+        num_perm: Number of hash permutations per signature.
+        threshold: Minimum Jaccard similarity of reported matches.
+        seed: Seed for the permutation coefficients; indexes can only be
+            compared with signatures built from the same seed.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = DEFAULT_NUM_PERM,
+        threshold: float = DEFAULT_THRESHOLD,
+        seed: int = 1,
+    ) -> None:
+        self.num_perm = num_perm
+        self.threshold = threshold
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME))
+            for _ in range(num_perm)
+        ]
+        self._buckets: List[Dict[Tuple[int, ...], List[Hashable]]] = [
+            defaultdict(list) for _ in range(self.bands)
+        ]
+        self._tokens: Dict[Hashable, FrozenSet[str]] = {}
+        self._order: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def signature(self, tokens: Iterable[str]) -> List[int]:
+        """Return the MinHash signature of a token set."""
+        hashes = {zlib.crc32(token.encode("utf-8")) & _PRIME for token in tokens}
+        if not hashes:
+            return [_PRIME] * self.num_perm
+        return [min([(a * h + b) % _PRIME for h in hashes]) for a, b in self._perms]
+
+    def _bands(self, signature: List[int]) -> Iterator[Tuple[int, Tuple[int, ...]]]:
+        for band in range(self.bands):
+            yield band, tuple(signature[band * self.rows : (band + 1) * self.rows])
+
+    def add(self, key: Hashable, tokens: Iterable[str]) -> None:
+        """Index the token set of ``key``; empty sets are ignored."""
+        token_set = frozenset(tokens)
+        if not token_set:
+            return
+        self._tokens[key] = token_set
+        self._order.setdefault(key, len(self._order))
+        for band, chunk in self._bands(self.signature(token_set)):
+            self._buckets[band][chunk].append(key)
+
+    def query(
+        self, tokens: Iterable[str], threshold: Optional[float] = None
+    ) -> List[Tuple[Hashable, float]]:
+        """Return indexed keys similar to ``tokens``, most similar first."""
+        token_set = frozenset(tokens)
+        if not token_set:
+            return []
+        minimum = self.threshold if threshold is None else threshold
+        seen: Set[Hashable] = set()
+        for band, chunk in self._bands(self.signature(token_set)):
+            seen.update(self._buckets[band].get(chunk, ()))
+        matches = []
+        for key in seen:
+            score = jaccard(token_set, self._tokens[key])
+            if score >= minimum:
+                matches.append((key, score))
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches
+
+    def candidate_pairs(self) -> Iterator[Tuple[Hashable, Hashable, float]]:
+        """Yield every pair of indexed keys at or above the threshold once."""
+        emitted: Set[Tuple[Hashable, Hashable]] = set()
+        for buckets in self._buckets:
+            for keys in buckets.values():
+                for i, first in enumerate(keys):
+                    for second in keys[i + 1 :]:
+                        pair = (first, second)
+                        if self._order[first] > self._order[second]:
+                            pair = (second, first)
+                        if pair in emitted:
+                            continue
+                        emitted.add(pair)
+                        score = jaccard(self._tokens[first], self._tokens[second])
+                        if score >= self.threshold:
+                            yield pair[0], pair[1], score
+
+
+def title_tokens(video: Any, include_description: bool = False) -> Set[str]:
+    """Return the token set compared for a video."""
+    _, title, description = video_fields(video)
+    tokens = set(tokenize(title))
+    if include_description:
+        tokens.update(tokenize(description))
+    return tokens
+
+
+class NearDuplicateMatcher:
+    """Find long-form videos whose titles resemble a Short's.
+
+    Args:
+        videos: Long-form videos as dicts or :class:`VideoMetadata` records,
+            from one channel or several.
+        threshold: Minimum Jaccard similarity between token sets.
+        include_description: Add description tokens to the long-form side.
+        num_perm: Signature size; larger values make the LSH filter sharper.
+    """
+
+    def __init__(
+        self,
+        videos: Iterable[Any],
+        threshold: float = DEFAULT_THRESHOLD,
+        include_description: bool = False,
+        num_perm: int = DEFAULT_NUM_PERM,
+    ) -> None:
+        self.lsh = MinHashLSH(num_perm=num_perm, threshold=threshold)
+        self._videos: Dict[Hashable, Any] = {}
+        for video in videos:
+            video_id = video_fields(video)[0]
+            self._videos[video_id] = video
+            self.lsh.add(video_id, title_tokens(video, include_description))
+        logger.info("Indexed %d videos for near-duplicate matching", len(self.lsh))
+
+    def candidates(self, short: Any, limit: int = 5) -> List[MatchCandidate]:
+        """Return up to ``limit`` similar long-form videos, best first."""
+        found = []
+        for key, score in self.lsh.query(title_tokens(short))[:limit]:
+            video = self._videos[key]
+            found.append(
+                MatchCandidate(
+                    video_fields(video)[0], score, SOURCE_SIMILAR_TITLE, video
+                )
+            )
+        return found
+
+    def match_all(
+        self, shorts: Iterable[Any], limit: int = 5
+    ) -> Dict[str, List[MatchCandidate]]:
+        """Return candidates for every Short, keyed by the Short's ID."""
+        return {
+            video_fields(short)[0]: self.candidates(short, limit) for short in shorts
+        }
+
+
+__all__ = [
+    "DEFAULT_THRESHOLD",
+    "MinHashLSH",
+    "NearDuplicateMatcher",
+    "SOURCE_SIMILAR_TITLE",
+    "choose_bands",
+    "jaccard",
+    "title_tokens",
+]
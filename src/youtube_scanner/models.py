@@ -7,9 +7,10 @@ application.  Each dataclass provides helpers for serialising to and from
 common formats such as dictionaries, JSON strings and CSV rows.
 """
 
-from dataclasses import dataclass, asdict
+from array import array
+from dataclasses import dataclass, asdict, field
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 import json
 
 
@@ -27,6 +28,7 @@ class VideoMetadata:
         comment_count: Number of comments on the video.
         duration: Length of the video in seconds.
         is_short: True if the video is considered a YouTube Short.
+        channel_id: Channel that uploaded the video, if known.
     """
 
     video_id: str
@@ -38,6 +40,7 @@ class VideoMetadata:
     comment_count: Optional[int] = None
     duration: Optional[int] = None
     is_short: bool = False
+    channel_id: Optional[str] = None
 
     # ------------------------------------------------------------------
     # Serialisation helpers
@@ -76,6 +79,7 @@ class VideoMetadata:
             "comment_count",
             "duration",
             "is_short",
+            "channel_id",
         ]
 
     def to_csv_row(self) -> list[str]:
@@ -92,6 +96,8 @@ class VideoMetadata:
                 data[key] = int(data[key])
         if data.get("is_short"):
             data["is_short"] = data["is_short"].lower() in {"1", "true", "yes"}
+        if "channel_id" in data:
+            data["channel_id"] = data["channel_id"] or None
         return cls(**data)
 
 
@@ -176,3 +182,129 @@ class ChannelConfig:
         if data.get("top_n_shorts"):
             data["top_n_shorts"] = int(data["top_n_shorts"])
         return cls(**data)
+
+
+@dataclass
+class UploadsCursor:
+    """Newest upload seen in a channel's uploads playlist.
+
+    Incremental scans stop paginating once they reach this video, or any
+    video published before it.
+    """
+
+    video_id: str
+    published_at: Optional[datetime] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        if self.published_at is not None:
+            data["published_at"] = self.published_at.isoformat()
+        return data
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "UploadsCursor":
+        data = dict(data)
+        published_at = data.get("published_at")
+        if published_at is not None and not isinstance(published_at, datetime):
+            data["published_at"] = datetime.fromisoformat(published_at)
+        return cls(**data)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "UploadsCursor":
+        return cls.from_dict(json.loads(raw))
+
+    @classmethod
+    def csv_headers(cls) -> list[str]:
+        return ["video_id", "published_at"]
+
+    def to_csv_row(self) -> list[str]:
+        data = self.to_dict()
+        return [
+            "" if data.get(h) is None else str(data.get(h)) for h in self.csv_headers()
+        ]
+
+    @classmethod
+    def from_csv_row(cls, row: Dict[str, str]) -> "UploadsCursor":
+        data: Dict[str, Any] = dict(row)
+        data["published_at"] = (
+            datetime.fromisoformat(data["published_at"])
+            if data.get("published_at")
+            else None
+        )
+        return cls(**data)
+
+
+@dataclass
+class TimedTranscript:
+    """Caption lines of a video together with their timing.
+
+    Start times and durations are kept in ``array('d')`` columns parallel to
+    ``lines`` rather than one dict per entry, so a long transcript costs a few
+    bytes per line on top of its text.
+
+    Attributes:
+        video_id: Video the transcript belongs to.
+        lines: Caption text, one entry per caption line.
+        starts: Start of each line in seconds from the beginning of the video.
+        durations: How long each line is shown, in seconds.
+    """
+
+    video_id: str
+    lines: List[str] = field(default_factory=list)
+    starts: array = field(default_factory=lambda: array("d"))
+    durations: array = field(default_factory=lambda: array("d"))
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def append(self, text: str, start: float, duration: float = 0.0) -> None:
+        self.lines.append(text)
+        self.starts.append(float(start))
+        self.durations.append(float(duration or 0.0))
+
+    def span(self, first: int, last: int) -> Tuple[float, float]:
+        """Return the ``(start, end)`` seconds covered by lines ``first..last``."""
+        return self.starts[first], self.starts[last] + self.durations[last]
+
+    @classmethod
+    def from_entries(
+        cls, video_id: str, entries: Iterable[Dict[str, Any]]
+    ) -> "TimedTranscript":
+        """Build a transcript from ``text``/``start``/``duration`` dicts.
+
+        Entries without text are skipped.
+        """
+        transcript = cls(video_id)
+        for entry in entries:
+            if entry.get("text"):
+                transcript.append(
+                    entry["text"], entry.get("start", 0.0), entry.get("duration", 0.0)
+                )
+        return transcript
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "video_id": self.video_id,
+            "lines": list(self.lines),
+            "starts": self.starts.tolist(),
+            "durations": self.durations.tolist(),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TimedTranscript":
+        return cls(
+            video_id=data["video_id"],
+            lines=list(data.get("lines") or []),
+            starts=array("d", data.get("starts") or []),
+            durations=array("d", data.get("durations") or []),
+        )
+
+    @classmethod
+    def from_json(cls, raw: str) -> "TimedTranscript":
+        return cls.from_dict(json.loads(raw))
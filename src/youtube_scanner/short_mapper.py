@@ -1,9 +1,19 @@
 """Map Shorts to full videos via descriptions, comments, search, and transcripts."""
 
-from typing import Dict, Iterable, List, Optional
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
 import logging
 from logging.handlers import RotatingFileHandler
 
+from .mapping_cascade import (
+    BatchTranscriptFetcher,
+    CommentFetcher,
+    MappingCascade,
+    TranscriptFetcher,
+    default_strategies,
+)
+from .title_index import DEFAULT_MIN_SCORE, MatchCandidate, TitleIndex, video_fields
+
 logger = logging.getLogger(__name__)
 if not logger.handlers:
     handler = RotatingFileHandler("youtube_scanner.log", maxBytes=1_000_000, backupCount=3)
@@ -13,18 +23,108 @@ if not logger.handlers:
 logger.setLevel(logging.INFO)
 
 
-def map_short_to_long(short: Dict[str, str], videos: Iterable[Dict[str, str]]) -> Optional[Dict[str, str]]:
-    """Map a single short to a matching long-form video by title."""
+def map_short_to_long(
+    short: Dict[str, str],
+    videos: Iterable[Any],
+    index: Optional[TitleIndex] = None,
+    min_score: float = DEFAULT_MIN_SCORE,
+) -> Optional[Any]:
+    """Map a single short to its best matching long-form video.
+
+    An exact (case-insensitive) title match always wins; otherwise the best
+    token match scoring at least ``min_score`` is returned.  When mapping many
+    Shorts, build a :class:`TitleIndex` once and pass it as ``index``;
+    ``videos`` is then ignored.
+    """
     logger.info("Mapping short %s", short.get("id"))
-    short_title = short.get("title", "").lower()
-    for video in videos:
-        if video.get("title", "").lower() == short_title:
-            return video
-    return None
+    index = index if index is not None else TitleIndex(videos)
+    match = index.best(short.get("title", ""), min_score)
+    return match.video if match else None
+
+
+def rank_long_candidates(
+    shorts: Iterable[Any],
+    videos: Iterable[Any],
+    limit: int = 5,
+    min_score: float = 0.0,
+) -> Dict[str, List[MatchCandidate]]:
+    """Return ranked long-form candidates for every Short of a channel.
+
+    The index over ``videos`` is built once and shared by all Shorts.
+    """
+    index = TitleIndex(videos)
+    results = {}
+    for short in shorts:
+        short_id, title, _ = video_fields(short)
+        results[short_id] = index.candidates(title, limit=limit, min_score=min_score)
+    logger.info(
+        "Ranked candidates for %d shorts against %d videos", len(results), len(index)
+    )
+    return results
+
 
+def _as_video(video: Any) -> Any:
+    """Treat a bare video ID as a record without title or description."""
+    return {"id": video} if isinstance(video, str) else video
 
-def map_shorts_to_full(shorts: List[str], full_videos: List[str]) -> Dict[str, str]:
-    """Placeholder for mapping shorts to full videos."""
+
+def _channel_of(video: Any) -> Optional[str]:
+    return (
+        video.get("channel_id")
+        if isinstance(video, dict)
+        else getattr(video, "channel_id", None)
+    )
+
+
+def map_shorts_to_full(
+    shorts: Iterable[Any],
+    full_videos: Iterable[Any],
+    fetch_comments: Optional[CommentFetcher] = None,
+    fetch_transcript: Optional[TranscriptFetcher] = None,
+    cascade: Optional[MappingCascade] = None,
+    fetch_transcripts: Optional[BatchTranscriptFetcher] = None,
+) -> Dict[str, str]:
+    """Map Shorts to the long-form videos they were cut from.
+
+    Shorts and long videos may be dicts, :class:`VideoMetadata` records or
+    bare video IDs.  They are grouped by ``channel_id`` and every channel's
+    Shorts go through the cascade of README steps 3a–3d together: description
+    links, owner comments (with ``fetch_comments``), titles and transcripts
+    (with ``fetch_transcript`` or the batch ``fetch_transcripts``).  Pass a
+    :class:`MappingCascade` to use other strategies or to read its
+    per-strategy statistics afterwards.
+
+    Returns the long video ID of every mapped Short, keyed by Short ID.
+    """
+    shorts = [_as_video(short) for short in shorts]
     logger.info("Mapping %d shorts to full videos", len(shorts))
-    # TODO: Implement mapping logic using description, comments, search, and transcripts
-    return {}
+    if cascade is None:
+        cascade = MappingCascade(
+            default_strategies(fetch_comments, fetch_transcript, fetch_transcripts)
+        )
+    longs_by_channel: Dict[Optional[str], List[Any]] = defaultdict(list)
+    for video in full_videos:
+        video = _as_video(video)
+        longs_by_channel[_channel_of(video)].append(video)
+    shorts_by_channel: Dict[Optional[str], List[Any]] = defaultdict(list)
+    for short in shorts:
+        shorts_by_channel[_channel_of(short)].append(short)
+
+    mapping: Dict[str, str] = {}
+    for channel_id, channel_shorts in shorts_by_channel.items():
+        matches = cascade.map_channel(
+            channel_shorts, longs_by_channel.get(channel_id, [])
+        )
+        mapping.update(
+            {short_id: match.video_id for short_id, match in matches.items()}
+        )
+    for stats in cascade.report():
+        logger.info(
+            "Strategy %s: %d/%d hits, %.3fs, %d API units",
+            stats["name"],
+            stats["hits"],
+            stats["attempted"],
+            stats["seconds"],
+            stats["api_units"],
+        )
+    return mapping
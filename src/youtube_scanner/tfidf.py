@@ -0,0 +1,254 @@
+"""Batch TF-IDF scoring of a channel's Shorts against its long-form videos.
+
+Per-Short lookups (:class:`~.title_index.TitleIndex`) are cheap but consider
+one signal at a time.  :class:`TfidfScorer` combines the title, description
+and, when available, transcript of every video into one weighted TF-IDF
+vector and scores all Shorts of a channel against all long videos at once.
+Vectors are L2-normalised, so the cosine similarities of every pair come out
+of a single sparse matrix product ``shorts @ longs.T``.
+
+The product uses :mod:`scipy.sparse` when it is installed (the ``fast``
+extra).  Otherwise each Short walks an inverted index of the long videos'
+terms, which gives the same scores with more Python-level work.
+"""
+
+import heapq
+import logging
+import math
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from .title_index import DESCRIPTION_WEIGHT, MatchCandidate, tokenize, video_fields
+
+try:  # pragma: no cover - optional dependency
+    import numpy
+    from scipy import sparse
+except ImportError:  # pragma: no cover - optional dependency
+    numpy = None  # type: ignore[assignment]
+    sparse = None
+
+logger = logging.getLogger(__name__)
+
+SOURCE_TFIDF = "tfidf"
+
+# Weight of a transcript term relative to a title term
+TRANSCRIPT_WEIGHT = 0.5
+
+Transcripts = Mapping[str, Sequence[str]]
+
+
+def term_weights(
+    video: Any,
+    transcript: Optional[Sequence[str]] = None,
+    description_weight: float = DESCRIPTION_WEIGHT,
+    transcript_weight: float = TRANSCRIPT_WEIGHT,
+) -> Dict[str, float]:
+    """Return the weighted term frequencies of one video."""
+    _, title, description = video_fields(video)
+    weights = {token: float(count) for token, count in Counter(tokenize(title)).items()}
+    for token, count in Counter(tokenize(description)).items():
+        weights[token] = weights.get(token, 0.0) + description_weight * count
+    if transcript:
+        for token, count in Counter(tokenize(" ".join(transcript))).items():
+            weights[token] = weights.get(token, 0.0) + transcript_weight * count
+    return weights
+
+
+class TfidfScorer:
+    """TF-IDF vectors of long-form videos, scored in bulk against Shorts.
+
+    Args:
+        videos: Long-form videos as dicts or :class:`VideoMetadata` records.
+        transcripts: Optional caption lines keyed by video ID.
+        description_weight: Weight of description terms.
+        transcript_weight: Weight of transcript terms.
+    """
+
+    def __init__(
+        self,
+        videos: Iterable[Any],
+        transcripts: Optional[Transcripts] = None,
+        description_weight: float = DESCRIPTION_WEIGHT,
+        transcript_weight: float = TRANSCRIPT_WEIGHT,
+    ) -> None:
+        self.description_weight = description_weight
+        self.transcript_weight = transcript_weight
+        self.videos: List[Any] = []
+        self._ids: List[str] = []
+        documents: List[Dict[str, float]] = []
+        for video in videos:
+            video_id = video_fields(video)[0]
+            self.videos.append(video)
+            self._ids.append(video_id)
+            documents.append(self._weights(video, transcripts))
+
+        frequencies: Counter = Counter()
+        for weights in documents:
+            frequencies.update(weights.keys())
+        self.vocabulary: Dict[str, int] = {
+            token: column for column, token in enumerate(frequencies)
+        }
+        count = len(documents)
+        self._idf = [
+            math.log((1 + count) / (1 + frequencies[token])) + 1
+            for token in self.vocabulary
+        ]
+        self._unseen_idf = math.log(1 + count) + 1
+
+        rows = [self._vector(weights) for weights in documents]
+        if sparse is not None:
+            self._matrix = self._sparse(rows)
+        else:
+            self._postings: Dict[int, List[Tuple[int, float]]] = defaultdict(list)
+            for doc, row in enumerate(rows):
+                for column, value in row:
+                    self._postings[column].append((doc, value))
+        logger.info(
+            "Built TF-IDF vectors for %d videos (%d terms)", count, len(self.vocabulary)
+        )
+
+    @property
+    def backend(self) -> str:
+        return "scipy" if sparse is not None else "python"
+
+    def __len__(self) -> int:
+        return len(self.videos)
+
+    def _weights(
+        self, video: Any, transcripts: Optional[Transcripts]
+    ) -> Dict[str, float]:
+        transcript = transcripts.get(video_fields(video)[0]) if transcripts else None
+        return term_weights(
+            video, transcript, self.description_weight, self.transcript_weight
+        )
+
+    def _vector(self, weights: Dict[str, float]) -> List[Tuple[int, float]]:
+        """Return the L2-normalised ``(column, value)`` pairs of a document.
+
+        Terms outside the vocabulary cannot match anything but still count
+        towards the norm, so a Short with many unknown words scores lower.
+        """
+        row: List[Tuple[int, float]] = []
+        norm = 0.0
+        for token, weight in weights.items():
+            column = self.vocabulary.get(token)
+            value = weight * (
+                self._idf[column] if column is not None else self._unseen_idf
+            )
+            norm += value * value
+            if column is not None:
+                row.append((column, value))
+        if not norm:
+            return []
+        norm = math.sqrt(norm)
+        return [(column, value / norm) for column, value in row]
+
+    def _sparse(self, rows: List[List[Tuple[int, float]]]) -> Any:
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        for row in rows:
+            for column, value in row:
+                indices.append(column)
+                data.append(value)
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (
+                numpy.array(data, dtype=float),
+                numpy.array(indices, dtype=numpy.int64),
+                indptr,
+            ),
+            shape=(len(rows), len(self.vocabulary)),
+        )
+
+    def score(
+        self,
+        shorts: Iterable[Any],
+        transcripts: Optional[Transcripts] = None,
+        limit: int = 5,
+        min_score: float = 0.0,
+    ) -> Dict[str, List[MatchCandidate]]:
+        """Return up to ``limit`` candidates per Short, best first.
+
+        Scores are cosine similarities between ``0`` and ``1``; candidates
+        scoring below ``min_score`` or zero are left out.
+        """
+        short_ids: List[str] = []
+        rows: List[List[Tuple[int, float]]] = []
+        for short in shorts:
+            short_ids.append(video_fields(short)[0])
+            rows.append(self._vector(self._weights(short, transcripts)))
+        if not short_ids:
+            return {}
+        if sparse is not None:
+            ranked = self._rank_sparse(rows, limit)
+        else:
+            ranked = self._rank_postings(rows, limit)
+        results = {}
+        for short_id, matches in zip(short_ids, ranked):
+            results[short_id] = [
+                MatchCandidate(
+                    self._ids[doc], min(1.0, score), SOURCE_TFIDF, self.videos[doc]
+                )
+                for doc, score in matches
+                if score > 0 and score >= min_score
+            ]
+        logger.info(
+            "Scored %d shorts against %d videos", len(short_ids), len(self.videos)
+        )
+        return results
+
+    def _rank_sparse(
+        self, rows: List[List[Tuple[int, float]]], limit: int
+    ) -> List[List[Tuple[int, float]]]:
+        similarities = (self._sparse(rows) @ self._matrix.T).tocsr()
+        ranked = []
+        for row in range(similarities.shape[0]):
+            start, end = similarities.indptr[row], similarities.indptr[row + 1]
+            scores = similarities.data[start:end]
+            docs = similarities.indices[start:end]
+            if len(scores) > limit:
+                # Keep everything tied with the limit-th score so that ties
+                # are broken by document order, as in the fallback
+                kth = -numpy.partition(-scores, limit - 1)[limit - 1]
+                keep = scores >= kth
+                scores, docs = scores[keep], docs[keep]
+            order = numpy.lexsort((docs, -scores))[:limit]
+            ranked.append([(int(docs[i]), float(scores[i])) for i in order])
+        return ranked
+
+    def _rank_postings(
+        self, rows: List[List[Tuple[int, float]]], limit: int
+    ) -> List[List[Tuple[int, float]]]:
+        ranked = []
+        for row in rows:
+            scores: Dict[int, float] = defaultdict(float)
+            for column, value in row:
+                for doc, weight in self._postings.get(column, ()):
+                    scores[doc] += value * weight
+            ranked.append(
+                heapq.nsmallest(
+                    limit, scores.items(), key=lambda item: (-item[1], item[0])
+                )
+            )
+        return ranked
+
+
+def rank_tfidf_candidates(
+    shorts: Iterable[Any],
+    videos: Iterable[Any],
+    transcripts: Optional[Transcripts] = None,
+    limit: int = 5,
+    min_score: float = 0.0,
+) -> Dict[str, List[MatchCandidate]]:
+    """Score every Short against every long video of a channel in one batch.
+
+    ``transcripts`` maps video IDs of Shorts and long videos alike to their
+    caption lines; videos without an entry are scored on metadata only.
+    """
+    return TfidfScorer(videos, transcripts).score(
+        shorts, transcripts, limit=limit, min_score=min_score
+    )
+
+
+__all__ = ["SOURCE_TFIDF", "TfidfScorer", "rank_tfidf_candidates", "term_weights"]
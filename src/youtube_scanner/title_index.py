@@ -0,0 +1,184 @@
+"""Inverted token index over long-form titles and descriptions.
+
+A :class:`TitleIndex` is built once per channel from its long-form videos.
+Querying it with a Short scores only the videos that share at least one token
+with the Short's title, so mapping every Short of a channel costs time
+proportional to the matching postings instead of ``shorts × videos`` string
+comparisons.  Exact (case-insensitive) title matches always rank first.
+"""
+
+import heapq
+import logging
+import math
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Relation sources reported for matches
+SOURCE_TITLE_EXACT = "title_exact"
+SOURCE_TITLE = "title"
+SOURCE_DESCRIPTION = "description"
+
+# Weight of a description token relative to a title token
+DESCRIPTION_WEIGHT = 0.3
+# Minimum score for a fuzzy match to be accepted as the mapping of a Short
+DEFAULT_MIN_SCORE = 0.5
+
+_TOKEN = re.compile(r"[^\W_]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how i in is it my of on or the this to we what "
+    "why with you your shorts short".split()
+)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Return the lowercase word tokens of ``text`` without stopwords."""
+    if not text:
+        return []
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def video_fields(video: Any) -> Tuple[str, str, str]:
+    """Return ``(video_id, title, description)`` of a dict or ``VideoMetadata``."""
+    if isinstance(video, dict):
+        return (
+            video.get("id") or video.get("video_id") or "",
+            video.get("title") or "",
+            video.get("description") or "",
+        )
+    return video.video_id, video.title or "", video.description or ""
+
+
+@dataclass
+class MatchCandidate:
+    """A long-form video proposed as the source of a Short.
+
+    Attributes:
+        video_id: Identifier of the long-form video.
+        score: Match strength between ``0`` and ``1``.
+        relation_source: Which signal produced the match.
+        video: The indexed video object itself.
+    """
+
+    video_id: str
+    score: float
+    relation_source: str
+    video: Any = None
+
+
+class TitleIndex:
+    """Token index over the titles and descriptions of long-form videos.
+
+    Each token of a Short's title contributes its inverse document frequency
+    when it appears in a video's title, or ``DESCRIPTION_WEIGHT`` times that
+    when it only appears in the description.  Scores are normalised by the
+    total weight of the Short's tokens.
+
+    Args:
+        videos: Long-form videos as dicts (``id``/``title``/``description``)
+            or :class:`VideoMetadata` records.
+    """
+
+    def __init__(self, videos: Iterable[Any]) -> None:
+        self.videos: List[Any] = []
+        self._ids: List[str] = []
+        self._exact: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        for video in videos:
+            doc = len(self.videos)
+            video_id, title, description = video_fields(video)
+            self.videos.append(video)
+            self._ids.append(video_id)
+            self._exact.setdefault(title.strip().lower(), doc)
+            for token in set(tokenize(description)):
+                self._postings[token][doc] = DESCRIPTION_WEIGHT
+            for token in set(tokenize(title)):
+                self._postings[token][doc] = 1.0
+        self._idf = {
+            token: math.log(1 + len(self.videos) / len(docs))
+            for token, docs in self._postings.items()
+        }
+        # Tokens seen nowhere are as rare as a token in a single document
+        self._unseen_idf = math.log(1 + max(1, len(self.videos)))
+
+    @classmethod
+    def per_channel(cls, videos: Iterable[Any]) -> Dict[Optional[str], "TitleIndex"]:
+        """Build one index per ``channel_id`` of the given videos."""
+        groups: Dict[Optional[str], List[Any]] = defaultdict(list)
+        for video in videos:
+            channel_id = (
+                video.get("channel_id") if isinstance(video, dict) else video.channel_id
+            )
+            groups[channel_id].append(video)
+        return {channel_id: cls(group) for channel_id, group in groups.items()}
+
+    def __len__(self) -> int:
+        return len(self.videos)
+
+    def candidates(
+        self, title: str, limit: int = 5, min_score: float = 0.0
+    ) -> List[MatchCandidate]:
+        """Return up to ``limit`` videos matching ``title``, best first."""
+        results: List[MatchCandidate] = []
+        exact = self._exact.get(title.strip().lower()) if title.strip() else None
+        if exact is not None:
+            results.append(
+                MatchCandidate(
+                    self._ids[exact], 1.0, SOURCE_TITLE_EXACT, self.videos[exact]
+                )
+            )
+
+        tokens = set(tokenize(title))
+        total = sum(self._idf.get(token, self._unseen_idf) for token in tokens)
+        if total:
+            scores: Dict[int, float] = defaultdict(float)
+            title_scores: Dict[int, float] = defaultdict(float)
+            for token in tokens:
+                idf = self._idf.get(token)
+                if idf is None:
+                    continue
+                for doc, weight in self._postings[token].items():
+                    scores[doc] += weight * idf
+                    if weight == 1.0:
+                        title_scores[doc] += idf
+            # One extra in case the exact match is among the best token matches
+            ranked = heapq.nlargest(limit + 1, scores.items(), key=lambda item: item[1])
+            for doc, score in ranked:
+                if len(results) >= limit:
+                    break
+                score /= total
+                if score < min_score:
+                    break
+                if doc == exact:
+                    continue
+                source = (
+                    SOURCE_TITLE
+                    if title_scores[doc] * 2 >= scores[doc]
+                    else SOURCE_DESCRIPTION
+                )
+                results.append(
+                    MatchCandidate(self._ids[doc], score, source, self.videos[doc])
+                )
+        return results[:limit]
+
+    def best(
+        self, title: str, min_score: float = DEFAULT_MIN_SCORE
+    ) -> Optional[MatchCandidate]:
+        """Return the best match for ``title`` scoring at least ``min_score``."""
+        found = self.candidates(title, limit=1, min_score=min_score)
+        return found[0] if found else None
+
+
+__all__ = [
+    "DEFAULT_MIN_SCORE",
+    "MatchCandidate",
+    "SOURCE_DESCRIPTION",
+    "SOURCE_TITLE",
+    "SOURCE_TITLE_EXACT",
+    "TitleIndex",
+    "tokenize",
+    "video_fields",
+]
@@ -0,0 +1,152 @@
+"""Locate a Short's clip inside a long video's timed transcript.
+
+The README's verification step needs to know *where* in the long video a Short
+was cut from.  :func:`align_transcripts` finds the Short's words inside the
+long transcript with a Rabin–Karp rolling hash: every ``window``-word window
+of the Short is hashed into a table, and one pass over the long transcript
+updates its window hash in constant time per word and looks it up there.
+Hits are verified by comparing the words themselves, so hash collisions are
+never counted.  Each verified hit votes for an offset between the two
+transcripts, and the offset with most votes (allowing a few words of drift
+for transcription differences) gives the clip.
+
+Hashing both transcripts takes time linear in their length.  Verification
+adds ``window`` word comparisons per hit, so transcripts that repeat the same
+phrase many times (a chorus, a catchphrase) cost up to the product of the
+repetitions in both.
+"""
+
+import logging
+import zlib
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from .models import TimedTranscript
+from .transcript_index import transcript_words
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW = 6
+DEFAULT_DRIFT = 3
+DEFAULT_MIN_CONFIDENCE = 0.3
+
+# Rolling hash over word hashes modulo a Mersenne prime
+_MODULUS = (1 << 61) - 1
+_BASE = 1_000_003
+
+
+@dataclass
+class Alignment:
+    """Where a Short's transcript was found in a long transcript.
+
+    Attributes:
+        start: Start of the clip in the long video, in seconds.
+        end: End of the clip in the long video, in seconds.
+        confidence: Fraction of the Short's word windows found at this
+            position, between ``0`` and ``1``.
+        first_line: Index of the first matched line of the long transcript.
+        last_line: Index of the last matched line of the long transcript.
+    """
+
+    start: float
+    end: float
+    confidence: float
+    first_line: int
+    last_line: int
+
+
+def _words_with_lines(lines: Iterable[str]) -> Tuple[List[str], List[int], List[int]]:
+    """Return the words of ``lines``, their hashes and the line of each word."""
+    words: List[str] = []
+    hashes: List[int] = []
+    owners: List[int] = []
+    for number, line in enumerate(lines):
+        for word in transcript_words([line]):
+            words.append(word)
+            hashes.append(zlib.crc32(word.encode("utf-8")))
+            owners.append(number)
+    return words, hashes, owners
+
+
+def _window_hashes(words: Sequence[int], window: int) -> Iterable[Tuple[int, int]]:
+    """Yield ``(position, hash)`` of every ``window``-word window of ``words``."""
+    if len(words) < window:
+        return
+    top = pow(_BASE, window - 1, _MODULUS)
+    value = 0
+    for word in words[:window]:
+        value = (value * _BASE + word) % _MODULUS
+    yield 0, value
+    for position in range(1, len(words) - window + 1):
+        value = (value - words[position - 1] * top) % _MODULUS
+        value = (value * _BASE + words[position + window - 1]) % _MODULUS
+        yield position, value
+
+
+def align_transcripts(
+    short: Union[TimedTranscript, Sequence[str]],
+    long: TimedTranscript,
+    window: int = DEFAULT_WINDOW,
+    drift: int = DEFAULT_DRIFT,
+    min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+) -> Optional[Alignment]:
+    """Return where ``short`` occurs in ``long``, or ``None``.
+
+    Args:
+        short: The Short's transcript; its timing is not needed.
+        long: Timed transcript of the long-form video.
+        window: Words per hashed window.  Shorter windows tolerate noisier
+            transcripts but match common phrases by chance more often.
+        drift: Offsets within this many words of the best one count towards
+            the same alignment, absorbing inserted or dropped words.
+        min_confidence: Minimum fraction of the Short's windows that must be
+            found for an alignment to be reported.
+    """
+    short_lines = short.lines if isinstance(short, TimedTranscript) else short
+    short_words, short_hashes, _ = _words_with_lines(short_lines)
+    long_words, long_hashes, owners = _words_with_lines(long.lines)
+    total = len(short_words) - window + 1
+    if total <= 0 or len(long_words) < window:
+        return None
+
+    table: Dict[int, List[int]] = defaultdict(list)
+    for position, value in _window_hashes(short_hashes, window):
+        table[value].append(position)
+
+    # offset -> positions of the Short whose window was found at that offset
+    votes: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+    for long_position, value in _window_hashes(long_hashes, window):
+        for short_position in table.get(value, ()):
+            if (
+                long_words[long_position : long_position + window]
+                == short_words[short_position : short_position + window]
+            ):
+                votes[long_position - short_position].append(
+                    (short_position, long_position)
+                )
+    if not votes:
+        return None
+
+    counts = Counter({offset: len(hits) for offset, hits in votes.items()})
+    best = max(
+        counts,
+        key=lambda offset: sum(
+            counts.get(offset + delta, 0) for delta in range(-drift, drift + 1)
+        ),
+    )
+    hits = [
+        hit for delta in range(-drift, drift + 1) for hit in votes.get(best + delta, ())
+    ]
+    confidence = len({short_position for short_position, _ in hits}) / total
+    if confidence < min_confidence:
+        return None
+
+    first_word = min(long_position for _, long_position in hits)
+    last_word = max(long_position for _, long_position in hits) + window - 1
+    first_line, last_line = owners[first_word], owners[last_word]
+    start, end = long.span(first_line, last_line)
+    return Alignment(start, end, min(1.0, confidence), first_line, last_line)
+
+
+__all__ = ["Alignment", "DEFAULT_MIN_CONFIDENCE", "align_transcripts"]
@@ -0,0 +1,181 @@
+"""Word n-gram index over long-form transcripts (README step 3d).
+
+A Short cut from a long video repeats a stretch of the long video's spoken
+text.  :class:`TranscriptIndex` hashes every ``ngram``-word shingle of each
+long-form transcript and keeps a content-defined sample of them (those whose
+hash is divisible by ``sample``).  Because the sample depends only on the
+shingle itself, the same shingles are kept on the query side.  Querying with a
+Short's transcript then looks up its sampled shingles and reports, per long
+video, the fraction of them found there (the coverage).
+
+Postings are kept as one sorted array of ``hash << 32 | document`` keys, which
+costs 8 bytes per sampled shingle.  A channel with thousands of hour-long
+transcripts therefore fits in tens of megabytes, and a lookup is one binary
+search per query shingle.
+"""
+
+import logging
+import re
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+from .title_index import MatchCandidate
+
+try:  # pragma: no cover - optional dependency
+    import numpy
+except ImportError:  # pragma: no cover - optional dependency
+    numpy = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+SOURCE_TRANSCRIPT = "transcript"
+
+DEFAULT_NGRAM = 5
+DEFAULT_SAMPLE = 4
+DEFAULT_MIN_COVERAGE = 0.3
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def transcript_words(transcript: Iterable[str]) -> List[str]:
+    """Return the lowercase words of a transcript given as caption lines."""
+    return _WORD.findall(" ".join(transcript).lower())
+
+
+def shingle_hashes(
+    words: List[str], ngram: int = DEFAULT_NGRAM, sample: int = DEFAULT_SAMPLE
+) -> Set[int]:
+    """Return the sampled 32-bit hashes of the ``ngram``-word shingles."""
+    hashes = set()
+    for start in range(len(words) - ngram + 1):
+        value = zlib.crc32(" ".join(words[start : start + ngram]).encode("utf-8"))
+        if value % sample == 0:
+            hashes.add(value)
+    return hashes
+
+
+class TranscriptIndex:
+    """Sampled shingle index over the transcripts of long-form videos.
+
+    Args:
+        ngram: Words per shingle.  Longer shingles are more specific but
+            miss matches whose transcription differs more often.
+        sample: Keep one in ``sample`` shingles on average.
+    """
+
+    def __init__(
+        self, ngram: int = DEFAULT_NGRAM, sample: int = DEFAULT_SAMPLE
+    ) -> None:
+        self.ngram = ngram
+        self.sample = sample
+        self._ids: List[str] = []
+        self._keys = array("Q")
+        self._pending = array("Q")
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def postings(self) -> int:
+        return len(self._keys) + len(self._pending)
+
+    def add(self, video_id: str, transcript: Iterable[str]) -> None:
+        """Index the transcript of ``video_id``, given as caption lines."""
+        doc = len(self._ids)
+        self._ids.append(video_id)
+        words = transcript_words(transcript)
+        hashes = shingle_hashes(words, self.ngram, self.sample)
+        self._pending.extend(value << 32 | doc for value in hashes)
+
+    @classmethod
+    def build(
+        cls,
+        video_ids: Iterable[str],
+        fetch: Callable[[str], List[str]],
+        ngram: int = DEFAULT_NGRAM,
+        sample: int = DEFAULT_SAMPLE,
+    ) -> "TranscriptIndex":
+        """Index the transcripts of ``video_ids`` as returned by ``fetch``.
+
+        ``fetch`` is typically ``transcript_fetcher.fetch_transcript``; videos
+        without a transcript are indexed with no shingles.
+        """
+        index = cls(ngram, sample)
+        for video_id in video_ids:
+            index.add(video_id, fetch(video_id))
+        logger.info("Indexed %d transcripts (%d shingles)", len(index), index.postings)
+        return index
+
+    def _freeze(self) -> None:
+        """Merge pending postings into the sorted key array."""
+        if not self._pending:
+            return
+        if numpy is not None:
+            merged = numpy.concatenate(
+                [
+                    numpy.frombuffer(self._keys, dtype=numpy.uint64),
+                    numpy.frombuffer(self._pending, dtype=numpy.uint64),
+                ]
+            )
+            merged.sort()
+            self._keys = array("Q", merged.tobytes())
+        else:
+            self._keys.extend(self._pending)
+            self._keys = array("Q", sorted(self._keys))
+        self._pending = array("Q")
+
+    def _documents(self, value: int) -> Iterable[int]:
+        keys = self._keys
+        position = bisect_left(keys, value << 32)
+        upper = (value + 1) << 32
+        while position < len(keys) and keys[position] < upper:
+            yield keys[position] & 0xFFFFFFFF
+            position += 1
+
+    def query(
+        self,
+        transcript: Iterable[str],
+        limit: int = 5,
+        min_coverage: float = DEFAULT_MIN_COVERAGE,
+        exclude: Optional[str] = None,
+    ) -> List[MatchCandidate]:
+        """Return the long videos containing most of ``transcript``.
+
+        The score of each match is its coverage: the fraction of the query's
+        sampled shingles that occur in the long video's transcript.
+
+        Args:
+            transcript: Caption lines of the Short.
+            limit: Maximum number of matches.
+            min_coverage: Minimum coverage of a reported match.
+            exclude: Video ID to leave out, e.g. the Short itself.
+        """
+        self._freeze()
+        hashes = shingle_hashes(transcript_words(transcript), self.ngram, self.sample)
+        if not hashes:
+            return []
+        hits: Counter = Counter()
+        for value in hashes:
+            hits.update(set(self._documents(value)))
+        matches: List[Tuple[int, float]] = []
+        for doc, count in hits.items():
+            coverage = count / len(hashes)
+            if coverage >= min_coverage and self._ids[doc] != exclude:
+                matches.append((doc, coverage))
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return [
+            MatchCandidate(self._ids[doc], coverage, SOURCE_TRANSCRIPT)
+            for doc, coverage in matches[:limit]
+        ]
+
+
+__all__ = [
+    "DEFAULT_MIN_COVERAGE",
+    "SOURCE_TRANSCRIPT",
+    "TranscriptIndex",
+    "shingle_hashes",
+    "transcript_words",
+]
@@ -0,0 +1,73 @@
+import pytest
+
+from benchmarks import SyntheticDataset, compare, parse_size
+from benchmarks.harness import percentile, run_benchmarks, run_stage
+from benchmarks.stages import classify, parse
+
+
+def test_parse_size():
+    assert parse_size("1k") == 1_000
+    assert parse_size("100k") == 100_000
+    assert parse_size("1M") == 1_000_000
+    with pytest.raises(ValueError):
+        parse_size("lots")
+
+
+def test_dataset_is_lazy_and_deterministic():
+    dataset = SyntheticDataset(2_500, channel_size=1_000)
+    channels = list(dataset.channels())
+    assert [c.video_count for c in channels] == [1_000, 1_000, 500]
+    assert sum(1 for _ in dataset.video_items(limit=120)) == 120
+
+    channel = channels[0]
+    short = next(p for p in range(100) if channel.is_short(p))
+    source = dataset.transcript(channel, channel.source_position(short))
+    excerpt = dataset.transcript(channel, short)
+    assert excerpt and " ".join(excerpt) in " ".join(source)
+    assert dataset.transcript(channel, short) == SyntheticDataset(2_500).transcript(
+        channel, short
+    )
+
+
+def test_percentile_nearest_rank():
+    samples = list(range(1, 101))
+    assert percentile(samples, 0.5) == 50
+    assert percentile(samples, 0.99) == 99
+    assert percentile([], 0.5) == 0.0
+
+
+def test_run_stage_reports_throughput_and_memory():
+    result = run_stage(parse, SyntheticDataset(120))
+    assert result.items == 120
+    assert result.operations == 3
+    assert result.throughput > 0
+    assert result.p50_ms <= result.p95_ms <= result.p99_ms
+    assert result.peak_memory > 0
+
+
+def test_compare_flags_regressions():
+    baseline = run_benchmarks({"classify": classify}, [100], memory=False)
+    current = {
+        "results": {"100": {"classify": dict(baseline["results"]["100"]["classify"])}}
+    }
+    assert compare(current, baseline) == []
+    current["results"]["100"]["classify"]["throughput"] /= 2
+    current["results"]["100"]["classify"]["p95_ms"] *= 2
+    regressions = compare(current, baseline)
+    assert len(regressions) == 2
+    assert all(line.startswith("classify@100") for line in regressions)
+
+
+def test_fetch_stage_restores_the_callers_client():
+    import http_client
+    import quota
+    from benchmarks.stages import fetch
+
+    client = http_client.configure(budget=quota.QuotaBudget(daily_budget=10))
+    try:
+        result = run_stage(fetch, SyntheticDataset(120))
+        assert result.items == 120
+        assert http_client.get_client() is client
+        assert client.budget.spent_by_endpoint() == {}
+    finally:
+        http_client.configure()
@@ -0,0 +1,83 @@
+import threading
+import time
+from unittest.mock import patch
+
+from youtube_api import VideoBatchResult
+from youtube_scanner.channel_fetcher import fetch_channel_videos, iter_channel_videos
+from youtube_scanner.models import VideoMetadata
+
+
+def _batch(ids, missing=()):
+    return VideoBatchResult(
+        videos={
+            vid: VideoMetadata(video_id=vid, title=vid)
+            for vid in ids
+            if vid not in missing
+        },
+        missing=[vid for vid in ids if vid in missing],
+    )
+
+
+def test_fetch_channel_videos_pages_uploads_and_returns_records(caplog):
+    with patch(
+        "youtube_api.iter_uploads_playlist_pages",
+        return_value=iter([["a", "b"], ["c"]]),
+    ) as pages, patch(
+        "youtube_api.fetch_videos_batch",
+        side_effect=lambda ids, key: _batch(ids, missing={"c"}),
+    ) as batch:
+        with caplog.at_level("WARNING"):
+            result = fetch_channel_videos("KEY", "CHANNEL")
+
+    pages.assert_called_once_with("CHANNEL", "KEY", since=None, walk=None)
+    assert [call.args[0] for call in batch.call_args_list] == [["a", "b"], ["c"]]
+    assert [video.video_id for video in result] == ["a", "b"]
+    assert "Missing metadata for 1 videos of CHANNEL" in caplog.text
+
+
+def test_iter_channel_videos_enriches_pages_while_later_pages_download():
+    first_enriched = threading.Event()
+    downloaded_while_enriching = []
+
+    def slow_pages(channel_id, api_key, since=None, walk=None):
+        yield ["a"]
+        time.sleep(0.05)
+        downloaded_while_enriching.append(not first_enriched.is_set())
+        yield ["b"]
+
+    def enrich(ids, api_key):
+        time.sleep(0.1)
+        first_enriched.set()
+        return _batch(ids)
+
+    with patch(
+        "youtube_api.iter_uploads_playlist_pages", side_effect=slow_pages
+    ), patch("youtube_api.fetch_videos_batch", side_effect=enrich):
+        pages = [
+            [v.video_id for v in page] for page in iter_channel_videos("KEY", "CHANNEL")
+        ]
+
+    assert pages == [["a"], ["b"]]
+    assert downloaded_while_enriching == [True]
+
+
+def test_fetch_channel_videos_records_failed_ids_in_walk():
+    from youtube_api import UploadsWalk
+
+    def pages(channel_id, api_key, since=None, walk=None):
+        yield ["a", "b"]
+        walk.complete = True
+
+    def enrich(ids, api_key):
+        return VideoBatchResult(
+            videos={"a": VideoMetadata(video_id="a", title="a")}, failed=["b"]
+        )
+
+    walk = UploadsWalk()
+    with patch("youtube_api.iter_uploads_playlist_pages", side_effect=pages), patch(
+        "youtube_api.fetch_videos_batch", side_effect=enrich
+    ):
+        result = fetch_channel_videos("KEY", "CHANNEL", walk=walk)
+
+    assert [video.video_id for video in result] == ["a"]
+    assert walk.complete and walk.failed == ["b"] and not walk.ok
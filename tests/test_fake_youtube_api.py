@@ -0,0 +1,136 @@
+import pytest
+
+import fake_youtube_api
+import http_client
+import quota
+import youtube_api
+from fake_youtube_api import FakeYouTubeAPI, SyntheticChannel
+
+
+@pytest.fixture
+def api():
+    server = FakeYouTubeAPI([SyntheticChannel(0, 120), SyntheticChannel(1, 30)]).start()
+    http_client.configure(conditional=False)
+    http_client.set_base_url(server.base_url)
+    try:
+        yield server
+    finally:
+        http_client.set_base_url(None)
+        http_client.configure()
+        server.stop()
+
+
+def test_synthetic_channel_is_deterministic():
+    channel = SyntheticChannel(3, 100, seed=7)
+    assert channel.video(5) == SyntheticChannel(3, 100, seed=7).video(5)
+    assert channel.video_id(5) == "00030000005"
+    assert channel.uploads_playlist_id == "UU" + channel.channel_id[2:]
+    shorts = [pos for pos in range(100) if channel.is_short(pos)]
+    assert 20 < len(shorts) < 60
+    source = channel.source_position(shorts[0])
+    assert source is not None and not channel.is_short(source)
+
+
+def test_fetchers_page_through_fake_server(api):
+    channel = api.channels[0]
+    ids = youtube_api.fetch_uploads_playlist_video_ids(channel.channel_id, "key")
+    assert ids == [channel.video_id(pos) for pos in range(120)]
+    assert api.requests["playlistItems"] == 3
+
+    batch = youtube_api.fetch_videos_batch(ids[:60] + ["99990000000"], "key")
+    assert len(batch.videos) == 60
+    assert batch.missing == ["99990000000"]
+    shorts = {vid for vid, video in batch.videos.items() if video.is_short}
+    assert shorts == {
+        channel.video_id(pos) for pos in range(60) if channel.is_short(pos)
+    }
+
+
+def test_quota_limit_injects_quota_exceeded(api):
+    api.quota_limit = 2
+    channel = api.channels[0]
+    batch = youtube_api.fetch_videos_batch(
+        [channel.video_id(pos) for pos in range(150)], "key"
+    )
+    assert len(batch.videos) == 100
+    assert len(batch.failed) == 50
+    assert api.units_used == 2 * quota.endpoint_cost("videos")
+
+
+def test_error_rate_and_etags(api):
+    client = http_client.HttpClient()
+    url = http_client.api_url("channels")
+    params = {"id": api.channels[1].channel_id, "part": "contentDetails"}
+    first = client.get(url, params=params)
+    second = client.get(url, params=params)
+    assert second.json() == first.json()
+    assert client.etag_store.stats()["hits"] == 1
+
+    api.error_rate = 1.0
+    assert (
+        client.get(http_client.api_url("videos"), params={"id": "x"}).status_code == 500
+    )
+
+
+def test_malformed_parameters_get_a_400_error_payload(api):
+    client = http_client.HttpClient(conditional=False)
+    playlist = api.channels[0].uploads_playlist_id
+    for params, reason in [
+        ({"playlistId": playlist, "pageToken": "bogus"}, "invalidPageToken"),
+        ({"playlistId": playlist, "maxResults": "ten"}, "invalidParameter"),
+    ]:
+        response = client.get(http_client.api_url("playlistItems"), params=params)
+        assert response.status_code == 400
+        assert http_client.error_reason(response) == reason
+
+
+def test_comment_threads_link_shorts_without_description_link():
+    channel = SyntheticChannel(0, 200, link_ratio=0.0)
+    position = next(pos for pos in range(200) if channel.is_short(pos))
+    threads = channel.comment_threads(position, 20)
+    owner = threads[0]["snippet"]["topLevelComment"]["snippet"]
+    assert owner["authorChannelId"]["value"] == channel.channel_id
+    assert channel.video_id(channel.source_position(position)) in owner["textOriginal"]
+    assert fake_youtube_api.PAGE_SIZE == 50
+
+
+def test_cascade_only_fetches_comments_for_shorts_without_description_link(api):
+    from youtube_scanner.mapping_cascade import MappingCascade, default_strategies
+
+    channel = api.channels[0]
+    batch = youtube_api.fetch_videos_batch(
+        [channel.video_id(pos) for pos in range(120)], "key"
+    )
+    videos = list(batch.videos.values())
+    shorts = [video for video in videos if video.is_short]
+    longs = [video for video in videos if not video.is_short]
+
+    comments = youtube_api.fetch_pinned_comments(
+        [shorts[0].video_id, longs[0].video_id], "key"
+    )
+    assert all(
+        "Great video" not in text for texts in comments.values() for text in texts
+    )
+    assert api.requests["commentThreads"] == 2
+
+    cascade = MappingCascade(
+        default_strategies(lambda ids: youtube_api.fetch_pinned_comments(ids, "key"))
+    )
+    matches = cascade.map_channel(shorts, longs)
+    linked = [short for short in shorts if "youtu.be/" in short.description]
+    assert 0 < len(linked) < len(shorts)
+    # Only Shorts left unmapped by the free description and title steps cost quota
+    unmapped = cascade.stats["pinned_comment"].attempted
+    assert 0 < unmapped < len(shorts) - len(linked)
+    assert api.requests["commentThreads"] == 2 + unmapped
+    for short in shorts:
+        position = int(short.video_id[4:])
+        source = channel.source_position(position)
+        if source is None:
+            continue
+        match = matches[short.video_id]
+        if match.relation_source in ("title", "similar_title"):
+            # Synthetic topics repeat, so a title match only pins down the topic
+            assert channel.topic(int(match.video_id[4:])) == channel.topic(source)
+        else:
+            assert match.video_id == channel.video_id(source)
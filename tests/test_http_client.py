@@ -0,0 +1,90 @@
+from unittest.mock import Mock, patch
+
+import http_client
+
+
+def test_client_pools_connections_and_requests_gzip():
+    client = http_client.HttpClient(pool_size=4)
+    adapter = client.session.get_adapter("https://www.googleapis.com")
+    assert adapter._pool_maxsize == 4
+    assert client.session.headers["Accept-Encoding"] == "gzip"
+    assert client.session.headers["Connection"] == "keep-alive"
+
+    plain = http_client.HttpClient(gzip=False)
+    assert plain.session.headers["Accept-Encoding"] == "identity"
+
+
+def test_shared_client_is_reused_until_reconfigured():
+    first = http_client.get_client()
+    assert http_client.get_client() is first
+    replaced = http_client.configure(pool_size=2, gzip=False)
+    try:
+        assert http_client.get_client() is replaced
+        assert replaced is not first
+    finally:
+        http_client.configure()
+
+
+def test_get_goes_through_session_with_default_timeout():
+    client = http_client.HttpClient(timeout=3)
+    with patch.object(client.session, "get", return_value=Mock()) as mock_get:
+        client.get("https://example.com", params={"a": 1})
+    mock_get.assert_called_once_with("https://example.com", params={"a": 1}, timeout=3)
+
+
+def test_use_client_restores_the_previous_client():
+    previous = http_client.get_client()
+    temporary = http_client.HttpClient()
+    with http_client.use_client(temporary):
+        assert http_client.get_client() is temporary
+    assert http_client.get_client() is previous
+
+
+def _response(status, body=b"", etag=None):
+    import requests
+
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = body
+    if etag:
+        resp.headers["ETag"] = etag
+    return resp
+
+
+def test_conditional_requests_replay_cached_body_on_304():
+    import youtube_api
+
+    client = http_client.HttpClient()
+    body = b'{"items": [{"id": "vid", "snippet": {"title": "Cached"}}]}'
+    responses = [_response(200, body, etag='"v1"'), _response(304)]
+    with patch.object(http_client, "_client", client), patch.object(
+        client.session, "get", side_effect=responses
+    ) as mock_get:
+        first = youtube_api.fetch_video_data("vid", "KEY1")
+        second = youtube_api.fetch_video_data("vid", "KEY2")
+
+    assert first == second
+    assert second["items"][0]["snippet"]["title"] == "Cached"
+    assert "headers" not in mock_get.call_args_list[0].kwargs
+    assert mock_get.call_args_list[1].kwargs["headers"] == {"If-None-Match": '"v1"'}
+    assert client.etag_store.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_etag_store_evicts_least_recently_used():
+    store = http_client.ETagStore(max_entries=2)
+    store.put("a", "1", b"a")
+    store.put("b", "2", b"b")
+    assert store.get("a") == ("1", b"a")
+    store.put("c", "3", b"c")
+    assert store.get("b") is None
+    assert len(store) == 2
+
+
+def test_conditional_requests_can_be_disabled():
+    client = http_client.HttpClient(conditional=False)
+    assert client.etag_store is None
+    with patch.object(
+        client.session, "get", return_value=_response(200, b"{}", etag='"x"')
+    ):
+        client.get("https://example.com")
+        client.get("https://example.com")
@@ -0,0 +1,60 @@
+from youtube_scanner.link_extractor import (
+    extract_links,
+    extract_links_bulk,
+    extract_video_ids,
+)
+
+
+def test_extracts_every_link_form():
+    text = "\n".join(
+        [
+            "Full video: https://youtu.be/dQw4w9WgXcQ?t=42",
+            "https://www.youtube.com/watch?feature=share&v=aaaaaaaaaaa&t=1m30s",
+            "youtube.com/shorts/bbbbbbbbbbb",
+            "https://m.youtube.com/live/ccccccccccc?si=x",
+            '<iframe src="https://www.youtube-nocookie.com/embed/d_d-d_d-d_d">',
+        ]
+    )
+    links = extract_links(text)
+    assert [(link.video_id, link.kind, link.start) for link in links] == [
+        ("dQw4w9WgXcQ", "youtu.be", 42),
+        ("aaaaaaaaaaa", "watch", 90),
+        ("bbbbbbbbbbb", "shorts", None),
+        ("ccccccccccc", "live", None),
+        ("d_d-d_d-d_d", "embed", None),
+    ]
+
+
+def test_unwraps_redirects():
+    text = (
+        "https://www.youtube.com/redirect?event=x&q="
+        "https%3A%2F%2Fwww.youtube.com%2Fwatch%3Fv%3Dzzzzzzzzzzz%26t%3D1h2s "
+        "https://www.google.com/url?q=https%3A%2F%2Fyoutu.be%2Fyyyyyyyyyyy&sa=D"
+    )
+    links = extract_links(text)
+    assert [(link.video_id, link.start) for link in links] == [
+        ("zzzzzzzzzzz", 3602),
+        ("yyyyyyyyyyy", None),
+    ]
+
+
+def test_ignores_lookalikes_and_deduplicates():
+    text = (
+        "notyoutube.com/watch?v=xxxxxxxxxxx youtu.be/short "
+        "youtube.com/watch?v=toolongidxxxx "
+        "youtu.be/eeeeeeeeeee https://youtube.com/watch?v=eeeeeeeeeee"
+    )
+    assert extract_video_ids(text) == ["eeeeeeeeeee"]
+    assert extract_video_ids(None) == []
+
+
+def test_bulk_extraction_skips_self_links():
+    videos = [
+        {
+            "id": "SHORTVIDE01",
+            "description": "Full video: youtu.be/LONGVIDEO01 / youtu.be/SHORTVIDE01",
+        },
+        {"id": "SHORTVIDE02", "description": "#shorts"},
+        {"id": "SHORTVIDE03", "description": "youtube.com/shorts/SHORTVIDE03"},
+    ]
+    assert extract_links_bulk(videos) == {"SHORTVIDE01": ["LONGVIDEO01"]}
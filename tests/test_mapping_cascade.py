@@ -0,0 +1,335 @@
+from youtube_scanner.mapping_cascade import MappingCascade, Strategy, default_strategies
+from youtube_scanner.short_mapper import map_shorts_to_full
+
+LONGS = [
+    {"id": "LONGVIDEO01", "title": "The Truth About Black Holes", "channel_id": "UC1"},
+    {"id": "LONGVIDEO02", "title": "Compound Interest Explained", "channel_id": "UC1"},
+    {"id": "LONGVIDEO03", "title": "Interview with a Chef", "channel_id": "UC1"},
+    {"id": "LONGVIDEO04", "title": "Volcano documentary", "channel_id": "UC1"},
+]
+SHORTS = [
+    {
+        "id": "SHORTVIDE01",
+        "title": "Wow",
+        "description": "Full video: https://youtu.be/LONGVIDEO02",
+        "channel_id": "UC1",
+    },
+    {
+        "id": "SHORTVIDE02",
+        "title": "Part two",
+        "description": "#shorts",
+        "channel_id": "UC1",
+    },
+    {
+        "id": "SHORTVIDE03",
+        "title": "Black Holes #shorts",
+        "description": "",
+        "channel_id": "UC1",
+    },
+    {"id": "SHORTVIDE04", "title": "Hot rocks", "description": "", "channel_id": "UC1"},
+    {"id": "SHORTVIDE05", "title": "Nothing", "description": "", "channel_id": "UC1"},
+]
+TRANSCRIPTS = {
+    "LONGVIDEO04": [
+        "lava flows down the side of the mountain at night",
+        "and the ash cloud rises for miles",
+    ],
+    "SHORTVIDE04": ["lava flows down the side of the mountain at night"],
+}
+
+
+def test_cascade_short_circuits_and_records_stats():
+    comment_requests = []
+
+    def fetch_comments(ids):
+        comment_requests.append(list(ids))
+        comments = dict.fromkeys(ids, [])
+        comments["SHORTVIDE02"] = [
+            "Watch it here https://www.youtube.com/watch?v=LONGVIDEO03"
+        ]
+        return comments
+
+    cascade = MappingCascade(
+        default_strategies(fetch_comments, lambda vid: TRANSCRIPTS.get(vid, []))
+    )
+    matches = cascade.map_channel(SHORTS, LONGS)
+
+    assert {short_id: match.video_id for short_id, match in matches.items()} == {
+        "SHORTVIDE01": "LONGVIDEO02",
+        "SHORTVIDE02": "LONGVIDEO03",
+        "SHORTVIDE03": "LONGVIDEO01",
+        "SHORTVIDE04": "LONGVIDEO04",
+    }
+    assert matches["SHORTVIDE01"].relation_source == "description_link"
+    assert matches["SHORTVIDE02"].relation_source == "pinned_comment"
+    assert matches["SHORTVIDE02"].video is LONGS[2]
+    assert matches["SHORTVIDE03"].relation_source == "title"
+    assert matches["SHORTVIDE04"].relation_source == "transcript"
+    # Shorts mapped from their description or title never reach the comment step
+    assert comment_requests == [["SHORTVIDE02", "SHORTVIDE04", "SHORTVIDE05"]]
+
+    report = {stats["name"]: stats for stats in cascade.report()}
+    assert [stats["name"] for stats in cascade.report()] == [
+        "description_link",
+        "title",
+        "similar_title",
+        "pinned_comment",
+        "transcript",
+    ]
+    assert (
+        report["description_link"]["attempted"],
+        report["description_link"]["hits"],
+    ) == (5, 1)
+    assert (report["title"]["attempted"], report["title"]["hits"]) == (4, 1)
+    assert (report["similar_title"]["attempted"], report["similar_title"]["hits"]) == (
+        3,
+        0,
+    )
+    assert report["pinned_comment"]["api_units"] == 3
+    assert (report["transcript"]["attempted"], report["transcript"]["hits"]) == (2, 1)
+    assert report["transcript"]["hit_rate"] == 0.5
+    assert all(stats["seconds"] >= 0 for stats in report.values())
+
+
+def test_failing_strategy_does_not_stop_cascade(caplog):
+    import requests
+
+    class Broken(Strategy):
+        name = "broken"
+
+        def match(self, shorts, longs, stats):
+            raise requests.exceptions.ConnectionError("boom")
+
+    cascade = MappingCascade([Broken(), *default_strategies()])
+    matches = cascade.map_channel(SHORTS, LONGS)
+    assert set(matches) == {"SHORTVIDE01", "SHORTVIDE03"}
+    assert cascade.stats["broken"].hits == 0
+    assert "Mapping strategy broken failed" in caplog.text
+
+
+def test_quota_and_offline_errors_stop_the_cascade():
+    import pytest
+
+    from quota import QuotaExhausted
+    from response_cache import CacheMiss
+
+    for error in (QuotaExhausted("no quota"), CacheMiss("offline")):
+
+        def fetch_comments(ids, error=error):
+            raise error
+
+        cascade = MappingCascade(
+            default_strategies(fetch_comments, lambda vid: TRANSCRIPTS.get(vid, []))
+        )
+        with pytest.raises(type(error)):
+            cascade.map_channel(SHORTS, LONGS)
+        # The later steps never ran
+        assert cascade.stats["transcript"].attempted == 0
+
+
+def test_title_match_skips_the_pinned_comment_step():
+    comment_requests = []
+
+    def fetch_comments(ids):
+        comment_requests.append(list(ids))
+        return dict.fromkeys(ids, [])
+
+    cascade = MappingCascade(default_strategies(fetch_comments))
+    matches = cascade.map_channel([SHORTS[2]], LONGS)
+
+    assert matches["SHORTVIDE03"].relation_source == "title"
+    assert comment_requests == []
+    assert cascade.stats["pinned_comment"].api_units == 0
+
+
+def test_strategy_requires_match():
+    import pytest
+
+    class Incomplete(Strategy):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_links_outside_the_channel_are_only_a_fallback():
+    shorts = [
+        {
+            "id": "SHORTVIDE01",
+            "title": "Black Holes",
+            "description": "Collab: https://youtu.be/ELSEWHERE01",
+        },
+        {
+            "id": "SHORTVIDE02",
+            "title": "Nothing",
+            "description": "Collab: https://youtu.be/ELSEWHERE02",
+        },
+    ]
+    cascade = MappingCascade(default_strategies())
+    matches = cascade.map_channel(shorts, LONGS)
+
+    # The title step still runs and wins over the outside link
+    assert matches["SHORTVIDE01"].video_id == "LONGVIDEO01"
+    assert matches["SHORTVIDE01"].relation_source == "title"
+    # Without a confident match the outside link is used
+    assert matches["SHORTVIDE02"].video_id == "ELSEWHERE02"
+    assert matches["SHORTVIDE02"].relation_source == "description_link"
+    report = {stats["name"]: stats for stats in cascade.report()}
+    assert (
+        report["description_link"]["hits"],
+        report["description_link"]["fallbacks"],
+    ) == (0, 1)
+
+
+def test_map_shorts_to_full_groups_channels():
+    other = {"id": "LONGVIDEO09", "title": "Black Holes", "channel_id": "UC2"}
+    shorts = SHORTS + [
+        {"id": "SHORTVIDE09", "title": "Black Holes", "channel_id": "UC2"}
+    ]
+    mapping = map_shorts_to_full(shorts, LONGS + [other])
+    assert mapping == {
+        "SHORTVIDE01": "LONGVIDEO02",
+        "SHORTVIDE03": "LONGVIDEO01",
+        "SHORTVIDE09": "LONGVIDEO09",
+    }
+    assert map_shorts_to_full(["SHORTVIDE01"], ["LONGVIDEO01"]) == {}
+
+
+def test_shorts_with_description_links_skip_comment_calls():
+    requested = []
+
+    def fetch_comments(ids):
+        requested.extend(ids)
+        return dict.fromkeys(ids, [])
+
+    shorts = [
+        {
+            "id": "SHORTVIDE01",
+            "title": "Part 1",
+            "description": "Part 2: youtube.com/shorts/SHORTVIDE02",
+        },
+        {"id": "SHORTVIDE02", "title": "Part 2", "description": ""},
+    ]
+    cascade = MappingCascade(default_strategies(fetch_comments))
+    assert cascade.map_channel(shorts, LONGS) == {}
+    assert requested == ["SHORTVIDE02"]
+    assert cascade.stats["pinned_comment"].api_units == 1
+
+
+def test_comment_units_only_count_shorts_read():
+    def fetch_comments(ids):
+        # Quota ran out after the first Short
+        return {ids[0]: []}
+
+    cascade = MappingCascade(default_strategies(fetch_comments))
+    cascade.map_channel(SHORTS[1:], LONGS)
+    assert cascade.stats["pinned_comment"].api_units == 1
+
+
+def test_transcript_step_fetches_in_one_batch():
+    batches = []
+
+    def fetch_transcripts(ids, priority):
+        batches.append(list(ids))
+        assert all(priority[vid] == 0 for vid in ids[:3]) and all(
+            priority[vid] >= 1 for vid in ids[3:]
+        )
+        return {vid: TRANSCRIPTS[vid] for vid in ids if vid in TRANSCRIPTS}
+
+    mapping = map_shorts_to_full(SHORTS, LONGS, fetch_transcripts=fetch_transcripts)
+    assert mapping["SHORTVIDE04"] == "LONGVIDEO04"
+    # Only the Shorts left after the cheaper steps are fetched, ahead of the long videos
+    assert batches == [
+        ["SHORTVIDE02", "SHORTVIDE04", "SHORTVIDE05"] + [video["id"] for video in LONGS]
+    ]
+
+
+def test_similar_title_step_maps_reworded_titles():
+    longs = [
+        {"id": "LONGVIDEO01", "title": "The Truth About Black Holes"},
+        {"id": "LONGVIDEO02", "title": "Black Holes Myths Busted"},
+        {"id": "LONGVIDEO03", "title": "Why Black Holes Evaporate"},
+        {"id": "LONGVIDEO04", "title": "Black Holes and Time Travel"},
+    ]
+    shorts = [
+        {"id": "SHORTVIDE01", "title": "Black holes: the quick truth in a minute flat"},
+        # Equally similar to every long video: left unmapped
+        {"id": "SHORTVIDE02", "title": "Black Holes in 1 Minute"},
+    ]
+    cascade = MappingCascade(default_strategies())
+    matches = cascade.map_channel(shorts, longs)
+
+    assert {short_id: match.video_id for short_id, match in matches.items()} == {
+        "SHORTVIDE01": "LONGVIDEO01"
+    }
+    assert matches["SHORTVIDE01"].relation_source == "similar_title"
+    assert cascade.stats["title"].hits == 0
+
+
+def test_transcript_step_fetches_only_tfidf_candidates():
+    from datetime import datetime, timedelta
+
+    from youtube_scanner.mapping_cascade import (
+        TranscriptStrategy,
+        rank_transcript_candidates,
+    )
+
+    start = datetime(2024, 1, 1)
+    longs = [
+        {
+            "id": f"LONGVIDEO{i:02d}",
+            "title": f"Episode {i} filler talk",
+            "publish_date": start + timedelta(days=i),
+        }
+        for i in range(40)
+    ]
+    longs[7]["title"] = "Volcano documentary: lava and ash"
+    shorts = [
+        {
+            "id": "SHORTVIDE01",
+            "title": "Volcano lava",
+            "publish_date": start + timedelta(days=30),
+        },
+        # No title overlap: candidates are the long videos published closest to it
+        {
+            "id": "SHORTVIDE02",
+            "title": "Wow",
+            "publish_date": start + timedelta(days=20, hours=1),
+        },
+    ]
+    transcripts = {
+        "LONGVIDEO07": [
+            "lava flows down the side of the mountain at night",
+            "and the ash cloud rises for miles",
+        ],
+        "LONGVIDEO20": ["we never expected the audience to react like that"],
+        "SHORTVIDE01": ["lava flows down the side of the mountain at night"],
+        "SHORTVIDE02": ["we never expected the audience to react like that"],
+    }
+
+    ranked = rank_transcript_candidates(shorts, longs, limit=3)
+    assert ranked["SHORTVIDE01"][0] == "LONGVIDEO07"
+    assert ranked["SHORTVIDE02"] == ["LONGVIDEO20", "LONGVIDEO21", "LONGVIDEO19"]
+
+    batches = []
+    priorities = {}
+
+    def fetch_transcripts(ids, priority):
+        batches.append(list(ids))
+        priorities.update(priority)
+        return {vid: transcripts.get(vid, []) for vid in ids}
+
+    cascade = MappingCascade(
+        [TranscriptStrategy(fetch_transcripts=fetch_transcripts, candidates=3)]
+    )
+    matches = cascade.map_channel(shorts, longs)
+    assert {short_id: match.video_id for short_id, match in matches.items()} == {
+        "SHORTVIDE01": "LONGVIDEO07",
+        "SHORTVIDE02": "LONGVIDEO20",
+    }
+    assert len(batches) == 1 and len(batches[0]) <= 2 + 2 * 3
+    assert batches[0][:2] == ["SHORTVIDE01", "SHORTVIDE02"]
+    # Shorts first, then each long video by its best candidate rank
+    assert priorities["SHORTVIDE01"] == priorities["SHORTVIDE02"] == 0
+    assert priorities["LONGVIDEO07"] == priorities["LONGVIDEO20"] == 1
+    assert priorities["LONGVIDEO21"] == 2 and priorities["LONGVIDEO19"] == 3
@@ -0,0 +1,63 @@
+import random
+
+from youtube_scanner.minhash import (
+    MinHashLSH,
+    NearDuplicateMatcher,
+    choose_bands,
+    jaccard,
+)
+
+
+def test_choose_bands_puts_knee_at_or_below_threshold():
+    bands, rows = choose_bands(128, 0.3)
+    assert bands * rows <= 128
+    assert 0.2 < (1 / bands) ** (1 / rows) <= 0.3
+
+
+def test_signature_agreement_estimates_jaccard():
+    lsh = MinHashLSH(num_perm=256)
+    a = {f"t{i}" for i in range(60)}
+    b = {f"t{i}" for i in range(30, 90)}
+    sig_a, sig_b = lsh.signature(a), lsh.signature(b)
+    estimate = sum(x == y for x, y in zip(sig_a, sig_b)) / len(sig_a)
+    assert abs(estimate - jaccard(frozenset(a), frozenset(b))) < 0.1
+
+
+def test_query_finds_similar_sets_without_comparing_everything():
+    rng = random.Random(0)
+    vocabulary = [f"w{i}" for i in range(5000)]
+    lsh = MinHashLSH(threshold=0.5)
+    for i in range(500):
+        lsh.add(i, rng.sample(vocabulary, 8))
+    target = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta"]
+    lsh.add("target", target)
+    matches = lsh.query(target[:5] + ["omega"])
+    assert matches[0][0] == "target"
+    assert matches[0][1] == 5 / 7
+    assert len(matches) == 1
+
+
+def test_candidate_pairs_are_reported_once():
+    lsh = MinHashLSH(threshold=0.5)
+    lsh.add("a", ["mars", "rover", "landing"])
+    lsh.add("b", ["mars", "rover", "landing", "explained"])
+    lsh.add("c", ["coffee"])
+    assert list(lsh.candidate_pairs()) == [("a", "b", 0.75)]
+
+
+def test_near_duplicate_matcher_pairs_fuzzy_titles():
+    longs = [
+        {"id": "l1", "title": "The Truth About Black Holes"},
+        {"id": "l2", "title": "Compound Interest Explained"},
+        {"id": "l3", "title": "Why Coffee Matters"},
+    ]
+    matcher = NearDuplicateMatcher(longs)
+    found = matcher.match_all(
+        [
+            {"id": "s1", "title": "Black Holes in 1 Minute"},
+            {"id": "s2", "title": "Cooking #shorts"},
+        ]
+    )
+    assert [c.video_id for c in found["s1"]] == ["l1"]
+    assert found["s1"][0].relation_source == "similar_title"
+    assert found["s2"] == []
@@ -0,0 +1,144 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+import http_client
+from quota import (
+    PRIORITY_MAPPING,
+    PRIORITY_TOP_SHORTS,
+    PRIORITY_UPLOADS,
+    QuotaBudget,
+    QuotaExhausted,
+    ScanTask,
+    TokenBucket,
+    charging_channel,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_token_bucket_refills_and_waits():
+    clock = FakeClock()
+    bucket = TokenBucket(capacity=10, refill_rate=2, clock=clock, sleep=clock.sleep)
+    assert bucket.try_acquire(10)
+    assert not bucket.try_acquire(1)
+    assert bucket.acquire(4)
+    assert clock.now == pytest.approx(2.0)
+    assert not bucket.acquire(5, timeout=1)
+    assert not bucket.acquire(11)
+
+
+def test_budget_tracks_units_per_endpoint_and_channel():
+    budget = QuotaBudget(daily_budget=250)
+    with charging_channel("c1"):
+        budget.charge("search")
+        budget.charge("videos")
+    budget.charge("playlistItems", channel_id="c2")
+
+    assert budget.spent == 102
+    assert budget.spent_by_endpoint() == {
+        "search": 100,
+        "videos": 1,
+        "playlistItems": 1,
+    }
+    assert budget.spent_by_channel() == {"c1": 101, "c2": 1}
+    budget.charge("search")
+    with pytest.raises(QuotaExhausted):
+        budget.charge("search")
+
+
+def test_mark_exhausted_fails_fast():
+    budget = QuotaBudget()
+    budget.mark_exhausted(reset_in=60)
+    assert budget.exhausted and budget.remaining == 0
+    with pytest.raises(QuotaExhausted):
+        budget.charge("videos")
+
+
+def test_budget_refills_at_pacific_midnight_only():
+    from datetime import datetime, timedelta, timezone
+
+    # 06:00 UTC on 2 Jan is 22:00 on 1 Jan in Los Angeles
+    clock = FakeClock()
+    moment = {"now": datetime(2024, 1, 2, 6, tzinfo=timezone.utc)}
+    budget = QuotaBudget(daily_budget=100, now=lambda: moment["now"], clock=clock)
+    budget.charge("search")
+    assert budget.remaining == 0
+
+    moment["now"] += timedelta(hours=1, minutes=59)
+    clock.now += 7140
+    assert budget.remaining == 0
+    assert budget.plan([ScanTask("uploads", "playlistItems")]).deferred
+
+    moment["now"] += timedelta(minutes=2)
+    assert budget.remaining == 100
+    budget.mark_exhausted()
+    assert budget.exhausted and budget.remaining == 0
+
+    moment["now"] += timedelta(days=1)
+    assert not budget.exhausted and budget.remaining == 100
+
+
+def test_budget_waits_for_a_reset_within_max_wait():
+    from datetime import datetime, timedelta, timezone
+
+    moment = {"now": datetime(2024, 1, 2, 7, 59, tzinfo=timezone.utc)}
+
+    def sleep(seconds):
+        moment["now"] += timedelta(seconds=seconds)
+
+    budget = QuotaBudget(
+        daily_budget=100, max_wait=30, sleep=sleep, now=lambda: moment["now"]
+    )
+    budget.charge("search")
+    with pytest.raises(QuotaExhausted):
+        budget.charge("videos")
+    budget.max_wait = 60
+    assert budget.charge("videos") == 1
+    assert moment["now"] == datetime(2024, 1, 2, 8, tzinfo=timezone.utc)
+    assert budget.remaining == 99
+
+
+def test_plan_runs_valuable_work_first_and_defers_the_rest():
+    budget = QuotaBudget(daily_budget=120)
+    tasks = [
+        ScanTask("title search", "search", PRIORITY_MAPPING),
+        ScanTask("uploads", "playlistItems", PRIORITY_UPLOADS, calls=10),
+        ScanTask("refresh top shorts", "videos", PRIORITY_TOP_SHORTS, calls=2),
+        ScanTask("second search", "search", PRIORITY_MAPPING),
+    ]
+    plan = budget.plan(tasks)
+    assert [t.name for t in plan.scheduled] == [
+        "refresh top shorts",
+        "uploads",
+        "title search",
+    ]
+    assert [t.name for t in plan.deferred] == ["second search"]
+    assert plan.units == 112
+
+
+def test_client_charges_budget_and_detects_quota_errors():
+    budget = QuotaBudget(daily_budget=100)
+    client = http_client.HttpClient(budget=budget)
+    denied = Mock(status_code=403)
+    denied.json.return_value = {"error": {"errors": [{"reason": "quotaExceeded"}]}}
+
+    with patch.object(
+        client.session, "get", side_effect=[Mock(status_code=200), denied]
+    ):
+        client.get("https://www.googleapis.com/youtube/v3/videos")
+        client.get("https://www.googleapis.com/youtube/v3/channels")
+
+    assert budget.spent_by_endpoint() == {"videos": 1, "channels": 1}
+    assert budget.exhausted
+    with pytest.raises(QuotaExhausted):
+        client.get("https://www.googleapis.com/youtube/v3/videos")
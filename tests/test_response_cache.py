@@ -0,0 +1,122 @@
+from unittest.mock import patch
+
+import pytest
+import requests
+
+import http_client
+from response_cache import CacheMiss, ResponseCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _response(status, body=b"", etag=None):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = body
+    if etag:
+        resp.headers["ETag"] = etag
+    return resp
+
+
+def test_entries_expire_per_endpoint_ttl(tmp_path):
+    clock = FakeClock()
+    cache = ResponseCache(
+        tmp_path / "cache.db", ttls={"videos": 60, "channels": 600}, clock=clock
+    )
+    cache.put("v", "videos", b"video body")
+    cache.put("c", "channels", b"channel body")
+    clock.now += 120
+
+    assert cache.get("v").body == b"video body"
+    assert not cache.is_fresh(cache.get("v"))
+    assert cache.is_fresh(cache.get("c"))
+    assert cache.get("missing") is None
+
+
+def test_size_cap_evicts_least_recently_used(tmp_path):
+    clock = FakeClock()
+    cache = ResponseCache(tmp_path / "cache.db", max_bytes=60, clock=clock)
+    body = bytes(range(20))  # incompressible enough to keep each entry near 28 bytes
+    for key in ["a", "b"]:
+        cache.put(key, "videos", body)
+        clock.now += 1
+    cache.get("a")
+    clock.now += 1
+    cache.put("c", "videos", body)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.size <= 60
+
+
+def test_cache_persists_between_instances(tmp_path):
+    ResponseCache(tmp_path / "cache.db").put("k", "videos", b"body", etag='"e"')
+    reopened = ResponseCache(tmp_path / "cache.db")
+    entry = reopened.get("k")
+    assert entry.body == b"body" and entry.etag == '"e"'
+    assert reopened.size > 0
+
+
+def test_client_serves_fresh_entries_and_revalidates_stale_ones(tmp_path):
+    clock = FakeClock()
+    cache = ResponseCache(tmp_path / "cache.db", ttls={"videos": 60}, clock=clock)
+    client = http_client.HttpClient(cache=cache, conditional=False)
+    url = "https://www.googleapis.com/youtube/v3/videos"
+    responses = [_response(200, b'{"n": 1}', etag='"v1"'), _response(304)]
+
+    with patch.object(client.session, "get", side_effect=responses) as mock_get:
+        assert client.get(url, params={"id": "a", "key": "K"}).json() == {"n": 1}
+        assert client.get(url, params={"id": "a", "key": "K"}).json() == {"n": 1}
+        assert mock_get.call_count == 1
+        clock.now += 120
+        assert client.get(url, params={"id": "a", "key": "K"}).json() == {"n": 1}
+
+    assert mock_get.call_count == 2
+    assert mock_get.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+    assert cache.is_fresh(cache.get(http_client.request_key(url, {"id": "a"})))
+
+
+def test_offline_mode_replays_cache_and_fails_fast_on_miss(tmp_path):
+    online = http_client.HttpClient(cache=ResponseCache(tmp_path / "cache.db"))
+    url = "https://www.googleapis.com/youtube/v3/channels"
+    with patch.object(
+        online.session, "get", return_value=_response(200, b'{"items": []}')
+    ):
+        online.get(url, params={"id": "c1"})
+
+    clock = FakeClock()
+    clock.now = 10**10  # far beyond every TTL
+    offline = http_client.HttpClient(
+        cache=ResponseCache(tmp_path / "cache.db", offline=True, clock=clock)
+    )
+    with patch.object(offline.session, "get") as mock_get:
+        assert offline.get(url, params={"id": "c1"}).json() == {"items": []}
+        with pytest.raises(CacheMiss):
+            offline.get(url, params={"id": "c2"})
+    mock_get.assert_not_called()
+
+
+def test_hits_do_not_write_until_the_next_put_or_close(tmp_path):
+    clock = FakeClock()
+    path = tmp_path / "cache.db"
+    cache = ResponseCache(path, clock=clock)
+    cache.put("a", "videos", b"body")
+    changes = cache._conn.total_changes
+    clock.now += 5
+    for _ in range(10):
+        assert cache.get("a") is not None
+    assert cache._conn.total_changes == changes
+
+    cache.close()
+    reopened = ResponseCache(path, clock=clock)
+    accessed = reopened._conn.execute(
+        "SELECT accessed_at FROM responses WHERE key = 'a'"
+    ).fetchone()[0]
+    assert accessed == clock.now
@@ -1,18 +1,56 @@
+from datetime import datetime
+from unittest.mock import Mock
+
+import pytest
+
+import http_client
 from youtube_scanner import scheduler
 
 
+@pytest.fixture(autouse=True)
+def fresh_client():
+    # Scans attach a quota budget to the shared client; don't leak it
+    yield
+    http_client.configure()
+
+
+def _patch_uploads(monkeypatch, fetch):
+    """Serve the uploads walk of both scan engines from ``fetch``.
+
+    ``fetch`` takes the arguments of ``channel_fetcher.fetch_channel_videos``
+    and its videos are returned as a single uploads page.
+    """
+    from youtube_api import VideoBatchResult
+
+    videos = {}
+
+    def pages(channel_id, api_key, since=None, walk=None):
+        found = fetch(api_key, channel_id, since, walk)
+        videos.update((video.video_id, video) for video in found)
+        if found:
+            yield [video.video_id for video in found]
+
+    def batch(video_ids, api_key):
+        return VideoBatchResult({vid: videos[vid] for vid in video_ids})
+
+    monkeypatch.setattr(scheduler.youtube_api, "iter_uploads_playlist_pages", pages)
+    monkeypatch.setattr(scheduler.youtube_api, "fetch_videos_batch", batch)
+
+
 def test_run_channel_scan_updates_storage(monkeypatch):
     calls = []
 
-    def fake_fetch(api_key, channel_id):
+    def fake_fetch(api_key, channel_id, since=None, walk=None, prefetch=None):
         calls.append((api_key, channel_id))
-        return {}
+        walk.complete = True
+        return []
 
     store = {}
 
-    monkeypatch.setattr(scheduler.channel_fetcher, "fetch_channel_videos", fake_fetch)
+    _patch_uploads(monkeypatch, fake_fetch)
     monkeypatch.setattr(scheduler.storage, "get_last_run", lambda cid: store.get(cid))
     monkeypatch.setattr(scheduler.storage, "update_last_run", lambda cid, ts: store.__setitem__(cid, ts))
+    monkeypatch.setattr(scheduler.storage, "get_uploads_cursor", lambda cid: None)
 
     scheduler.API_KEY = "key"
     scheduler.CHANNELS = ["c1"]
@@ -31,3 +69,445 @@ def test_start_schedules_monthly_job(monkeypatch):
         assert "day='1'" in str(jobs[0].trigger)
     finally:
         scheduler.stop(sched)
+
+
+def _fake_pipeline(monkeypatch, store, failing=()):
+    import threading
+    import time
+
+    from youtube_scanner.models import VideoMetadata
+
+    state = {"active": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def track():
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.01)
+        with lock:
+            state["active"] -= 1
+
+    def fake_fetch(api_key, channel_id, since=None, walk=None, prefetch=None):
+        track()
+        if channel_id in failing:
+            raise RuntimeError("boom")
+        walk.complete = True
+        return [
+            VideoMetadata(video_id=f"{channel_id}-v{i}", title=f"t{i}", is_short=i < 2)
+            for i in range(3)
+        ]
+
+    def fake_transcripts(video_ids, concurrency=None, priority=None):
+        track()
+        return {vid: [f"text {vid}"] for vid in video_ids}
+
+    _patch_uploads(monkeypatch, fake_fetch)
+    monkeypatch.setattr(
+        scheduler.transcript_fetcher, "fetch_transcripts", fake_transcripts
+    )
+    monkeypatch.setattr(
+        scheduler.youtube_api, "fetch_pinned_comments", lambda ids, api_key: {}
+    )
+    monkeypatch.setattr(scheduler.storage, "get_last_run", lambda cid: store.get(cid))
+    monkeypatch.setattr(
+        scheduler.storage, "update_last_run", lambda cid, ts: store.__setitem__(cid, ts)
+    )
+    monkeypatch.setattr(scheduler.storage, "get_uploads_cursor", lambda cid: None)
+    return state
+
+
+def test_async_scan_isolates_failures_and_limits_concurrency(monkeypatch):
+    store = {}
+    state = _fake_pipeline(monkeypatch, store, failing={"bad"})
+    scheduler.CHANNELS = ["c1", "bad", "c2", "c3"]
+    monkeypatch.setattr(scheduler, "CONCURRENCY", 2)
+
+    results = scheduler.run_channel_scan(concurrent=True)
+
+    assert sorted(results) == ["c1", "c2", "c3"]
+    assert sorted(store) == ["c1", "c2", "c3"]
+    assert results["c1"].transcripts["c1-v0"] == ["text c1-v0"]
+    assert len(results["c2"].videos) == 3
+    assert state["peak"] <= 2
+
+
+def test_async_scan_restores_the_callers_client(monkeypatch):
+    store = {}
+    _fake_pipeline(monkeypatch, store)
+    scheduler.CHANNELS = ["c1"]
+    monkeypatch.setattr(scheduler, "CONCURRENCY", 4)
+    caller = http_client.configure(pool_size=1)
+    pools = []
+    monkeypatch.setattr(
+        scheduler.youtube_api,
+        "fetch_pinned_comments",
+        lambda ids, api_key: pools.append(http_client.get_client().pool_size) or {},
+    )
+
+    scheduler.run_channel_scan(concurrent=True)
+
+    assert pools == [4]
+    assert http_client.get_client() is caller
+
+
+def test_plan_scan_orders_naive_aware_and_missing_last_runs(monkeypatch):
+    from datetime import timezone
+
+    last_runs = {
+        "aware": datetime(2024, 3, 1, tzinfo=timezone.utc),
+        "naive": datetime(2024, 2, 1),
+        "never": None,
+    }
+    monkeypatch.setattr(scheduler.storage, "get_last_run", last_runs.get)
+    monkeypatch.setattr(scheduler, "METADATA_FILE", None)
+
+    assert list(scheduler.plan_scan(["aware", "never", "naive"])) == [
+        "never",
+        "naive",
+        "aware",
+    ]
+
+
+def test_sequential_scan_matches_async(monkeypatch):
+    store = {}
+    _fake_pipeline(monkeypatch, store)
+    scheduler.CHANNELS = ["c1"]
+
+    sequential = scheduler.run_channel_scan(concurrent=False)
+    concurrent = scheduler.run_channel_scan(concurrent=True)
+
+    assert sequential == concurrent
+    assert "c1" in store
+
+
+def test_scan_defers_channels_beyond_quota(monkeypatch):
+    import quota
+
+    store = {}
+    _fake_pipeline(monkeypatch, store)
+    monkeypatch.setattr(
+        http_client.get_client(), "budget", quota.QuotaBudget(daily_budget=25)
+    )
+    scheduler.CHANNELS = ["c1", "c2", "c3"]
+
+    results = scheduler.run_channel_scan(concurrent=False)
+
+    assert sorted(results) == ["c1", "c2"]
+    assert "c3" not in store
+
+
+def test_scan_fetches_short_transcripts_and_leaves_longs_to_the_cascade(monkeypatch):
+    from youtube_scanner.models import VideoMetadata
+
+    batches = []
+
+    def fake_fetch(api_key, channel_id, since=None, walk=None, prefetch=None):
+        walk.complete = True
+        return [
+            VideoMetadata("long", "Volcano documentary", view_count=10**6),
+            VideoMetadata("quiet", "Hmm", view_count=10, is_short=True),
+            VideoMetadata("viral", "Wow", view_count=10**5, is_short=True),
+        ]
+
+    def fake_transcripts(video_ids, concurrency=None, priority=None):
+        batches.append(list(video_ids))
+        return dict.fromkeys(video_ids, [])
+
+    _patch_uploads(monkeypatch, fake_fetch)
+    monkeypatch.setattr(
+        scheduler.transcript_fetcher, "fetch_transcripts", fake_transcripts
+    )
+    monkeypatch.setattr(
+        scheduler.youtube_api, "fetch_pinned_comments", lambda ids, api_key: {}
+    )
+    monkeypatch.setattr(scheduler.storage, "get_last_run", lambda cid: None)
+    monkeypatch.setattr(scheduler.storage, "update_last_run", lambda cid, ts: None)
+    monkeypatch.setattr(scheduler.storage, "get_uploads_cursor", lambda cid: None)
+    monkeypatch.setattr(
+        scheduler.storage, "update_uploads_cursor", lambda cid, cursor: None
+    )
+    scheduler.CHANNELS = ["c1"]
+
+    for concurrent in (False, True):
+        results = scheduler.run_channel_scan(concurrent=concurrent)
+        assert results["c1"].transcripts == {"viral": [], "quiet": [], "long": []}
+    # The Shorts up front, most viewed first; the long video only once the
+    # cascade's transcript step picks it as a candidate
+    assert batches == [["viral", "quiet"], ["long"]] * 2
+
+
+def test_incremental_scan_resumes_from_stored_cursor(monkeypatch):
+    from datetime import timezone
+
+    from youtube_scanner.models import UploadsCursor, VideoMetadata
+
+    cursors = {"c1": UploadsCursor("old", datetime(2024, 1, 1, tzinfo=timezone.utc))}
+    seen = []
+
+    def fake_fetch(api_key, channel_id, since=None, walk=None, prefetch=None):
+        seen.append(since)
+        walk.complete = True
+        return [
+            VideoMetadata(
+                "new1", "t", publish_date=datetime(2024, 3, 1, tzinfo=timezone.utc)
+            ),
+            VideoMetadata(
+                "new2", "t", publish_date=datetime(2024, 2, 1, tzinfo=timezone.utc)
+            ),
+        ]
+
+    _patch_uploads(monkeypatch, fake_fetch)
+    monkeypatch.setattr(
+        scheduler.transcript_fetcher,
+        "fetch_transcripts",
+        lambda ids, **kwargs: dict.fromkeys(ids, []),
+    )
+    monkeypatch.setattr(scheduler.storage, "get_last_run", lambda cid: None)
+    monkeypatch.setattr(scheduler.storage, "update_last_run", lambda cid, ts: None)
+    monkeypatch.setattr(scheduler.storage, "get_uploads_cursor", cursors.get)
+    monkeypatch.setattr(scheduler.storage, "update_uploads_cursor", cursors.__setitem__)
+    scheduler.CHANNELS = ["c1"]
+
+    scheduler.run_channel_scan(concurrent=False)
+    assert seen[0].video_id == "old"
+    assert cursors["c1"].video_id == "new1"
+
+    scheduler.run_channel_scan(concurrent=True, full_rescan=True)
+    assert seen[1] is None
+
+
+def test_partial_uploads_walk_keeps_previous_cursor(monkeypatch):
+    from datetime import timezone
+
+    import requests
+
+    from youtube_scanner.models import UploadsCursor
+
+    cursors = {"c1": UploadsCursor("old", datetime(2024, 1, 1, tzinfo=timezone.utc))}
+    last_runs = {}
+
+    def response(data):
+        resp = Mock()
+        resp.json.return_value = data
+        resp.raise_for_status.return_value = None
+        return resp
+
+    def fake_get(self, url, params=None, **kwargs):
+        if url.endswith("/channels"):
+            return response(
+                {
+                    "items": [
+                        {"contentDetails": {"relatedPlaylists": {"uploads": "UU1"}}}
+                    ]
+                }
+            )
+        if url.endswith("/videos"):
+            items = [
+                {
+                    "id": vid,
+                    "snippet": {"title": vid, "publishedAt": "2024-03-01T00:00:00Z"},
+                }
+                for vid in params["id"].split(",")
+            ]
+            return response({"items": items})
+        if "pageToken" in params:
+            raise requests.exceptions.ConnectionError("page 2 lost")
+        page = {
+            "items": [{"contentDetails": {"videoId": "new1"}}],
+            "nextPageToken": "P2",
+        }
+        return response(page)
+
+    monkeypatch.setattr("http_client.requests.Session.get", fake_get)
+    monkeypatch.setattr(
+        scheduler.transcript_fetcher,
+        "fetch_transcripts",
+        lambda ids, **kwargs: dict.fromkeys(ids, []),
+    )
+    monkeypatch.setattr(scheduler.storage, "get_last_run", last_runs.get)
+    monkeypatch.setattr(scheduler.storage, "update_last_run", last_runs.__setitem__)
+    monkeypatch.setattr(scheduler.storage, "get_uploads_cursor", cursors.get)
+    monkeypatch.setattr(scheduler.storage, "update_uploads_cursor", cursors.__setitem__)
+    http_client.configure(conditional=False)
+    scheduler.API_KEY = "key"
+    scheduler.CHANNELS = ["c1"]
+
+    for concurrent in (False, True):
+        results = scheduler.run_channel_scan(concurrent=concurrent)
+        assert list(results["c1"].videos) == ["new1"]
+        assert not results["c1"].complete
+        assert cursors["c1"].video_id == "old"
+        assert last_runs == {}
+
+
+def test_async_walk_overlaps_pages_within_the_limit(monkeypatch):
+    import threading
+    import time
+
+    from youtube_api import VideoBatchResult
+    from youtube_scanner.models import VideoMetadata
+
+    state = {"active": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def track():
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.02)
+        with lock:
+            state["active"] -= 1
+
+    def pages(channel_id, api_key, since=None, walk=None):
+        for page in range(3):
+            track()
+            yield [f"{channel_id}-p{page}"]
+        walk.complete = True
+
+    def batch(video_ids, api_key):
+        track()
+        return VideoBatchResult({vid: VideoMetadata(vid, "t") for vid in video_ids})
+
+    monkeypatch.setattr(scheduler.youtube_api, "iter_uploads_playlist_pages", pages)
+    monkeypatch.setattr(scheduler.youtube_api, "fetch_videos_batch", batch)
+    monkeypatch.setattr(scheduler.storage, "get_last_run", lambda cid: None)
+    monkeypatch.setattr(scheduler.storage, "update_last_run", lambda cid, ts: None)
+    monkeypatch.setattr(scheduler.storage, "get_uploads_cursor", lambda cid: None)
+    scheduler.CHANNELS = ["c1"]
+
+    for limit, peak in ((1, 1), (2, 2)):
+        state["peak"] = 0
+        monkeypatch.setattr(scheduler, "CONCURRENCY", limit)
+        results = scheduler.run_channel_scan(concurrent=True)
+        assert list(results["c1"].videos) == ["c1-p0", "c1-p1", "c1-p2"]
+        assert results["c1"].complete
+        # The next page downloads while the current one is enriched
+        assert state["peak"] == peak
+
+
+def _store_channel(path):
+    from youtube_scanner.models import VideoMetadata
+
+    scheduler.storage.append_video_metadata(
+        [
+            VideoMetadata(
+                "SHORTVIDE00",
+                "Old short",
+                view_count=10**5,
+                is_short=True,
+                channel_id="c1",
+            ),
+            VideoMetadata(
+                "LONGVIDEO01",
+                "Volcano documentary",
+                view_count=10**4,
+                channel_id="c1",
+            ),
+        ],
+        path,
+    )
+
+
+def test_plan_scan_refreshes_top_shorts_first_and_maps_last(monkeypatch, tmp_path):
+    import quota
+
+    path = tmp_path / "videos.jsonl"
+    _store_channel(path)
+    monkeypatch.setattr(scheduler, "METADATA_FILE", str(path))
+    monkeypatch.setattr(scheduler.storage, "get_last_run", lambda cid: None)
+
+    # 1 unit for c1's top Shorts, 10 per uploads walk, 10 per mapping
+    monkeypatch.setattr(
+        http_client.get_client(), "budget", quota.QuotaBudget(daily_budget=21)
+    )
+    plans = scheduler.plan_scan(["c1", "c2"])
+    assert {channel_id: plan.work for channel_id, plan in plans.items()} == {
+        "c1": {quota.PRIORITY_TOP_SHORTS, quota.PRIORITY_UPLOADS},
+        "c2": {quota.PRIORITY_UPLOADS},
+    }
+    assert [video.video_id for video in plans["c1"].target_shorts] == ["SHORTVIDE00"]
+
+    # Mapping fits but the uploads it needs do not: only the refresh runs
+    monkeypatch.setattr(scheduler, "ESTIMATED_MAPPING_CALLS_PER_CHANNEL", 2)
+    monkeypatch.setattr(
+        http_client.get_client(), "budget", quota.QuotaBudget(daily_budget=5)
+    )
+    assert scheduler.plan_scan(["c1"])["c1"].work == {quota.PRIORITY_TOP_SHORTS}
+
+
+def test_scan_refreshes_top_shorts_and_maps_new_shorts(monkeypatch, tmp_path):
+    from youtube_api import VideoBatchResult
+    from youtube_scanner.models import VideoMetadata
+
+    path = tmp_path / "videos.jsonl"
+    _store_channel(path)
+    monkeypatch.setattr(scheduler, "METADATA_FILE", str(path))
+
+    def fake_fetch(api_key, channel_id, since=None, walk=None, prefetch=None):
+        walk.complete = True
+        return [
+            VideoMetadata(
+                "SHORTVIDE01",
+                "Lava!",
+                description="Full video: https://youtu.be/LONGVIDEO01",
+                is_short=True,
+                channel_id="c1",
+            )
+        ]
+
+    _patch_uploads(monkeypatch, fake_fetch)
+    uploads_batch = scheduler.youtube_api.fetch_videos_batch
+    top_shorts_requests = []
+
+    def fake_batch(video_ids, api_key):
+        if video_ids != ["SHORTVIDE00"]:
+            return uploads_batch(video_ids, api_key)
+        top_shorts_requests.append(video_ids)
+        refreshed = VideoMetadata(
+            "SHORTVIDE00",
+            "Old short",
+            view_count=10**6,
+            is_short=True,
+            channel_id="c1",
+        )
+        return VideoBatchResult({"SHORTVIDE00": refreshed})
+
+    monkeypatch.setattr(scheduler.youtube_api, "fetch_videos_batch", fake_batch)
+    monkeypatch.setattr(
+        scheduler.youtube_api, "fetch_pinned_comments", lambda ids, api_key: {}
+    )
+    select_target_shorts = scheduler.storage.select_target_shorts
+    selections = []
+
+    def counting_select(channel, filename):
+        selections.append(channel.channel_id)
+        return select_target_shorts(channel, filename)
+
+    monkeypatch.setattr(scheduler.storage, "select_target_shorts", counting_select)
+    monkeypatch.setattr(
+        scheduler.transcript_fetcher,
+        "fetch_transcripts",
+        lambda ids, **kwargs: dict.fromkeys(ids, []),
+    )
+    monkeypatch.setattr(scheduler.storage, "get_last_run", lambda cid: None)
+    monkeypatch.setattr(scheduler.storage, "update_last_run", lambda cid, ts: None)
+    monkeypatch.setattr(scheduler.storage, "get_uploads_cursor", lambda cid: None)
+    monkeypatch.setattr(
+        scheduler.storage, "update_uploads_cursor", lambda cid, cursor: None
+    )
+    scheduler.CHANNELS = ["c1"]
+
+    for concurrent in (False, True):
+        scan = scheduler.run_channel_scan(concurrent=concurrent)["c1"]
+        assert scan.top_shorts["SHORTVIDE00"].view_count == 10**6
+        assert scan.mapping == {"SHORTVIDE01": "LONGVIDEO01"}
+    # Target Shorts are looked up once per scan, while planning
+    assert selections == ["c1", "c1"]
+    assert top_shorts_requests == [["SHORTVIDE00"]] * 2
+
+    stored = {
+        video.video_id: video for video in scheduler.storage.iter_video_metadata(path)
+    }
+    assert stored["SHORTVIDE00"].view_count == 10**6
+    assert "SHORTVIDE01" in stored
@@ -17,3 +17,19 @@ def test_map_short_to_long_no_match():
     short = {"id": "abc123", "title": "Short video"}
     videos = [{"id": "long1", "title": "Different"}]
     assert map_short_to_long(short, videos) is None
+
+
+def test_map_short_to_long_uses_token_index_for_fuzzy_titles():
+    from youtube_scanner.short_mapper import rank_long_candidates
+
+    videos = [
+        {"id": "long1", "title": "The Truth About Black Holes"},
+        {"id": "long2", "title": "Compound Interest Explained"},
+    ]
+    short = {"id": "s1", "title": "Black Holes #shorts"}
+    assert map_short_to_long(short, videos) == videos[0]
+
+    ranked = rank_long_candidates([short, {"id": "s2", "title": "Cooking"}], videos)
+    assert [c.video_id for c in ranked["s1"]] == ["long1"]
+    assert ranked["s1"][0].relation_source == "title"
+    assert ranked["s2"] == []
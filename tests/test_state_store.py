@@ -0,0 +1,95 @@
+import json
+import threading
+from datetime import datetime
+
+from youtube_scanner.models import UploadsCursor
+from youtube_scanner.state_store import ScanStateStore
+
+
+def test_state_is_loaded_once_and_written_atomically(tmp_path):
+    path = tmp_path / "state.json"
+    store = ScanStateStore(path)
+    store.update_last_run("c1", datetime(2024, 1, 1))
+    store.update_cursor("c1", "comments", "token-2")
+
+    path.write_text("{}", encoding="utf-8")  # not re-read until reload
+    assert store.get_last_run("c1") == datetime(2024, 1, 1)
+    assert store.get_cursor("c1", "comments") == "token-2"
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "state.json",
+        "state.json.lock",
+    ]
+
+
+def test_batch_defers_writes_until_exit(tmp_path):
+    path = tmp_path / "state.json"
+    store = ScanStateStore(path)
+    with store.batch():
+        store.update_last_run("c1", datetime(2024, 1, 1))
+        store.update_uploads_cursor("c1", UploadsCursor("v1", datetime(2024, 1, 1)))
+        assert not path.exists()
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["channels"]["c1"]["uploads_cursor"]["video_id"] == "v1"
+
+
+def test_workers_sharing_a_file_merge_their_channels(tmp_path):
+    path = tmp_path / "state.json"
+    first, second = ScanStateStore(path), ScanStateStore(path)
+    first.get_last_run("c1")
+    second.get_last_run("c2")
+    first.update_last_run("c1", datetime(2024, 1, 1))
+    second.update_last_run("c2", datetime(2024, 2, 1))
+
+    fresh = ScanStateStore(path)
+    assert fresh.get_last_run("c1") == datetime(2024, 1, 1)
+    assert fresh.get_last_run("c2") == datetime(2024, 2, 1)
+    assert first.get_last_run("c2") is None
+    first.reload()
+    assert first.get_last_run("c2") == datetime(2024, 2, 1)
+
+
+def test_concurrent_updates_are_not_lost(tmp_path):
+    path = tmp_path / "state.json"
+    stores = [ScanStateStore(path) for _ in range(4)]
+    threads = [
+        threading.Thread(
+            target=lambda store=store, n=n: [
+                store.update_last_run(f"w{n}-c{i}", datetime(2024, 1, 1 + i))
+                for i in range(10)
+            ]
+        )
+        for n, store in enumerate(stores)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(json.loads(path.read_text(encoding="utf-8"))["channels"]) == 40
+
+
+def test_reads_legacy_last_run_file(tmp_path):
+    path = tmp_path / "last_run.json"
+    path.write_text(json.dumps({"c1": "2024-01-01T00:00:00"}), encoding="utf-8")
+
+    store = ScanStateStore(path)
+    assert store.get_last_run("c1") == datetime(2024, 1, 1)
+    assert store.get_uploads_cursor("c1") is None
+    store.update_last_run("c2", datetime(2024, 3, 1))
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["version"] == 1
+    assert data["channels"]["c1"]["last_run"] == "2024-01-01T00:00:00"
+
+
+def test_unreadable_state_file_is_kept_aside(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text(
+        '{"version": 1, "channels": {"c1": {"last_run": "2024-01-0', encoding="utf-8"
+    )
+
+    store = ScanStateStore(path)
+    assert store.get_last_run("c1") is None
+    store.update_last_run("c2", datetime(2024, 3, 1))
+
+    corrupt = tmp_path / "state.json.corrupt"
+    assert corrupt.read_text(encoding="utf-8").endswith('"2024-01-0')
+    assert list(json.loads(path.read_text(encoding="utf-8"))["channels"]) == ["c2"]
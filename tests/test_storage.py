@@ -20,7 +20,7 @@ from youtube_scanner.storage import (
 )
 
 
-@pytest.mark.parametrize("suffix", ["json", "sqlite"])
+@pytest.mark.parametrize("suffix", ["json", "jsonl", "sqlite"])
 def test_video_metadata_roundtrip(tmp_path, suffix):
     path = tmp_path / f"videos.{suffix}"
     v1 = VideoMetadata(video_id="a", title="A")
@@ -32,7 +32,7 @@ def test_video_metadata_roundtrip(tmp_path, suffix):
     assert loaded_sorted == [v1, v2]
 
 
-@pytest.mark.parametrize("suffix", ["json", "sqlite"])
+@pytest.mark.parametrize("suffix", ["json", "jsonl", "sqlite"])
 def test_short_mapping_roundtrip(tmp_path, suffix):
     path = tmp_path / f"shorts.{suffix}"
     m1 = ShortMapping(short_video_id="s1", full_video_id="f1")
@@ -41,4 +41,312 @@ def test_short_mapping_roundtrip(tmp_path, suffix):
     append_short_mappings([m2], path)
     loaded = load_short_mappings(path)
     loaded_sorted = sorted(loaded, key=lambda m: m.short_video_id)
-    assert loaded_sorted == [m1, m2]
\ No newline at end of file
+    assert loaded_sorted == [m1, m2]
+
+
+def test_uploads_cursor_roundtrip(tmp_path, monkeypatch):
+    from youtube_scanner.models import UploadsCursor
+
+    monkeypatch.setattr(storage, "_STORAGE_FILE", tmp_path / "state.json")
+    assert storage.get_uploads_cursor("channel1") is None
+    cursor = UploadsCursor("vid", datetime(2024, 1, 1))
+    storage.update_uploads_cursor("channel1", cursor)
+    assert storage.get_uploads_cursor("channel1") == cursor
+
+
+def test_jsonl_last_writer_wins_and_compaction(tmp_path):
+    from youtube_scanner.storage import compact_short_mappings, compact_video_metadata
+
+    path = tmp_path / "videos.jsonl"
+    append_video_metadata([VideoMetadata("a", "old"), VideoMetadata("b", "B")], path)
+    append_video_metadata([VideoMetadata("a", "new", view_count=5)], path)
+    with path.open("a", encoding="utf-8") as fh:
+        fh.write('{"video_id": "c", "tit')  # torn write
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 4
+
+    loaded = load_video_metadata(path)
+    assert [(v.video_id, v.title) for v in loaded] == [("b", "B"), ("a", "new")]
+
+    assert compact_video_metadata(path) == 2
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 2
+    assert load_video_metadata(path) == loaded
+    assert sorted(tmp_path.iterdir()) == [path, tmp_path / "videos.jsonl.lock"]
+
+    shorts = tmp_path / "shorts.jsonl"
+    append_short_mappings(
+        [ShortMapping("s1"), ShortMapping("s1", "f1", "desc")], shorts
+    )
+    assert compact_short_mappings(shorts) == 1
+    assert load_short_mappings(shorts) == [ShortMapping("s1", "f1", "desc")]
+
+
+def test_jsonl_appends_during_compaction_are_kept(tmp_path):
+    import threading
+
+    from youtube_scanner.storage import compact_video_metadata
+
+    path = tmp_path / "videos.jsonl"
+    append_video_metadata([VideoMetadata("seed", "t")], path)
+
+    def append():
+        for i in range(200):
+            append_video_metadata([VideoMetadata(f"v{i}", "t")], path)
+
+    writer = threading.Thread(target=append)
+    writer.start()
+    while writer.is_alive():
+        compact_video_metadata(path)
+    writer.join()
+    assert len(load_video_metadata(path)) == 201
+
+
+def test_jsonl_append_after_torn_line_starts_a_new_line(tmp_path):
+    path = tmp_path / "videos.jsonl"
+    append_video_metadata([VideoMetadata("a", "A"), VideoMetadata("b", "B")], path)
+    text = path.read_text(encoding="utf-8")
+    path.write_text(text[: text.rindex('"title"')], encoding="utf-8")  # torn write
+
+    append_video_metadata([VideoMetadata("c", "C")], path)
+    assert [v.video_id for v in load_video_metadata(path)] == ["a", "c"]
+
+
+def test_jsonl_reader_keeps_its_file_across_compaction(tmp_path, monkeypatch):
+    from youtube_scanner import storage as storage_module
+
+    path = tmp_path / "videos.jsonl"
+    append_video_metadata([VideoMetadata("a", "old"), VideoMetadata("b", "B")], path)
+    with path.open("a", encoding="utf-8") as fh:
+        fh.write("not json\n")
+    append_video_metadata([VideoMetadata("a", "new"), VideoMetadata("c", "C")], path)
+
+    compactions = []
+
+    def compact_mid_read(*args):
+        # The first pass warns about the bad line; compact before the second.
+        if not compactions:
+            compactions.append(path)
+            storage_module.compact_video_metadata(path)
+
+    monkeypatch.setattr(storage_module.logging, "warning", compact_mid_read)
+    loaded = load_video_metadata(path)
+    assert compactions == [path]
+    assert [(v.video_id, v.title) for v in loaded] == [
+        ("b", "B"),
+        ("a", "new"),
+        ("c", "C"),
+    ]
+
+
+def test_sqlite_store_connection_per_thread_and_schema_version(tmp_path):
+    import sqlite3
+    import threading
+
+    from youtube_scanner import storage as store_module
+
+    path = tmp_path / "videos.db"
+    legacy = sqlite3.connect(path)
+    legacy.execute(
+        "CREATE TABLE video_metadata (video_id TEXT PRIMARY KEY, title TEXT, "
+        "description TEXT, publish_date TEXT, view_count INTEGER, "
+        "like_count INTEGER, comment_count INTEGER, duration INTEGER, "
+        "is_short INTEGER)"
+    )
+    legacy.execute(
+        "INSERT INTO video_metadata (video_id, title, is_short) "
+        "VALUES ('old', 'Old', 0)"
+    )
+    legacy.commit()
+    legacy.close()
+
+    store = store_module.get_store(path)
+    try:
+        assert store_module.get_store(str(path)) is store
+        conn = store.connection()
+        assert store.connection() is conn
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert (
+            conn.execute("PRAGMA user_version").fetchone()[0]
+            == store_module.SCHEMA_VERSION
+        )
+        assert [v.video_id for v in load_video_metadata(path)] == ["old"]
+
+        others = []
+        thread = threading.Thread(target=lambda: others.append(store.connection()))
+        thread.start()
+        thread.join()
+        assert others[0] is not conn
+    finally:
+        store_module.close_stores()
+
+
+def test_sqlite_readers_do_not_block_writers(tmp_path):
+    import threading
+
+    from youtube_scanner import storage as store_module
+
+    path = tmp_path / "videos.sqlite"
+    append_video_metadata([VideoMetadata("a", "A")], path)
+    seen = []
+    try:
+        with store_module.get_store(path).transaction() as conn:
+            conn.execute(
+                "INSERT INTO video_metadata (video_id, title, is_short) "
+                "VALUES ('b', 'B', 0)"
+            )
+            reader = threading.Thread(
+                target=lambda: seen.extend(load_video_metadata(path))
+            )
+            reader.start()
+            reader.join(timeout=2)
+        assert [v.video_id for v in seen] == ["a"]
+        assert sorted(v.video_id for v in load_video_metadata(path)) == ["a", "b"]
+
+        with pytest.raises(RuntimeError):
+            with store_module.get_store(path).transaction() as conn:
+                conn.execute("DELETE FROM video_metadata")
+                raise RuntimeError("boom")
+        assert len(load_video_metadata(path)) == 2
+    finally:
+        store_module.close_stores()
+
+
+@pytest.mark.parametrize("suffix", ["json", "jsonl", "sqlite"])
+def test_iter_video_metadata_filters(tmp_path, suffix):
+    from youtube_scanner.storage import iter_short_mappings, iter_video_metadata
+
+    path = tmp_path / f"videos.{suffix}"
+    append_video_metadata(
+        [
+            VideoMetadata(
+                "s1",
+                "S1",
+                publish_date=datetime(2024, 1, 5),
+                view_count=60_000,
+                is_short=True,
+            ),
+            VideoMetadata(
+                "s2",
+                "S2",
+                publish_date=datetime(2024, 2, 5),
+                view_count=10,
+                is_short=True,
+            ),
+            VideoMetadata("s3", "S3", view_count=None, is_short=True),
+            VideoMetadata(
+                "l1", "L1", publish_date=datetime(2024, 1, 20), view_count=90_000
+            ),
+        ],
+        path,
+    )
+
+    def ids(**filters):
+        return sorted(
+            v.video_id for v in iter_video_metadata(path, batch_size=1, **filters)
+        )
+
+    try:
+        assert ids() == ["l1", "s1", "s2", "s3"]
+        assert ids(is_short=True) == ["s1", "s2", "s3"]
+        assert ids(is_short=False) == ["l1"]
+        assert ids(min_views=50_000) == ["l1", "s1"]
+        assert ids(published_after=datetime(2024, 1, 10)) == ["l1", "s2"]
+        assert ids(published_before=datetime(2024, 1, 20)) == ["s1"]
+        assert ids(
+            is_short=True, min_views=50_000, published_after=datetime(2024, 1, 1)
+        ) == ["s1"]
+
+        mappings = tmp_path / f"shorts.{suffix}"
+        append_short_mappings(
+            [ShortMapping("s1", "l1", "description"), ShortMapping("s2")], mappings
+        )
+        assert list(iter_short_mappings(mappings, relation_source="description")) == [
+            ShortMapping("s1", "l1", "description")
+        ]
+    finally:
+        storage.close_stores()
+
+
+@pytest.mark.parametrize("suffix", ["json", "jsonl", "sqlite"])
+def test_iter_video_metadata_compares_dates_in_utc(tmp_path, suffix):
+    from datetime import timedelta, timezone
+
+    from youtube_scanner.storage import iter_video_metadata
+
+    path = tmp_path / f"videos.{suffix}"
+    berlin = timezone(timedelta(hours=1))
+    append_video_metadata(
+        [
+            # 2024-01-10 09:00 UTC, written with an offset
+            VideoMetadata(
+                "a", "A", publish_date=datetime(2024, 1, 10, 10, tzinfo=berlin)
+            ),
+            VideoMetadata(
+                "b", "B", publish_date=datetime(2024, 1, 10, 11, tzinfo=timezone.utc)
+            ),
+            VideoMetadata("c", "C", publish_date=datetime(2024, 1, 10, 10)),
+        ],
+        path,
+    )
+
+    def ids(**filters):
+        return sorted(v.video_id for v in iter_video_metadata(path, **filters))
+
+    try:
+        # Naive bounds are UTC and can be compared with aware stored dates
+        assert ids(published_after=datetime(2024, 1, 10, 9, 30)) == ["b", "c"]
+        assert ids(published_before=datetime(2024, 1, 10, 10)) == ["a"]
+        # Aware bounds are converted, whatever their offset
+        assert ids(published_after=datetime(2024, 1, 10, 11, tzinfo=berlin)) == [
+            "b",
+            "c",
+        ]
+        assert ids(published_before=datetime(2024, 1, 10, 11, 30, tzinfo=berlin)) == [
+            "a",
+            "c",
+        ]
+    finally:
+        storage.close_stores()
+
+
+@pytest.mark.parametrize("suffix", ["jsonl", "sqlite"])
+def test_select_target_shorts_threshold_or_top_n(tmp_path, suffix):
+    from youtube_scanner.models import ChannelConfig
+    from youtube_scanner.storage import iter_video_metadata, select_target_shorts
+
+    path = tmp_path / f"videos.{suffix}"
+    views = [120_000, 80_000, 51_000, 40_000, 30_000, 20_000, 10_000]
+    append_video_metadata(
+        [
+            VideoMetadata(f"a{i}", "t", view_count=v, is_short=True, channel_id="A")
+            for i, v in enumerate(views)
+        ]
+        + [
+            VideoMetadata("a-long", "t", view_count=900_000, channel_id="A"),
+            VideoMetadata("a-unknown", "t", is_short=True, channel_id="A"),
+            VideoMetadata("b0", "t", view_count=500_000, is_short=True, channel_id="B"),
+        ],
+        path,
+    )
+    try:
+        selected = select_target_shorts(ChannelConfig("A", "A", top_n_shorts=5), path)
+        assert [v.video_id for v in selected] == ["a0", "a1", "a2", "a3", "a4"]
+        assert all(v.channel_id == "A" for v in selected)
+        few = select_target_shorts(ChannelConfig("A", "A", top_n_shorts=1), path)
+        assert [v.video_id for v in few] == ["a0", "a1", "a2"]
+        assert [v.video_id for v in iter_video_metadata(path, channel_id="B")] == ["b0"]
+
+        if suffix == "sqlite":
+            conn = storage.get_store(path).connection()
+            plan = " ".join(
+                row[-1]
+                for row in conn.execute(
+                    "EXPLAIN QUERY PLAN SELECT video_id FROM video_metadata "
+                    "WHERE channel_id = ? AND is_short = 1 AND view_count IS NOT NULL "
+                    "ORDER BY view_count DESC",
+                    ("A",),
+                )
+            )
+            assert "idx_video_metadata_channel_short_views" in plan
+            assert "TEMP B-TREE" not in plan
+    finally:
+        storage.close_stores()
@@ -0,0 +1,88 @@
+import importlib
+
+import pytest
+
+from youtube_scanner.tfidf import TfidfScorer, rank_tfidf_candidates
+
+# The module whose globals the scorer reads, whichever package provided it
+tfidf = importlib.import_module(TfidfScorer.__module__)
+
+LONGS = [
+    {
+        "id": "L1",
+        "title": "Black holes explained",
+        "description": "Gravity, event horizons and spaghettification",
+    },
+    {
+        "id": "L2",
+        "title": "Cooking pasta at home",
+        "description": "Fresh pasta with tomato sauce",
+    },
+    {
+        "id": "L3",
+        "title": "Neutron stars explained",
+        "description": "Dense stars and gravity",
+    },
+]
+SHORTS = [
+    {"id": "S1", "title": "Black holes in 60 seconds"},
+    {"id": "S2", "title": "Tomato sauce trick #shorts"},
+    {"id": "S3", "title": "Completely unrelated"},
+]
+
+
+@pytest.fixture(params=["scipy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(tfidf, "sparse", None)
+    elif tfidf.sparse is None:
+        pytest.skip("scipy not installed")
+    return request.param
+
+
+def test_scores_all_shorts_in_one_batch(backend):
+    scorer = TfidfScorer(LONGS)
+    assert scorer.backend == backend
+    results = scorer.score(SHORTS, limit=2)
+    assert [c.video_id for c in results["S1"]][0] == "L1"
+    assert [c.video_id for c in results["S2"]] == ["L2"]
+    assert results["S3"] == []
+    assert all(0 < c.score <= 1 and c.relation_source == "tfidf" for c in results["S1"])
+    assert results["S1"][0].video is LONGS[0]
+
+
+def test_transcripts_add_signal(backend):
+    transcripts = {
+        "S3": ["today we look at the event horizon of a black hole"],
+        "L1": ["the event horizon is the point of no return"],
+    }
+    results = rank_tfidf_candidates(SHORTS, LONGS, transcripts=transcripts, limit=1)
+    assert [c.video_id for c in results["S3"]] == ["L1"]
+
+
+def test_backends_agree(monkeypatch):
+    if tfidf.sparse is None:
+        pytest.skip("scipy not installed")
+    longs = [
+        {
+            "id": f"L{i}",
+            "title": f"topic {i % 7} part {i}",
+            "description": f"series {i % 3}",
+        }
+        for i in range(40)
+    ]
+    shorts = [
+        {"id": f"S{i}", "title": f"topic {i % 7} part {i} clip"} for i in range(15)
+    ]
+    fast = rank_tfidf_candidates(shorts, longs, limit=3, min_score=0.1)
+    monkeypatch.setattr(tfidf, "sparse", None)
+    slow = rank_tfidf_candidates(shorts, longs, limit=3, min_score=0.1)
+    assert fast.keys() == slow.keys()
+    for short_id in fast:
+        assert [c.video_id for c in fast[short_id]] == [
+            c.video_id for c in slow[short_id]
+        ]
+        assert [c.score for c in fast[short_id]] == pytest.approx(
+            [c.score for c in slow[short_id]]
+        )
+    assert fast["S3"][0].video_id == "L3"
@@ -0,0 +1,67 @@
+from youtube_scanner.models import VideoMetadata
+from youtube_scanner.title_index import (
+    SOURCE_DESCRIPTION,
+    SOURCE_TITLE,
+    SOURCE_TITLE_EXACT,
+    TitleIndex,
+    tokenize,
+)
+
+LONGS = [
+    {
+        "id": "l1",
+        "title": "The Truth About Black Holes",
+        "description": "Full documentary",
+    },
+    {
+        "id": "l2",
+        "title": "Compound Interest Explained",
+        "description": "How money grows",
+    },
+    {
+        "id": "l3",
+        "title": "Podcast #12",
+        "description": "We talk about black holes and quasars",
+    },
+    {"id": "l4", "title": "Black Holes in 1 Minute", "description": ""},
+]
+
+
+def test_tokenize_drops_case_punctuation_and_stopwords():
+    assert tokenize("The TRUTH about Black-Holes #shorts") == [
+        "truth",
+        "about",
+        "black",
+        "holes",
+    ]
+    assert tokenize(None) == []
+
+
+def test_exact_title_ranks_first_then_token_matches():
+    index = TitleIndex(LONGS)
+    found = index.candidates("black holes in 1 minute", limit=3)
+    assert [(c.video_id, c.relation_source) for c in found] == [
+        ("l4", SOURCE_TITLE_EXACT),
+        ("l1", SOURCE_TITLE),
+        ("l3", SOURCE_DESCRIPTION),
+    ]
+    assert found[0].score == 1.0
+    assert 1.0 > found[1].score > found[2].score > 0
+    assert found[1].video is LONGS[0]
+
+
+def test_best_applies_min_score_and_ignores_unrelated_titles():
+    index = TitleIndex(LONGS)
+    assert index.best("Black Holes #shorts").video_id in {"l1", "l4"}
+    assert index.best("Cooking pasta") is None
+    assert index.candidates("") == []
+
+
+def test_per_channel_indexes_accept_video_metadata():
+    videos = [
+        VideoMetadata("a1", "Mars Explained", channel_id="A"),
+        VideoMetadata("b1", "Mars Explained", channel_id="B"),
+    ]
+    indexes = TitleIndex.per_channel(videos)
+    assert len(indexes["A"]) == 1
+    assert indexes["B"].best("mars explained").video_id == "b1"
@@ -0,0 +1,67 @@
+import random
+
+from youtube_scanner.models import TimedTranscript
+from youtube_scanner.transcript_align import align_transcripts
+
+WORDS = (
+    "alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima mike"
+).split()
+
+
+def _long(lines=300, seed=0):
+    rng = random.Random(seed)
+    transcript = TimedTranscript("long")
+    for number in range(lines):
+        text = " ".join(rng.choice(WORDS) for _ in range(7))
+        transcript.append(text, start=number * 2.0, duration=1.8)
+    return transcript
+
+
+def test_align_finds_clip_offsets():
+    long = _long()
+    alignment = align_transcripts(long.lines[120:135], long)
+    assert alignment is not None
+    assert (alignment.first_line, alignment.last_line) == (120, 134)
+    assert alignment.start == 240.0
+    assert alignment.end == 134 * 2.0 + 1.8
+    assert alignment.confidence == 1.0
+
+
+def test_align_tolerates_transcription_differences():
+    long = _long()
+    clip = [line.upper() for line in long.lines[50:70]]
+    clip[5] = "completely different words here"
+    clip[12] = clip[12] + " um"
+    short = TimedTranscript("short")
+    for number, line in enumerate(clip):
+        short.append(line, number * 2.0, 1.8)
+    alignment = align_transcripts(short, long)
+    assert alignment is not None
+    assert 49 <= alignment.first_line <= 51
+    assert 68 <= alignment.last_line <= 70
+    assert 0.5 < alignment.confidence < 1.0
+
+
+def test_align_rejects_unrelated_and_short_input():
+    long = _long()
+    unrelated = _long(lines=15, seed=42).lines
+    assert align_transcripts(unrelated, long) is None
+    assert align_transcripts(["too short"], long) is None
+    assert align_transcripts(long.lines[:10], TimedTranscript("empty")) is None
+
+
+def test_align_does_not_trust_colliding_hashes(monkeypatch):
+    from types import SimpleNamespace
+
+    from src.youtube_scanner import transcript_align
+
+    # Every word hashes alike, so every window of the Short collides with
+    # every window of the long transcript
+    monkeypatch.setattr(transcript_align, "zlib", SimpleNamespace(crc32=lambda data: 0))
+    long = _long(lines=40)
+    assert (
+        align_transcripts(["november oscar papa quebec romeo sierra tango"] * 3, long)
+        is None
+    )
+    alignment = align_transcripts(long.lines[10:15], long)
+    assert (alignment.first_line, alignment.last_line) == (10, 14)
@@ -1,8 +1,8 @@
-import pytest
 from youtube_transcript_api import TranscriptsDisabled
 from requests import exceptions as requests_exceptions
 
-from youtube_scanner.transcript_fetcher import fetch_transcript
+from youtube_scanner.models import TimedTranscript
+from youtube_scanner.transcript_fetcher import fetch_timed_transcript, fetch_transcript
 
 
 def test_fetch_transcript_success(monkeypatch):
@@ -41,3 +41,178 @@ def test_fetch_transcript_network_error(monkeypatch, caplog):
         result = fetch_transcript("vid")
     assert result == []
     assert "Network error retrieving transcript" in caplog.text
+
+
+def test_fetch_timed_transcript_keeps_timing(monkeypatch):
+    sample = [
+        {"text": "Hello", "start": 0.0, "duration": 1.5},
+        {"text": "", "start": 1.5, "duration": 0.5},
+        {"text": "World", "start": 2.0, "duration": 2.25},
+    ]
+    monkeypatch.setattr(
+        "youtube_scanner.transcript_fetcher.YouTubeTranscriptApi.fetch",
+        lambda self, video_id, languages=None: sample,
+    )
+    transcript = fetch_timed_transcript("vid")
+    assert transcript.video_id == "vid"
+    assert transcript.lines == ["Hello", "World"]
+    assert list(transcript.starts) == [0.0, 2.0]
+    assert transcript.span(0, 1) == (0.0, 4.25)
+    assert TimedTranscript.from_json(transcript.to_json()) == transcript
+
+
+def test_fetch_transcript_accepts_fetched_transcript_objects(monkeypatch):
+    class Fetched:
+        def __iter__(self):
+            raise AssertionError("snippets should be converted with to_raw_data")
+
+        def to_raw_data(self):
+            return [{"text": "Hi", "start": 3.0, "duration": 1.0}]
+
+    monkeypatch.setattr(
+        "youtube_scanner.transcript_fetcher.YouTubeTranscriptApi.fetch",
+        lambda self, video_id, languages=None: Fetched(),
+    )
+    assert fetch_transcript("vid") == ["Hi"]
+    assert list(fetch_timed_transcript("vid").starts) == [3.0]
+
+
+def test_fetch_timed_transcript_disabled(monkeypatch):
+    def _raise(self, video_id, languages=None):
+        raise TranscriptsDisabled("disabled")
+
+    monkeypatch.setattr(
+        "youtube_scanner.transcript_fetcher.YouTubeTranscriptApi.fetch",
+        _raise,
+    )
+    assert len(fetch_timed_transcript("vid")) == 0
+
+
+def test_fetch_transcripts_runs_concurrently_in_priority_order(monkeypatch):
+    import threading
+
+    from quota import TokenBucket
+    from youtube_scanner.transcript_fetcher import fetch_transcripts
+
+    calls = []
+    threads = set()
+
+    def fake_fetch(self, video_id, languages=None):
+        calls.append(video_id)
+        threads.add(threading.get_ident())
+        if video_id == "none":
+            raise TranscriptsDisabled(video_id)
+        return [{"text": f"line of {video_id}", "start": 1.0, "duration": 2.0}]
+
+    monkeypatch.setattr(
+        "youtube_scanner.transcript_fetcher.YouTubeTranscriptApi.fetch", fake_fetch
+    )
+    limiter = TokenBucket(100, 100)
+
+    result = fetch_transcripts(
+        ["long1", "none", "short1", "long1", "short2"],
+        concurrency=1,
+        priority={"short1": 0, "short2": 0, "long1": 1},
+        rate_limiter=limiter,
+    )
+    assert calls == ["short1", "short2", "long1", "none"]
+    assert result == {
+        "long1": ["line of long1"],
+        "none": [],
+        "short1": ["line of short1"],
+        "short2": ["line of short2"],
+    }
+    assert list(result) == ["long1", "none", "short1", "short2"]
+
+    calls.clear()
+    timed = fetch_transcripts(
+        [f"v{i}" for i in range(40)], concurrency=8, timed=True, rate_limiter=limiter
+    )
+    assert len(calls) == 40 and len(threads) > 1
+    assert list(timed["v3"].starts) == [1.0]
+
+
+def test_fetch_transcripts_backs_off_when_throttled(monkeypatch, caplog):
+    from youtube_transcript_api import RequestBlocked
+
+    from quota import TokenBucket
+    from youtube_scanner import transcript_fetcher
+
+    attempts = {"ok": 0, "blocked": 0}
+
+    def fake_fetch(self, video_id, languages=None):
+        attempts[video_id] += 1
+        if video_id == "blocked" or attempts[video_id] < 3:
+            raise RequestBlocked(video_id)
+        return [{"text": "finally", "start": 0.0, "duration": 1.0}]
+
+    sleeps = []
+    monkeypatch.setattr(
+        "youtube_scanner.transcript_fetcher.YouTubeTranscriptApi.fetch", fake_fetch
+    )
+    monkeypatch.setattr(transcript_fetcher.time, "sleep", sleeps.append)
+    limiter = TokenBucket(100, 100)
+
+    with caplog.at_level("WARNING"):
+        result = transcript_fetcher.fetch_transcripts(
+            ["ok", "blocked"],
+            concurrency=1,
+            rate_limiter=limiter,
+            max_retries=2,
+            backoff=1.0,
+        )
+    assert result == {"ok": ["finally"], "blocked": []}
+    assert attempts == {"ok": 3, "blocked": 3}
+    assert 1.0 <= sleeps[0] < 2.0 and 2.0 <= sleeps[1] < 4.0
+    assert "Giving up on transcript for blocked" in caplog.text
+    # A single-video fetch logs throttling instead of retrying
+    assert transcript_fetcher.fetch_transcript("blocked") == []
+    assert "throttled for blocked" in caplog.text
+
+
+def test_fetch_transcripts_reads_and_fills_store(monkeypatch, tmp_path):
+    from quota import TokenBucket
+    from youtube_scanner.transcript_fetcher import fetch_transcripts
+    from youtube_scanner.transcript_store import TranscriptStore
+
+    calls = []
+
+    def fake_fetch(self, video_id, languages=None):
+        calls.append(video_id)
+        if video_id == "none":
+            raise TranscriptsDisabled(video_id)
+        if video_id == "offline":
+            raise requests_exceptions.ConnectionError(video_id)
+        return [{"text": f"line of {video_id}", "start": 3.0, "duration": 1.0}]
+
+    monkeypatch.setattr(
+        "youtube_scanner.transcript_fetcher.YouTubeTranscriptApi.fetch", fake_fetch
+    )
+    limiter = TokenBucket(100, 100)
+    with TranscriptStore(tmp_path) as store:
+        store.put_lines("cached", ["from disk"])
+        ids = ["cached", "new", "none", "offline"]
+        result = fetch_transcripts(
+            ids, concurrency=2, rate_limiter=limiter, store=store
+        )
+        assert result == {
+            "cached": ["from disk"],
+            "new": ["line of new"],
+            "none": [],
+            "offline": [],
+        }
+        assert sorted(calls) == ["new", "none", "offline"]
+        # Disabled captions are remembered as an empty transcript, network
+        # failures are not
+        assert "new" in store and "none" in store and "offline" not in store
+        assert store.get("none").lines == []
+
+        calls.clear()
+        assert fetch_transcripts(ids, rate_limiter=limiter, store=store)["none"] == []
+        assert calls == ["offline"]
+
+        calls.clear()
+        timed = fetch_transcripts(
+            ["new"], timed=True, rate_limiter=limiter, store=store
+        )
+        assert calls == [] and list(timed["new"].starts) == [3.0]
@@ -0,0 +1,63 @@
+import random
+
+from youtube_scanner import transcript_index
+from youtube_scanner.transcript_index import TranscriptIndex, transcript_words
+
+WORDS = (
+    "the quick brown fox jumps over a lazy dog while people watch and wonder why"
+).split()
+
+
+def _transcript(seed, lines=200):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(8)) for _ in range(lines)]
+
+
+def test_transcript_words_normalises_caption_lines():
+    assert transcript_words(["Hello, World!", "[Music] it's"]) == [
+        "hello",
+        "world",
+        "music",
+        "it",
+        "s",
+    ]
+
+
+def test_query_finds_source_of_excerpt_with_coverage():
+    longs = {f"long{i}": _transcript(i) for i in range(20)}
+    index = TranscriptIndex.build(longs, lambda video_id: longs[video_id])
+    assert len(index) == 20
+
+    excerpt = longs["long7"][50:60]
+    matches = index.query(excerpt)
+    assert matches[0].video_id == "long7"
+    assert matches[0].score == 1.0
+    assert matches[0].relation_source == "transcript"
+    assert all(match.score < 0.5 for match in matches[1:])
+
+    noisy = excerpt[:5] + _transcript(99, 5)
+    assert index.query(noisy)[0].video_id == "long7"
+    assert 0.3 < index.query(noisy)[0].score < 1.0
+    assert index.query(excerpt, exclude="long7")[:1] != [matches[0]]
+
+
+def test_incremental_adds_and_empty_transcripts():
+    index = TranscriptIndex()
+    index.add("empty", [])
+    assert index.query(["nothing to see"]) == []
+    index.add("a", _transcript(1))
+    first = index.query(_transcript(1)[10:20])
+    index.add("b", _transcript(2))
+    assert index.query(_transcript(2)[10:20])[0].video_id == "b"
+    assert index.query(_transcript(1)[10:20]) == first
+
+
+def test_pure_python_fallback(monkeypatch):
+    monkeypatch.setattr(transcript_index, "numpy", None, raising=False)
+    monkeypatch.setattr(
+        "src.youtube_scanner.transcript_index.numpy", None, raising=False
+    )
+    index = TranscriptIndex()
+    index.add("a", _transcript(3))
+    index.add("b", _transcript(4))
+    assert index.query(_transcript(4)[:10])[0].video_id == "b"
@@ -0,0 +1,114 @@
+import pytest
+
+from youtube_scanner.models import TimedTranscript
+from youtube_scanner.transcript_index import TranscriptIndex
+from youtube_scanner.transcript_store import (
+    INDEX_FILE,
+    SEGMENT_FILE,
+    TranscriptStore,
+    decode_transcript,
+    encode_transcript,
+    iter_transcripts,
+)
+
+
+def _transcript(video_id, lines=("first line", "zweite Zeile ü")):
+    transcript = TimedTranscript(video_id)
+    for number, line in enumerate(lines):
+        transcript.append(line, number * 2.5, 2.0)
+    return transcript
+
+
+def test_payload_round_trip_keeps_text_and_timing():
+    transcript = _transcript("vid")
+    decoded = decode_transcript("vid", encode_transcript(transcript))
+    assert decoded == transcript
+    untimed = decode_transcript(
+        "vid", encode_transcript(TimedTranscript("vid", ["a", "b"]))
+    )
+    assert untimed.lines == ["a", "b"] and list(untimed.starts) == [0.0, 0.0]
+
+
+@pytest.mark.parametrize("codec", ["zlib", "lzma"])
+def test_store_round_trip_and_reopen(tmp_path, codec):
+    with TranscriptStore(tmp_path, codec=codec) as store:
+        store.put(_transcript("vid00000001"))
+        store.put_lines("vid00000002", ["only text"])
+        assert store.get("vid00000001") == _transcript("vid00000001")
+        assert store.get("missing") is None and store.get_lines("missing") == []
+    assert sorted(p.name for p in tmp_path.iterdir()) == [INDEX_FILE, SEGMENT_FILE]
+
+    with TranscriptStore(tmp_path) as store:
+        assert len(store) == 2 and "vid00000002" in store
+        assert store.get_lines("vid00000002") == ["only text"]
+        assert list(store.get("vid00000001").starts) == [0.0, 2.5]
+
+
+def test_index_grows_and_latest_version_wins(tmp_path):
+    with TranscriptStore(tmp_path) as store:
+        for number in range(1500):
+            store.put_lines(f"v{number:06d}", [f"line {number}"])
+        store.put_lines("v000007", ["rewritten"])
+        assert len(store) == 1500
+        assert store.get_lines("v001234") == ["line 1234"]
+        assert store.get_lines("v000007") == ["rewritten"]
+
+    streamed = list(iter_transcripts(tmp_path))
+    assert len(streamed) == 1500
+    assert streamed[0].video_id == "v000000"
+    assert streamed[-1].video_id == "v000007" and streamed[-1].lines == ["rewritten"]
+
+
+def test_missing_or_corrupt_index_is_rebuilt(tmp_path):
+    with TranscriptStore(tmp_path) as store:
+        store.put_lines("a", ["one"])
+        store.put_lines("b", ["two"])
+        store.put_lines("a", ["three"])
+    (tmp_path / INDEX_FILE).unlink()
+    with TranscriptStore(tmp_path) as store:
+        assert len(store) == 2 and store.get_lines("a") == ["three"]
+
+    (tmp_path / INDEX_FILE).write_bytes(b"not an index" * 10)
+    with TranscriptStore(tmp_path) as store:
+        assert store.get_lines("b") == ["two"]
+
+
+def test_unindexed_and_torn_records_are_recovered(tmp_path):
+    with TranscriptStore(tmp_path) as store:
+        store.put_lines("a", ["one"])
+    index = (tmp_path / INDEX_FILE).read_bytes()
+    with TranscriptStore(tmp_path) as store:
+        store.put_lines("b", ["two"])
+    # Simulate a crash after the segment write but before the index update,
+    # followed by a record cut off halfway
+    (tmp_path / INDEX_FILE).write_bytes(index)
+    size = (tmp_path / SEGMENT_FILE).stat().st_size
+    with open(tmp_path / SEGMENT_FILE, "ab") as fh:
+        fh.write(b"b".ljust(16, b"\x00") + b"\xff\x00\x00\x00\x01torn")
+
+    with TranscriptStore(tmp_path) as store:
+        assert store.get_lines("b") == ["two"] and len(store) == 2
+        assert (tmp_path / SEGMENT_FILE).stat().st_size == size
+        store.put_lines("c", ["three"])
+    with TranscriptStore(tmp_path) as store:
+        assert [t.video_id for t in store.iter_transcripts()] == ["a", "b", "c"]
+
+
+def test_store_feeds_transcript_index(tmp_path):
+    words = " ".join(f"word{number}" for number in range(40))
+    with TranscriptStore(tmp_path) as store:
+        store.put_lines("long1", [words])
+        store.put_lines("long2", ["something else entirely " * 5])
+        index = TranscriptIndex.build(["long1", "long2"], store.get_lines)
+    matches = index.query([" ".join(words.split()[10:25])], limit=1)
+    assert matches[0].video_id == "long1"
+
+
+def test_invalid_keys_and_codecs_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        TranscriptStore(tmp_path, codec="gzip")
+    with TranscriptStore(tmp_path) as store:
+        with pytest.raises(ValueError):
+            store.put_lines("x" * 17, ["too long"])
+        with pytest.raises(ValueError):
+            store.get("")
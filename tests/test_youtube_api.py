@@ -1,7 +1,8 @@
 import requests
 from unittest.mock import Mock, patch
 
-from youtube_api import fetch_uploads_playlist_video_ids
+from youtube_api import fetch_uploads_playlist_video_ids, fetch_videos_batch
+from youtube_scanner.models import VideoMetadata
 
 
 def test_fetch_uploads_playlist_video_ids_handles_pagination():
@@ -27,19 +28,60 @@ def test_fetch_uploads_playlist_video_ids_handles_pagination():
     }
     second_page.raise_for_status.return_value = None
 
-    with patch("youtube_api.requests.get", side_effect=[channel_resp, first_page, second_page]):
+    with patch(
+        "http_client.requests.Session.get",
+        side_effect=[channel_resp, first_page, second_page],
+    ):
         result = fetch_uploads_playlist_video_ids("CHANNEL", "KEY")
 
     assert result == ["id1", "id2", "id3"]
 
 
+def test_iter_uploads_playlist_pages_reports_incomplete_walk():
+    from youtube_api import UploadsWalk, iter_uploads_playlist_pages
+
+    channel_resp = Mock()
+    channel_resp.json.return_value = {
+        "items": [{"contentDetails": {"relatedPlaylists": {"uploads": "UPLOADS_ID"}}}]
+    }
+    first_page = Mock()
+    first_page.json.return_value = {
+        "items": [{"contentDetails": {"videoId": "id1"}}],
+        "nextPageToken": "TOKEN",
+    }
+    last_page = Mock()
+    last_page.json.return_value = {"items": [{"contentDetails": {"videoId": "id2"}}]}
+
+    walk = UploadsWalk()
+    with patch(
+        "http_client.requests.Session.get",
+        side_effect=[channel_resp, first_page, last_page],
+    ):
+        assert list(iter_uploads_playlist_pages("CHANNEL", "KEY", walk=walk)) == [
+            ["id1"],
+            ["id2"],
+        ]
+    assert walk.complete and walk.ok
+
+    walk = UploadsWalk()
+    failure = requests.exceptions.ConnectionError("boom")
+    with patch(
+        "http_client.requests.Session.get",
+        side_effect=[channel_resp, first_page, failure],
+    ):
+        assert list(iter_uploads_playlist_pages("CHANNEL", "KEY", walk=walk)) == [
+            ["id1"]
+        ]
+    assert not walk.complete and not walk.ok
+
+
 def test_fetch_uploads_playlist_video_ids_quota_exceeded(caplog):
     resp = Mock()
     resp.status_code = 403
     resp.json.return_value = {"error": {"errors": [{"reason": "quotaExceeded"}]}}
     resp.raise_for_status.side_effect = requests.exceptions.HTTPError(response=resp)
 
-    with patch("youtube_api.requests.get", return_value=resp):
+    with patch("http_client.requests.Session.get", return_value=resp):
         with caplog.at_level("ERROR"):
             result = fetch_uploads_playlist_video_ids("CHANNEL", "KEY")
 
@@ -48,9 +90,199 @@ def test_fetch_uploads_playlist_video_ids_quota_exceeded(caplog):
 
 
 def test_fetch_uploads_playlist_video_ids_network_issue(caplog):
-    with patch("youtube_api.requests.get", side_effect=requests.exceptions.RequestException("boom")):
+    with patch(
+        "http_client.requests.Session.get",
+        side_effect=requests.exceptions.RequestException("boom"),
+    ):
         with caplog.at_level("WARNING"):
             result = fetch_uploads_playlist_video_ids("CHANNEL", "KEY")
 
     assert result == []
     assert "network issue" in caplog.text.lower()
+
+
+def _videos_page(ids):
+    resp = Mock()
+    resp.json.return_value = {
+        "items": [
+            {
+                "id": vid,
+                "snippet": {
+                    "title": f"Title {vid}",
+                    "publishedAt": "2024-01-02T03:04:05Z",
+                },
+                "contentDetails": {
+                    "duration": "PT45S" if vid.startswith("s") else "PT1H2M3S"
+                },
+                "statistics": {"viewCount": "1200", "likeCount": "30"},
+            }
+            for vid in ids
+        ]
+    }
+    resp.raise_for_status.return_value = None
+    return resp
+
+
+def test_fetch_videos_batch_chunks_requests_and_reports_missing():
+    ids = [f"s{i}" for i in range(60)] + ["long1", "gone"]
+    pages = [_videos_page(ids[:50]), _videos_page(ids[50:61])]
+
+    with patch("http_client.requests.Session.get", side_effect=pages) as mock_get:
+        result = fetch_videos_batch(ids + ["s0"], "KEY")
+
+    assert mock_get.call_count == 2
+    sent = [call.kwargs["params"]["id"].split(",") for call in mock_get.call_args_list]
+    assert [len(chunk) for chunk in sent] == [50, 12]
+    # videos.list rejects maxResults when IDs are given
+    assert all(
+        "maxResults" not in call.kwargs["params"] for call in mock_get.call_args_list
+    )
+    assert list(result.videos) == ids[:-1]
+    assert result.missing == ["gone"]
+    assert result.failed == []
+
+    short, full = result.videos["s0"], result.videos["long1"]
+    assert isinstance(short, VideoMetadata)
+    assert short.is_short and short.duration == 45 and short.view_count == 1200
+    assert not full.is_short and full.duration == 3723
+    assert full.publish_date.year == 2024
+
+
+def test_fetch_videos_batch_quota_exceeded_marks_remaining_failed(caplog):
+    resp = Mock()
+    resp.status_code = 403
+    resp.json.return_value = {"error": {"errors": [{"reason": "quotaExceeded"}]}}
+    resp.raise_for_status.side_effect = requests.exceptions.HTTPError(response=resp)
+    ids = [f"v{i}" for i in range(70)]
+
+    with patch(
+        "http_client.requests.Session.get", side_effect=[_videos_page(ids[:50]), resp]
+    ):
+        with caplog.at_level("ERROR"):
+            result = fetch_videos_batch(ids, "KEY")
+
+    assert len(result.videos) == 50
+    assert result.failed == ids[50:]
+    assert "quota exceeded" in caplog.text.lower()
+
+
+def test_fetch_uploads_playlist_video_ids_stops_at_known_upload():
+    from datetime import datetime, timezone
+
+    from youtube_scanner.models import UploadsCursor
+
+    channel_resp = Mock()
+    channel_resp.json.return_value = {
+        "items": [{"contentDetails": {"relatedPlaylists": {"uploads": "UPLOADS_ID"}}}]
+    }
+    page = Mock()
+    page.json.return_value = {
+        "items": [
+            {
+                "contentDetails": {
+                    "videoId": "new2",
+                    "videoPublishedAt": "2024-03-01T00:00:00Z",
+                }
+            },
+            {
+                "contentDetails": {
+                    "videoId": "new1",
+                    "videoPublishedAt": "2024-02-01T00:00:00Z",
+                }
+            },
+            {
+                "contentDetails": {
+                    "videoId": "old",
+                    "videoPublishedAt": "2024-01-01T00:00:00Z",
+                }
+            },
+        ],
+        "nextPageToken": "MORE",
+    }
+
+    with patch(
+        "http_client.requests.Session.get", side_effect=[channel_resp, page]
+    ) as mock_get:
+        by_id = fetch_uploads_playlist_video_ids(
+            "CHANNEL", "KEY", since=UploadsCursor("old")
+        )
+    assert by_id == ["new2", "new1"]
+    assert mock_get.call_count == 2
+
+    # The known video was deleted: stop at anything published before it instead
+    deleted = UploadsCursor("gone", datetime(2024, 1, 15, tzinfo=timezone.utc))
+    with patch("http_client.requests.Session.get", side_effect=[channel_resp, page]):
+        by_date = fetch_uploads_playlist_video_ids("CHANNEL", "KEY", since=deleted)
+    assert by_date == ["new2", "new1"]
+
+
+def test_prefetch_preserves_order_and_propagates_errors():
+    import pytest
+
+    from youtube_api import prefetch
+
+    assert list(prefetch(iter(range(5)), depth=2)) == [0, 1, 2, 3, 4]
+    assert list(prefetch(iter(range(3)), depth=0)) == [0, 1, 2]
+
+    def failing():
+        yield 1
+        raise RuntimeError("boom")
+
+    consumed = []
+    with pytest.raises(RuntimeError):
+        for item in prefetch(failing()):
+            consumed.append(item)
+    assert consumed == [1]
+
+
+def test_fetch_pinned_comments_skips_disabled_and_stops_on_quota(caplog):
+    from youtube_api import fetch_pinned_comments
+
+    owner = Mock()
+    owner.raise_for_status.return_value = None
+    owner.json.return_value = {
+        "items": [
+            {
+                "snippet": {
+                    "channelId": "UCowner",
+                    "topLevelComment": {
+                        "snippet": {
+                            "authorChannelId": {"value": "UCowner"},
+                            "textOriginal": "Full video: youtu.be/x",
+                        }
+                    },
+                }
+            },
+            {
+                "snippet": {
+                    "channelId": "UCowner",
+                    "topLevelComment": {
+                        "snippet": {
+                            "authorChannelId": {"value": "UCfan"},
+                            "textOriginal": "Nice",
+                        }
+                    },
+                }
+            },
+        ]
+    }
+    disabled = Mock()
+    disabled.status_code = 403
+    disabled.json.return_value = {"error": {"errors": [{"reason": "commentsDisabled"}]}}
+    disabled.raise_for_status.side_effect = requests.exceptions.HTTPError("403")
+    exhausted = Mock()
+    exhausted.status_code = 403
+    exhausted.json.return_value = {"error": {"errors": [{"reason": "quotaExceeded"}]}}
+    exhausted.raise_for_status.side_effect = requests.exceptions.HTTPError("403")
+
+    with patch(
+        "http_client.requests.Session.get", side_effect=[owner, disabled, exhausted]
+    ) as get:
+        with caplog.at_level("WARNING"):
+            result = fetch_pinned_comments(["v1", "v2", "v3", "v4", "v1"], "KEY")
+
+    assert result == {"v1": ["Full video: youtu.be/x"]}
+    assert get.call_count == 3
+    assert get.call_args_list[0].kwargs["params"]["maxResults"] == 20
+    assert "Could not fetch comments for v2" in caplog.text
+    assert "quota exceeded when fetching comments for v3" in caplog.text
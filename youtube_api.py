@@ -1,21 +1,147 @@
+import contextvars
 import logging
-from typing import Any, Dict, List
+import queue
+import re
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
 
 import requests
 
+from http_client import api_url, get_client, is_quota_exceeded
+from youtube_scanner.models import UploadsCursor, VideoMetadata
+from youtube_scanner.video_classifier import is_short
+
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# ``videos.list`` accepts at most 50 comma separated IDs per request
+VIDEOS_BATCH_SIZE = 50
+# Comment threads read per video; an owner's pinned comment comes first
+COMMENT_THREADS_PAGE_SIZE = 20
+
+_ISO_DURATION = re.compile(
+    r"^P(?:(?P<days>\d+)D)?"
+    r"(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?$"
+)
+
+
+@dataclass
+class VideoBatchResult:
+    """Outcome of :func:`fetch_videos_batch`.
+
+    Attributes:
+        videos: Parsed metadata keyed by video ID, in request order.
+        missing: IDs the API did not return (private, deleted or invalid).
+        failed: IDs that could not be fetched because of quota or network errors.
+    """
+
+    videos: Dict[str, VideoMetadata] = field(default_factory=dict)
+    missing: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+
+
+@dataclass
+class UploadsWalk:
+    """Outcome of a walk over a channel's uploads playlist.
+
+    Attributes:
+        complete: The walk reached the ``since`` cursor or the end of the
+            playlist instead of stopping early on a quota or network error.
+        failed: IDs whose metadata could not be fetched because of quota or
+            network errors.
+    """
+
+    complete: bool = False
+    failed: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        """Whether every upload newer than the cursor was fetched."""
+        return self.complete and not self.failed
+
+
+def parse_iso_duration(value: Optional[str]) -> Optional[int]:
+    """Convert an ISO 8601 duration such as ``PT1M5S`` into seconds."""
+    if not value:
+        return None
+    match = _ISO_DURATION.match(value)
+    if not match:
+        logger.warning("Unrecognised duration %r", value)
+        return None
+    parts = {key: int(val) for key, val in match.groupdict().items() if val}
+    return (
+        parts.get("days", 0) * 86400
+        + parts.get("hours", 0) * 3600
+        + parts.get("minutes", 0) * 60
+        + parts.get("seconds", 0)
+    )
+
+
+def _parse_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse an RFC 3339 timestamp such as ``2024-01-02T03:04:05Z``."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        logger.warning("Unrecognised timestamp %r", value)
+        return None
+
+
+def _is_known_upload(
+    video_id: Optional[str], published: Optional[str], since: UploadsCursor
+) -> bool:
+    """Return ``True`` once pagination has reached content seen in a previous scan."""
+    if video_id == since.video_id:
+        return True
+    published_at = _parse_timestamp(published)
+    return (
+        published_at is not None
+        and since.published_at is not None
+        and published_at < since.published_at
+    )
+
+
+def _parse_video_item(item: Dict[str, Any]) -> VideoMetadata:
+    """Build a :class:`VideoMetadata` from a ``videos.list`` item."""
+    snippet = item.get("snippet", {})
+    statistics = item.get("statistics", {})
+    duration = parse_iso_duration(item.get("contentDetails", {}).get("duration"))
+    publish_date = _parse_timestamp(snippet.get("publishedAt"))
+    return VideoMetadata(
+        video_id=item["id"],
+        title=snippet.get("title", ""),
+        description=snippet.get("description", ""),
+        publish_date=publish_date,
+        view_count=_parse_int(statistics.get("viewCount")),
+        like_count=_parse_int(statistics.get("likeCount")),
+        comment_count=_parse_int(statistics.get("commentCount")),
+        duration=duration,
+        is_short=duration is not None and is_short({"duration": duration}),
+        channel_id=snippet.get("channelId"),
+    )
+
 
 def fetch_video_data(video_id: str, api_key: str) -> Dict[str, Any]:
     """Fetch video metadata from the YouTube Data API."""
-    url = 'https://www.googleapis.com/youtube/v3/videos'
+    url = api_url("videos")
     params = {
-        'part': 'snippet,contentDetails,statistics',
-        'id': video_id,
-        'key': api_key,
+        "part": "snippet,contentDetails,statistics",
+        "id": video_id,
+        "key": api_key,
     }
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = get_client().get(url, params=params)
         response.raise_for_status()
     except requests.exceptions.HTTPError as exc:
         logger.error("YouTube API returned an error for %s: %s", video_id, exc)
@@ -31,32 +157,167 @@ def fetch_video_data(video_id: str, api_key: str) -> Dict[str, Any]:
         return {}
 
 
-def fetch_uploads_playlist_video_ids(channel_id: str, api_key: str) -> List[str]:
-    """Return all video IDs from a channel's uploads playlist.
+def fetch_videos_batch(video_ids: Iterable[str], api_key: str) -> VideoBatchResult:
+    """Fetch metadata for many videos using batched ``videos.list`` calls.
+
+    IDs are de-duplicated and sent in chunks of :data:`VIDEOS_BATCH_SIZE`, so
+    enriching ``N`` videos costs ``ceil(N / 50)`` requests and quota units
+    instead of ``N``.  IDs the API does not return are reported in
+    :attr:`VideoBatchResult.missing`.  When the quota is exhausted the
+    remaining IDs are reported as failed and the partial result is returned.
+    """
+    ids = list(dict.fromkeys(vid for vid in video_ids if vid))
+    result = VideoBatchResult()
+    url = api_url("videos")
+    for start in range(0, len(ids), VIDEOS_BATCH_SIZE):
+        chunk = ids[start : start + VIDEOS_BATCH_SIZE]
+        params = {
+            "part": "snippet,contentDetails,statistics",
+            "id": ",".join(chunk),
+            "key": api_key,
+        }
+        try:
+            response = get_client().get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
+        except requests.exceptions.HTTPError as exc:
+            if is_quota_exceeded(response):
+                logger.error(
+                    "YouTube API quota exceeded after %d of %d videos", start, len(ids)
+                )
+                result.failed.extend(ids[start:])
+                break
+            logger.error("YouTube API returned an error for video batch: %s", exc)
+            raise
+        except requests.exceptions.RequestException as exc:
+            logger.warning("Network issue when fetching video batch: %s", exc)
+            result.failed.extend(chunk)
+            continue
+        except ValueError as exc:
+            logger.warning("Invalid JSON for video batch: %s", exc)
+            result.failed.extend(chunk)
+            continue
+
+        returned: Dict[str, VideoMetadata] = {}
+        for item in data.get("items", []):
+            if item.get("id"):
+                returned[item["id"]] = _parse_video_item(item)
+        for vid in chunk:
+            if vid in returned:
+                result.videos[vid] = returned[vid]
+            else:
+                result.missing.append(vid)
+
+    if result.missing:
+        logger.info("%d videos were not returned by the API", len(result.missing))
+    return result
+
+
+def _owner_comment_texts(threads: Iterable[Dict[str, Any]]) -> List[str]:
+    """Return the top-level comments the video's own channel wrote."""
+    texts = []
+    for thread in threads:
+        snippet = thread.get("snippet", {})
+        comment = snippet.get("topLevelComment", {}).get("snippet", {})
+        author = comment.get("authorChannelId", {}).get("value")
+        if author and author == snippet.get("channelId"):
+            text = comment.get("textOriginal") or comment.get("textDisplay")
+            if text:
+                texts.append(text)
+    return texts
+
+
+def fetch_pinned_comments(
+    video_ids: Iterable[str], api_key: str, max_results: int = COMMENT_THREADS_PAGE_SIZE
+) -> Dict[str, List[str]]:
+    """Return the channel owner's top-level comments for each video.
+
+    The API does not flag pinned comments, but a pinned comment is always
+    written by the owner and listed first by relevance.  Only the first
+    ``commentThreads.list`` page of each video is read (one quota unit per
+    video) and threads by other authors are dropped.  Every video whose page
+    was read has an entry, empty when the owner did not comment, so the
+    result also tells which videos were paid for.  Videos with comments
+    disabled are left out, and when the quota is exhausted the comments
+    fetched so far are returned.
+    """
+    url = api_url("commentThreads")
+    comments: Dict[str, List[str]] = {}
+    for video_id in dict.fromkeys(vid for vid in video_ids if vid):
+        params = {
+            "part": "snippet",
+            "videoId": video_id,
+            "maxResults": max_results,
+            "order": "relevance",
+            "textFormat": "plainText",
+            "key": api_key,
+        }
+        try:
+            response = get_client().get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
+        except requests.exceptions.HTTPError as exc:
+            if is_quota_exceeded(response):
+                logger.error(
+                    "YouTube API quota exceeded when fetching comments for %s", video_id
+                )
+                break
+            # Typically commentsDisabled; other videos are unaffected
+            logger.warning("Could not fetch comments for %s: %s", video_id, exc)
+            continue
+        except requests.exceptions.RequestException as exc:
+            logger.warning(
+                "Network issue when fetching comments for %s: %s", video_id, exc
+            )
+            continue
+        except ValueError as exc:
+            logger.warning("Invalid JSON for comments of %s: %s", video_id, exc)
+            continue
+        comments[video_id] = _owner_comment_texts(data.get("items", []))
+    return comments
+
+
+def iter_uploads_playlist_pages(
+    channel_id: str,
+    api_key: str,
+    since: Optional[UploadsCursor] = None,
+    walk: Optional[UploadsWalk] = None,
+) -> Iterator[List[str]]:
+    """Yield the video IDs of a channel's uploads playlist one page at a time.
 
     This function looks up the channel's ``uploads`` playlist and iterates
-    through all items using pagination. It handles quota errors from the
-    YouTube Data API and transient network issues, returning the list of
-    video IDs fetched so far when an error occurs.
+    through all items using pagination, yielding each page of up to 50 IDs
+    (newest first) as soon as it arrives.  It handles quota errors from the
+    YouTube Data API and transient network issues by ending the iteration
+    after the pages fetched so far.
+
+    When ``since`` is given, pagination stops as soon as it reaches that
+    video or anything published before it, so only uploads newer than the
+    previous scan are yielded.  Omit it for a full rescan.
+
+    Pass an :class:`UploadsWalk` as ``walk`` to learn whether the iteration
+    ended because it was done: ``walk.complete`` is only set once the
+    ``since`` cursor or the end of the playlist was reached.
     """
-    channel_url = "https://www.googleapis.com/youtube/v3/channels"
+    channel_url = api_url("channels")
     channel_params = {"part": "contentDetails", "id": channel_id, "key": api_key}
     try:
-        response = requests.get(channel_url, params=channel_params, timeout=10)
+        response = get_client().get(channel_url, params=channel_params)
         response.raise_for_status()
     except requests.exceptions.HTTPError as exc:
-        try:
-            error_reason = response.json()["error"]["errors"][0].get("reason")
-        except Exception:  # pragma: no cover - malformed error payload
-            error_reason = None
-        if response.status_code == 403 and error_reason == "quotaExceeded":
-            logger.error("YouTube API quota exceeded when fetching uploads playlist for %s", channel_id)
-            return []
+        if is_quota_exceeded(response):
+            logger.error(
+                "YouTube API quota exceeded when fetching uploads playlist for %s",
+                channel_id,
+            )
+            return
         logger.error("YouTube API returned an error for %s: %s", channel_id, exc)
         raise
     except requests.exceptions.RequestException as exc:
-        logger.warning("Network issue when fetching uploads playlist for %s: %s", channel_id, exc)
-        return []
+        logger.warning(
+            "Network issue when fetching uploads playlist for %s: %s", channel_id, exc
+        )
+        return
 
     uploads_playlist_id = (
         response.json()
@@ -67,10 +328,10 @@ def fetch_uploads_playlist_video_ids(channel_id: str, api_key: str) -> List[str]
     )
     if not uploads_playlist_id:
         logger.warning("No uploads playlist found for %s", channel_id)
-        return []
+        return
 
-    video_ids: List[str] = []
-    playlist_url = "https://www.googleapis.com/youtube/v3/playlistItems"
+    total = 0
+    playlist_url = api_url("playlistItems")
     params = {
         "part": "contentDetails",
         "playlistId": uploads_playlist_id,
@@ -79,31 +340,111 @@ def fetch_uploads_playlist_video_ids(channel_id: str, api_key: str) -> List[str]
     }
     while True:
         try:
-            pl_response = requests.get(playlist_url, params=params, timeout=10)
+            pl_response = get_client().get(playlist_url, params=params)
             pl_response.raise_for_status()
         except requests.exceptions.HTTPError as exc:
-            try:
-                error_reason = pl_response.json()["error"]["errors"][0].get("reason")
-            except Exception:  # pragma: no cover - malformed error payload
-                error_reason = None
-            if pl_response.status_code == 403 and error_reason == "quotaExceeded":
-                logger.error("YouTube API quota exceeded when fetching videos for %s", channel_id)
-                return video_ids
+            if is_quota_exceeded(pl_response):
+                logger.error(
+                    "YouTube API quota exceeded when fetching videos for %s", channel_id
+                )
+                return
             logger.error("YouTube API returned an error for %s: %s", channel_id, exc)
             raise
         except requests.exceptions.RequestException as exc:
-            logger.warning("Network issue when fetching playlist items for %s: %s", channel_id, exc)
-            return video_ids
+            logger.warning(
+                "Network issue when fetching playlist items for %s: %s", channel_id, exc
+            )
+            return
 
         data = pl_response.json()
+        page: List[str] = []
+        reached_known = False
         for item in data.get("items", []):
-            vid = item.get("contentDetails", {}).get("videoId")
+            details = item.get("contentDetails", {})
+            vid = details.get("videoId")
+            if since is not None and _is_known_upload(
+                vid, details.get("videoPublishedAt"), since
+            ):
+                reached_known = True
+                break
             if vid:
-                video_ids.append(vid)
+                page.append(vid)
+        total += len(page)
+        if page:
+            yield page
 
         next_token = data.get("nextPageToken")
-        if not next_token:
-            break
+        if reached_known or not next_token:
+            if walk is not None:
+                walk.complete = True
+            if reached_known:
+                logger.info("Found %d new uploads for %s", total, channel_id)
+            return
         params["pageToken"] = next_token
 
-    return video_ids
+
+def fetch_uploads_playlist_video_ids(
+    channel_id: str, api_key: str, since: Optional[UploadsCursor] = None
+) -> List[str]:
+    """Return video IDs from a channel's uploads playlist, newest first.
+
+    See :func:`iter_uploads_playlist_pages` for pagination, incremental
+    ``since`` handling and error behaviour; this helper collects every page
+    into a single list.
+    """
+    return [
+        vid
+        for page in iter_uploads_playlist_pages(channel_id, api_key, since)
+        for vid in page
+    ]
+
+
+def prefetch(iterable: Iterable[T], depth: int = 2) -> Iterator[T]:
+    """Iterate ``iterable`` in a background thread, up to ``depth`` items ahead.
+
+    This lets a consumer process one page while the following pages are
+    still being downloaded.  Exceptions raised by ``iterable`` are re-raised
+    in the consumer.  A ``depth`` of ``0`` iterates in the calling thread.
+    """
+    if depth <= 0:
+        yield from iterable
+        return
+
+    buffer: "queue.Queue[Tuple[str, Any]]" = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(entry: Tuple[str, Any]) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in iterable:
+                if not put(("item", item)):
+                    return
+        except BaseException as exc:  # re-raised in the consumer
+            put(("error", exc))
+            return
+        put(("done", None))
+
+    # Run in a copy of the caller's context so quota charges keep their channel
+    context = contextvars.copy_context()
+    worker = threading.Thread(target=context.run, args=(produce,), daemon=True)
+    worker.start()
+    try:
+        while True:
+            kind, value = buffer.get()
+            if kind == "item":
+                yield value
+            elif kind == "error":
+                raise value
+            else:
+                return
+    finally:
+        stop.set()
+        worker.join()
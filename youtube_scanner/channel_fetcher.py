@@ -1,20 +1,99 @@
 import logging
-from typing import Any, Dict
-import requests
+from typing import Iterable, Iterator, List, Optional
+
+import youtube_api
+
+from .models import UploadsCursor, VideoMetadata
 
 logger = logging.getLogger(__name__)
 
+# Number of uploads pages downloaded ahead of metadata enrichment
+PREFETCH_PAGES = 2
+
+
+def enrich_uploads_page(
+    api_key: str,
+    channel_id: str,
+    video_ids: List[str],
+    walk: Optional[youtube_api.UploadsWalk] = None,
+) -> List[VideoMetadata]:
+    """Return the classified metadata of one uploads page.
+
+    IDs whose metadata could not be fetched are added to ``walk.failed``.
+    """
+    batch = youtube_api.fetch_videos_batch(video_ids, api_key)
+    if walk is not None:
+        walk.failed.extend(batch.failed)
+    if batch.missing or batch.failed:
+        logger.warning(
+            "Missing metadata for %d videos of %s (%d unavailable, %d failed)",
+            len(batch.missing) + len(batch.failed),
+            channel_id,
+            len(batch.missing),
+            len(batch.failed),
+        )
+    return list(batch.videos.values())
+
+
+def iter_channel_videos(
+    api_key: str,
+    channel_id: str,
+    since: Optional[UploadsCursor] = None,
+    prefetch: int = PREFETCH_PAGES,
+    walk: Optional[youtube_api.UploadsWalk] = None,
+) -> Iterator[List[VideoMetadata]]:
+    """Yield classified metadata for a channel's uploads one page at a time.
 
-def fetch_channel_videos(api_key: str, channel_id: str) -> Dict[str, Any]:
-    """Fetch videos for a given channel using the YouTube Data API."""
-    url = "https://www.googleapis.com/youtube/v3/search"
-    params = {
-        "part": "snippet",
-        "channelId": channel_id,
-        "maxResults": 50,
-        "key": api_key,
-    }
+    Uploads pages are downloaded in the background, up to ``prefetch`` pages
+    ahead, while each page already received is enriched with a batched
+    ``videos.list`` call.  Only one page of IDs and metadata is held at a
+    time, so memory stays flat for channels with tens of thousands of
+    uploads.  A ``prefetch`` of ``0`` downloads pages in the calling thread.
+
+    ``walk`` records whether the uploads playlist was walked to the end (or
+    to ``since``) and which IDs failed to enrich; only then is it safe to
+    move the channel's uploads cursor.
+    """
     logger.info("Fetching channel videos for %s", channel_id)
-    response = requests.get(url, params=params, timeout=10)
-    response.raise_for_status()
-    return response.json()
+    pages = youtube_api.iter_uploads_playlist_pages(
+        channel_id, api_key, since=since, walk=walk
+    )
+    for video_ids in youtube_api.prefetch(pages, prefetch):
+        yield enrich_uploads_page(api_key, channel_id, video_ids, walk)
+
+
+def fetch_channel_videos(
+    api_key: str,
+    channel_id: str,
+    since: Optional[UploadsCursor] = None,
+    walk: Optional[youtube_api.UploadsWalk] = None,
+    prefetch: int = PREFETCH_PAGES,
+) -> List[VideoMetadata]:
+    """Fetch metadata for the uploads of a channel using the YouTube Data API.
+
+    Video IDs are paged from the channel's uploads playlist (1 quota unit per
+    50 videos) and enriched with batched ``videos.list`` calls (another unit
+    per 50 videos), instead of ``search.list`` which costs 100 units per page
+    and cannot page through a full channel.  Enrichment of each page overlaps
+    with the download of the next; see :func:`iter_channel_videos`.
+
+    When ``since`` is given only uploads newer than that cursor are fetched.
+    ``walk`` and ``prefetch`` are passed on to :func:`iter_channel_videos`.
+    """
+    pages = iter_channel_videos(
+        api_key, channel_id, since, prefetch=prefetch, walk=walk
+    )
+    return [video for page in pages for video in page]
+
+
+def newest_upload(videos: Iterable[VideoMetadata]) -> Optional[UploadsCursor]:
+    """Return a cursor pointing at the most recently published of ``videos``."""
+    dated = [
+        (video.publish_date, video)
+        for video in videos
+        if video.publish_date is not None
+    ]
+    if not dated:
+        return None
+    published, newest = max(dated, key=lambda pair: pair[0])
+    return UploadsCursor(video_id=newest.video_id, published_at=published)
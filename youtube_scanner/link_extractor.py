@@ -0,0 +1,13 @@
+"""Compatibility layer for YouTube link extraction.
+
+The implementation lives in ``src.youtube_scanner.link_extractor``.
+"""
+
+from src.youtube_scanner.link_extractor import (
+    VideoLink,
+    extract_links,
+    extract_links_bulk,
+    extract_video_ids,
+)
+
+__all__ = ["VideoLink", "extract_links", "extract_links_bulk", "extract_video_ids"]
@@ -0,0 +1,40 @@
+"""Compatibility layer for the Short mapping cascade.
+
+The implementation lives in ``src.youtube_scanner.mapping_cascade``.
+"""
+
+from src.youtube_scanner.mapping_cascade import (
+    OUTSIDE_LINK_SCORE,
+    SOURCE_DESCRIPTION_LINK,
+    SOURCE_PINNED_COMMENT,
+    STRATEGY_ERRORS,
+    TRANSCRIPT_CANDIDATES,
+    DescriptionLinkStrategy,
+    MappingCascade,
+    PinnedCommentStrategy,
+    SimilarTitleStrategy,
+    Strategy,
+    StrategyStats,
+    TitleStrategy,
+    TranscriptStrategy,
+    default_strategies,
+    rank_transcript_candidates,
+)
+
+__all__ = [
+    "DescriptionLinkStrategy",
+    "MappingCascade",
+    "OUTSIDE_LINK_SCORE",
+    "PinnedCommentStrategy",
+    "SOURCE_DESCRIPTION_LINK",
+    "SOURCE_PINNED_COMMENT",
+    "STRATEGY_ERRORS",
+    "SimilarTitleStrategy",
+    "Strategy",
+    "StrategyStats",
+    "TitleStrategy",
+    "TRANSCRIPT_CANDIDATES",
+    "TranscriptStrategy",
+    "default_strategies",
+    "rank_transcript_candidates",
+]
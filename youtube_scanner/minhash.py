@@ -0,0 +1,24 @@
+"""Compatibility layer for MinHash/LSH near-duplicate matching.
+
+The implementation lives in ``src.youtube_scanner.minhash``.
+"""
+
+from src.youtube_scanner.minhash import (
+    DEFAULT_THRESHOLD,
+    SOURCE_SIMILAR_TITLE,
+    MinHashLSH,
+    NearDuplicateMatcher,
+    choose_bands,
+    jaccard,
+    title_tokens,
+)
+
+__all__ = [
+    "DEFAULT_THRESHOLD",
+    "MinHashLSH",
+    "NearDuplicateMatcher",
+    "SOURCE_SIMILAR_TITLE",
+    "choose_bands",
+    "jaccard",
+    "title_tokens",
+]
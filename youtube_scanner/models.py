@@ -5,6 +5,18 @@ This module re-exports the most commonly used models so that the rest of the
 codebase can simply import from ``youtube_scanner``.
 """
 
-from src.youtube_scanner.models import ChannelConfig, ShortMapping, VideoMetadata
+from src.youtube_scanner.models import (
+    ChannelConfig,
+    ShortMapping,
+    TimedTranscript,
+    UploadsCursor,
+    VideoMetadata,
+)
 
-__all__ = ["ChannelConfig", "ShortMapping", "VideoMetadata"]
+__all__ = [
+    "ChannelConfig",
+    "ShortMapping",
+    "TimedTranscript",
+    "UploadsCursor",
+    "VideoMetadata",
+]
@@ -1,12 +1,43 @@
-"""Schedule monthly channel scans using APScheduler."""
+"""Schedule monthly channel scans using APScheduler.
 
-from datetime import datetime
+Channels are scanned concurrently with :mod:`asyncio` by default.  Each
+channel runs as its own task, and the blocking API calls it makes (uploads
+with their metadata batches, and one transcript batch) are dispatched to a
+thread pool behind a global concurrency limit.  Only the new Shorts have
+their transcripts fetched, most viewed first; the mapping cascade fetches
+those of its candidate long videos when it needs them.  Set
+:data:`ASYNC_SCAN` to ``False`` (or call ``run_channel_scan(concurrent=False)``)
+to scan channels one at a time, which is easier to debug.
+
+State updates (last run timestamps and uploads cursors) are batched and
+written once per scan.
+
+Before scanning, channels are planned against the quota budget attached to
+the shared HTTP client.  Each channel's work is planned as separate tasks:
+refreshing its top Shorts, walking its uploads and mapping its new Shorts,
+in that priority order.  The least recently scanned channels go first, and
+work whose estimated cost does not fit is deferred to a later run.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
 import logging
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Set
 
 from apscheduler.schedulers.background import BackgroundScheduler
 
-from . import channel_fetcher, storage
+import http_client
+import quota
+import youtube_api
+
+from . import channel_fetcher, storage, transcript_fetcher
+from .models import ChannelConfig, UploadsCursor, VideoMetadata
+from .short_mapper import map_shorts_to_full
 
 logger = logging.getLogger(__name__)
 
@@ -14,22 +45,438 @@ logger = logging.getLogger(__name__)
 CHANNELS: List[str] = []  # Populate with real channel IDs
 # API key for YouTube Data API
 API_KEY: str = ""  # Populate with a valid API key
+# Scan channels concurrently; set to False to scan sequentially for debugging
+ASYNC_SCAN: bool = True
+# Maximum number of blocking API calls in flight across all channels
+CONCURRENCY: int = 8
+# Daily YouTube Data API quota available to scans
+DAILY_QUOTA: int = quota.DEFAULT_DAILY_BUDGET
+# Estimated playlistItems/videos calls per channel, used to plan the quota
+ESTIMATED_CALLS_PER_CHANNEL: int = 10
+# Estimated commentThreads calls per channel for mapping its new Shorts
+ESTIMATED_MAPPING_CALLS_PER_CHANNEL: int = 10
+# Stored video metadata (JSON Lines or SQLite).  When set, scans refresh the
+# statistics of each channel's target Shorts and record new uploads in it.
+METADATA_FILE: Optional[str] = None
 
 # Hold reference to running scheduler for clean shutdown
 _scheduler: Optional[BackgroundScheduler] = None
 
 
-def run_channel_scan() -> None:
-    """Invoke the fetcher for each configured channel."""
+@dataclass
+class ChannelScan:
+    """Data gathered for a single channel during a scan.
+
+    ``work`` holds the priorities of the planned tasks the scan carried out
+    (see :func:`plan_scan`).
+    """
+
+    channel_id: str
+    videos: Dict[str, VideoMetadata] = field(default_factory=dict)
+    transcripts: Dict[str, List[str]] = field(default_factory=dict)
+    cursor: Optional[UploadsCursor] = None
+    complete: bool = False
+    work: Set[int] = field(default_factory=set)
+    top_shorts: Dict[str, VideoMetadata] = field(default_factory=dict)
+    mapping: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class ChannelPlan:
+    """Work planned for one channel by :func:`plan_scan`.
+
+    Attributes:
+        work: Priorities of the scheduled tasks (``quota.PRIORITY_*``).
+        target_shorts: Stored Shorts to refresh, looked up once while
+            planning.
+    """
+
+    work: Set[int] = field(default_factory=set)
+    target_shorts: List[VideoMetadata] = field(default_factory=list)
+
+
+def _budget() -> quota.QuotaBudget:
+    """Return the budget of the shared HTTP client, attaching one if needed."""
+    client = http_client.get_client()
+    if client.budget is None:
+        client.budget = quota.QuotaBudget(DAILY_QUOTA)
+    return client.budget
+
+
+def _target_shorts(channel_id: str) -> List[VideoMetadata]:
+    """Return the stored Shorts of ``channel_id`` worth keeping fresh."""
+    if METADATA_FILE is None:
+        return []
+    return storage.select_target_shorts(
+        ChannelConfig(channel_id, name=channel_id), METADATA_FILE
+    )
+
+
+def _channel_tasks(
+    channel_id: str, targets: List[VideoMetadata]
+) -> List[quota.ScanTask]:
+    """Estimate the API work needed to scan ``channel_id``, one task per kind."""
+    tasks = []
+    if targets:
+        tasks.append(
+            quota.ScanTask(
+                name=f"refresh top shorts {channel_id}",
+                endpoint="videos",
+                priority=quota.PRIORITY_TOP_SHORTS,
+                calls=-(-len(targets) // youtube_api.VIDEOS_BATCH_SIZE),
+                channel_id=channel_id,
+            )
+        )
+    tasks.append(
+        quota.ScanTask(
+            name=f"scan {channel_id}",
+            endpoint="playlistItems",
+            priority=quota.PRIORITY_UPLOADS,
+            calls=ESTIMATED_CALLS_PER_CHANNEL,
+            channel_id=channel_id,
+        )
+    )
+    tasks.append(
+        quota.ScanTask(
+            name=f"map shorts {channel_id}",
+            endpoint="commentThreads",
+            priority=quota.PRIORITY_MAPPING,
+            calls=ESTIMATED_MAPPING_CALLS_PER_CHANNEL,
+            channel_id=channel_id,
+        )
+    )
+    return tasks
+
+
+def _scan_order(channel_id: str) -> datetime:
+    """Return the sort key putting channels scanned least recently first.
+
+    Never scanned channels sort first; stored timestamps may be naive or
+    aware and are compared in UTC.
+    """
+    last_run = storage.get_last_run(channel_id)
+    if last_run is None:
+        return datetime.min.replace(tzinfo=timezone.utc)
+    if last_run.tzinfo is None:
+        return last_run.replace(tzinfo=timezone.utc)
+    return last_run.astimezone(timezone.utc)
+
+
+def plan_scan(channels: List[str]) -> Dict[str, ChannelPlan]:
+    """Return the work that fits into the remaining quota, in scan order.
+
+    Each channel is planned as a top Shorts refresh (with
+    :data:`METADATA_FILE`), an uploads walk and the mapping of its new
+    Shorts, so refreshes are funded first and mapping last.  Channels scanned
+    least recently come first and channels with no scheduled work are left
+    out.  Deferred work is picked up next time, and mapping is dropped when
+    the uploads it depends on were deferred.
+    """
+    ordered = sorted(channels, key=_scan_order)
+    plans = {
+        channel_id: ChannelPlan(target_shorts=_target_shorts(channel_id))
+        for channel_id in ordered
+    }
+    budget_plan = _budget().plan(
+        task
+        for channel_id, plan in plans.items()
+        for task in _channel_tasks(channel_id, plan.target_shorts)
+    )
+    for task in budget_plan.deferred:
+        logger.warning("Deferring %s until more quota is available", task.name)
+    for task in budget_plan.scheduled:
+        if task.channel_id:
+            plans[task.channel_id].work.add(task.priority)
+    for plan in plans.values():
+        if quota.PRIORITY_UPLOADS not in plan.work:
+            plan.work.discard(quota.PRIORITY_MAPPING)
+    return {channel_id: plan for channel_id, plan in plans.items() if plan.work}
+
+
+def _since(channel_id: str, full_rescan: bool) -> Optional[UploadsCursor]:
+    """Return the cursor an incremental scan of ``channel_id`` starts from."""
+    return None if full_rescan else storage.get_uploads_cursor(channel_id)
+
+
+def _finish_walk(scan: ChannelScan, walk: youtube_api.UploadsWalk) -> None:
+    """Take the new uploads cursor from a walk that fetched every new upload."""
+    scan.complete = walk.ok
+    if scan.complete:
+        scan.cursor = channel_fetcher.newest_upload(scan.videos.values())
+    if METADATA_FILE is not None and scan.videos:
+        storage.append_video_metadata(scan.videos.values(), METADATA_FILE)
+
+
+def _refresh_top_shorts(targets: List[VideoMetadata]) -> Dict[str, VideoMetadata]:
+    """Re-fetch the statistics of a channel's target Shorts and store them."""
+    batch = youtube_api.fetch_videos_batch(
+        [video.video_id for video in targets], API_KEY
+    )
+    if METADATA_FILE is not None and batch.videos:
+        storage.append_video_metadata(batch.videos.values(), METADATA_FILE)
+    return batch.videos
+
+
+def _map_new_shorts(
+    scan: ChannelScan, concurrency: int = transcript_fetcher.DEFAULT_CONCURRENCY
+) -> Dict[str, str]:
+    """Map the scan's new Shorts to the channel's long videos.
+
+    Long videos are the new uploads plus, with :data:`METADATA_FILE`, those
+    stored by earlier scans.  Transcripts the scan already fetched are
+    reused; the others, such as those of the transcript step's candidate
+    long videos, are fetched here.
+    """
+    shorts = [video for video in scan.videos.values() if video.is_short]
+    if not shorts:
+        return {}
+    longs = [video for video in scan.videos.values() if not video.is_short]
+    if METADATA_FILE is not None:
+        stored = storage.iter_video_metadata(
+            METADATA_FILE, channel_id=scan.channel_id, is_short=False
+        )
+        longs.extend(video for video in stored if video.video_id not in scan.videos)
+
+    def fetch_transcripts(
+        video_ids: List[str], priority: Optional[Dict[str, int]] = None
+    ) -> Dict[str, List[str]]:
+        missing = [vid for vid in video_ids if vid not in scan.transcripts]
+        if missing:
+            scan.transcripts.update(
+                transcript_fetcher.fetch_transcripts(
+                    missing, concurrency=concurrency, priority=priority
+                )
+            )
+        return {vid: scan.transcripts[vid] for vid in video_ids}
+
+    return map_shorts_to_full(
+        shorts,
+        longs,
+        fetch_comments=functools.partial(
+            youtube_api.fetch_pinned_comments, api_key=API_KEY
+        ),
+        fetch_transcripts=fetch_transcripts,
+    )
+
+
+def _shorts_by_views(videos: Dict[str, VideoMetadata]) -> List[str]:
+    """Return the IDs of the new Shorts, most viewed first.
+
+    Only Shorts have their transcripts fetched by the scan; the long videos
+    the mapping cascade needs are fetched on demand by its transcript step.
+    """
+    shorts = [video for video in videos.values() if video.is_short]
+    shorts.sort(key=lambda video: -(video.view_count or 0))
+    return [video.video_id for video in shorts]
+
+
+def _record_success(scan: ChannelScan) -> None:
+    """Persist the last run timestamp and newest upload of a completed scan.
+
+    When the uploads walk was deferred, stopped early or some metadata failed
+    to load, the previous cursor and last run are kept, so the next scan
+    fetches the uploads missed this time and the channel is planned first.
+    """
+    if quota.PRIORITY_UPLOADS not in scan.work:
+        return
+    if not scan.complete:
+        logger.warning(
+            "Uploads of %s were only partially fetched (%d videos); "
+            "keeping the previous cursor",
+            scan.channel_id,
+            len(scan.videos),
+        )
+        return
+    storage.update_last_run(scan.channel_id, datetime.utcnow())
+    if scan.cursor is not None:
+        storage.update_uploads_cursor(scan.channel_id, scan.cursor)
+    logger.info(
+        "Completed fetch for %s (%d new videos)", scan.channel_id, len(scan.videos)
+    )
+
+
+def _scan_channel(
+    channel_id: str, plan: ChannelPlan, full_rescan: bool = False
+) -> ChannelScan:
+    """Do the planned work for one channel sequentially."""
+    scan = ChannelScan(channel_id, work=plan.work)
+    if quota.PRIORITY_TOP_SHORTS in plan.work:
+        scan.top_shorts = _refresh_top_shorts(plan.target_shorts)
+    if quota.PRIORITY_UPLOADS not in plan.work:
+        return scan
+    since = _since(channel_id, full_rescan)
+    walk = youtube_api.UploadsWalk()
+    for video in channel_fetcher.fetch_channel_videos(API_KEY, channel_id, since, walk):
+        scan.videos[video.video_id] = video
+    _finish_walk(scan, walk)
+    shorts = _shorts_by_views(scan.videos)
+    if shorts:
+        scan.transcripts = transcript_fetcher.fetch_transcripts(shorts)
+    if quota.PRIORITY_MAPPING in plan.work:
+        scan.mapping = _map_new_shorts(scan)
+    return scan
+
+
+async def _walk_uploads_async(
+    scan: ChannelScan, call: Callable[..., Any], since: Optional[UploadsCursor]
+) -> youtube_api.UploadsWalk:
+    """Walk the channel's new uploads, enriching each page as it arrives.
+
+    The next uploads page is downloaded while the current one is enriched.
+    Both requests go through ``call``, so they count against the global
+    limit like every other request.
+    """
+    walk = youtube_api.UploadsWalk()
+    pages = youtube_api.iter_uploads_playlist_pages(
+        scan.channel_id, API_KEY, since=since, walk=walk
+    )
+    next_page = asyncio.ensure_future(call(next, pages, None))
+    try:
+        while True:
+            video_ids = await next_page
+            if video_ids is None:
+                return walk
+            next_page = asyncio.ensure_future(call(next, pages, None))
+            enrich = channel_fetcher.enrich_uploads_page
+            videos = await call(enrich, API_KEY, scan.channel_id, video_ids, walk)
+            scan.videos.update((video.video_id, video) for video in videos)
+    except Exception:
+        # Let the page download in flight finish before giving up the channel
+        await asyncio.gather(next_page, return_exceptions=True)
+        raise
+
+
+async def _scan_channel_async(
+    channel_id: str,
+    plan: ChannelPlan,
+    call: Callable[..., Any],
+    full_rescan: bool = False,
+) -> ChannelScan:
+    """Asynchronous counterpart of :func:`_scan_channel`.
+
+    Every blocking call, storage included, goes through ``call``, which
+    enforces the global limit.  Uploads pages are downloaded one ahead of
+    their enrichment (see :func:`_walk_uploads_async`) rather than by a
+    background thread, and transcript batches run on a single worker: extra
+    threads would bypass the limit, and other channels already keep the
+    slots busy.
+    """
+    scan = ChannelScan(channel_id, work=plan.work)
+    if quota.PRIORITY_TOP_SHORTS in plan.work:
+        scan.top_shorts = await call(_refresh_top_shorts, plan.target_shorts)
+    if quota.PRIORITY_UPLOADS not in plan.work:
+        return scan
+    since = await call(_since, channel_id, full_rescan)
+    walk = await _walk_uploads_async(scan, call, since)
+    await call(_finish_walk, scan, walk)
+    shorts = _shorts_by_views(scan.videos)
+    if shorts:
+        fetch_transcripts = functools.partial(
+            transcript_fetcher.fetch_transcripts, concurrency=1
+        )
+        scan.transcripts = await call(fetch_transcripts, shorts)
+    if quota.PRIORITY_MAPPING in plan.work:
+        scan.mapping = await call(_map_new_shorts, scan, 1)
+    return scan
+
+
+def _scan_client(limit: int) -> ContextManager[http_client.HttpClient]:
+    """Share a client pooling at least ``limit`` connections during a scan.
+
+    When the shared client's pool is smaller, a client with the same budget,
+    ETag store and cache is used for the scan and the caller's client is
+    restored afterwards.
+    """
+    client = http_client.get_client()
+    if client.pool_size >= limit:
+        return contextlib.nullcontext(client)
+    return http_client.use_client(
+        http_client.HttpClient(
+            pool_size=limit,
+            gzip=client.gzip,
+            timeout=client.timeout,
+            budget=client.budget,
+            conditional=client.etag_store is not None,
+            etag_store=client.etag_store,
+            cache=client.cache,
+        )
+    )
+
+
+async def run_channel_scan_async(
+    channels: Optional[List[str]] = None,
+    concurrency: Optional[int] = None,
+    full_rescan: bool = False,
+) -> Dict[str, ChannelScan]:
+    """Scan ``channels`` concurrently and return the successful results.
+
+    Each channel runs as an isolated task: a failure is logged and leaves the
+    channel's last run timestamp untouched without affecting other channels.
+    Only uploads newer than each channel's stored cursor are fetched unless
+    ``full_rescan`` is set.
+    """
+    loop = asyncio.get_running_loop()
+    # Planning reads every channel's state, so keep it off the event loop
+    plans = await loop.run_in_executor(
+        None, plan_scan, CHANNELS if channels is None else channels
+    )
+    limit = concurrency or CONCURRENCY
+    semaphore = asyncio.Semaphore(limit)
+    results: Dict[str, ChannelScan] = {}
+
+    with _scan_client(limit), ThreadPoolExecutor(
+        max_workers=limit, thread_name_prefix="scan"
+    ) as executor:
+
+        async def call(func: Callable[..., Any], *args: Any) -> Any:
+            # Copy the task's context so quota charges reach the right channel
+            context = contextvars.copy_context()
+            async with semaphore:
+                return await loop.run_in_executor(executor, context.run, func, *args)
+
+        async def scan_one(channel_id: str, plan: ChannelPlan) -> None:
+            quota.current_channel.set(channel_id)
+            try:
+                scan = await _scan_channel_async(channel_id, plan, call, full_rescan)
+                await call(_record_success, scan)
+                results[channel_id] = scan
+            except Exception as exc:  # pragma: no cover - logging only
+                logger.error("Failed to fetch videos for %s: %s", channel_id, exc)
+
+        with storage.batch_updates():
+            await asyncio.gather(
+                *(scan_one(channel_id, plan) for channel_id, plan in plans.items())
+            )
+    logger.info("Quota usage: %s", _budget().report())
+    return results
+
+
+def run_channel_scan(
+    concurrent: Optional[bool] = None, full_rescan: bool = False
+) -> Dict[str, ChannelScan]:
+    """Scan each configured channel and return the successful results.
+
+    Args:
+        concurrent: Use the asyncio engine. Defaults to :data:`ASYNC_SCAN`.
+        full_rescan: Walk every channel's whole uploads playlist instead of
+            stopping at the newest upload recorded by the previous scan.
+    """
     logger.info("Executing scheduled channel scan")
-    for channel_id in CHANNELS:
-        last_run = storage.get_last_run(channel_id)
-        try:
-            channel_fetcher.fetch_channel_videos(API_KEY, channel_id)
-            storage.update_last_run(channel_id, datetime.utcnow())
-            logger.info("Completed fetch for %s", channel_id)
-        except Exception as exc:  # pragma: no cover - logging only
-            logger.error("Failed to fetch videos for %s: %s", channel_id, exc)
+    if ASYNC_SCAN if concurrent is None else concurrent:
+        return asyncio.run(run_channel_scan_async(full_rescan=full_rescan))
+
+    results: Dict[str, ChannelScan] = {}
+    with storage.batch_updates():
+        for channel_id, plan in plan_scan(CHANNELS).items():
+            try:
+                with quota.charging_channel(channel_id):
+                    scan = _scan_channel(channel_id, plan, full_rescan)
+                _record_success(scan)
+                results[channel_id] = scan
+            except Exception as exc:  # pragma: no cover - logging only
+                logger.error("Failed to fetch videos for %s: %s", channel_id, exc)
+    logger.info("Quota usage: %s", _budget().report())
+    return results
 
 
 def start() -> BackgroundScheduler:
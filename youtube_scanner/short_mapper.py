@@ -1,14 +1,24 @@
-import logging
-from typing import Dict, Iterable, Optional
+"""Compatibility layer for Short to long-form mapping.
 
-logger = logging.getLogger(__name__)
+The implementation lives in ``src.youtube_scanner.short_mapper``; this module
+re-exports it so that the rest of the codebase can import from
+``youtube_scanner``.
+"""
 
+from src.youtube_scanner.mapping_cascade import MappingCascade, StrategyStats
+from src.youtube_scanner.short_mapper import (
+    map_short_to_long,
+    map_shorts_to_full,
+    rank_long_candidates,
+)
+from src.youtube_scanner.title_index import MatchCandidate, TitleIndex
 
-def map_short_to_long(short: Dict[str, str], videos: Iterable[Dict[str, str]]) -> Optional[Dict[str, str]]:
-    """Map a short video to a matching long-form video by title."""
-    logger.info("Mapping short %s", short.get("id"))
-    short_title = short.get("title", "").lower()
-    for video in videos:
-        if video.get("title", "").lower() == short_title:
-            return video
-    return None
+__all__ = [
+    "MappingCascade",
+    "MatchCandidate",
+    "StrategyStats",
+    "TitleIndex",
+    "map_short_to_long",
+    "map_shorts_to_full",
+    "rank_long_candidates",
+]
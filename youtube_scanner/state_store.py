@@ -0,0 +1,282 @@
+"""Cached, lock-protected scan state shared by scan workers.
+
+:class:`ScanStateStore` keeps the per-channel state of the scanner (the last
+run timestamp, the newest known upload and any other named cursors) in one
+JSON file.  The file is read once and served from memory afterwards.  Updates
+are written immediately, or once at the end of a :meth:`ScanStateStore.batch`
+block.
+
+Every write happens under an exclusive lock on a ``.lock`` file next to the
+state file (``fcntl.flock`` where available).  Inside the lock the current
+file is re-read, the channels changed by this process are merged over it and
+the result is written to a temporary file that atomically replaces the
+original.  Several workers can therefore share one state file without losing
+each other's updates, and a crash never leaves a half-written file behind.  A
+state file that cannot be parsed is kept as ``<name>.corrupt`` rather than
+overwritten.
+"""
+
+import copy
+import json
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Set, Union
+
+from .models import UploadsCursor
+
+try:  # pragma: no cover - platform dependent
+    import fcntl
+except ImportError:  # pragma: no cover - platform dependent
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+
+
+@dataclass
+class ChannelState:
+    """Persisted scan state of one channel.
+
+    Attributes:
+        last_run: When the channel was last scanned successfully.
+        uploads_cursor: Newest upload seen in the channel's uploads playlist.
+        cursors: Other named cursors, such as page tokens of long-running
+            walks, as JSON-serialisable values.
+    """
+
+    last_run: Optional[datetime] = None
+    uploads_cursor: Optional[UploadsCursor] = None
+    cursors: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {}
+        if self.last_run is not None:
+            data["last_run"] = self.last_run.isoformat()
+        if self.uploads_cursor is not None:
+            data["uploads_cursor"] = self.uploads_cursor.to_dict()
+        if self.cursors:
+            data["cursors"] = self.cursors
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ChannelState":
+        last_run = data.get("last_run")
+        cursor = data.get("uploads_cursor")
+        return cls(
+            last_run=datetime.fromisoformat(last_run) if last_run else None,
+            uploads_cursor=UploadsCursor.from_dict(cursor) if cursor else None,
+            cursors=dict(data.get("cursors") or {}),
+        )
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive inter-process lock associated with ``path``."""
+    if fcntl is None:  # pragma: no cover - platform dependent
+        yield
+        return
+    with open(f"{path}.lock", "a") as fh:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+class ScanStateStore:
+    """In-memory view of a scan state file with atomic, merged writes.
+
+    Args:
+        path: JSON file holding the state.  Files written by earlier
+            versions, mapping channel IDs to last run timestamps, are read
+            transparently.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._channels: Dict[str, ChannelState] = {}
+        self._dirty: Set[str] = set()
+        self._loaded = False
+        self._batch_depth = 0
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+    def _read(self, locked: bool = False) -> Dict[str, ChannelState]:
+        """Parse the state file.
+
+        A file that cannot be parsed is re-read under the file lock, in case
+        another worker was replacing it, and if it is still unreadable it is
+        moved aside to ``<name>.corrupt`` and an empty state is returned.  The
+        next flush therefore cannot overwrite the channels it may still hold.
+        Errors accessing the file are raised.  ``locked`` tells that the
+        caller already holds the file lock.
+        """
+        if not self.path.exists():
+            return {}
+        try:
+            with self.path.open("r", encoding="utf-8") as fh:
+                data = json.load(fh)
+            if isinstance(data.get("channels"), dict):
+                raw = data["channels"]
+                return {
+                    key: ChannelState.from_dict(value) for key, value in raw.items()
+                }
+            return {
+                key: ChannelState(last_run=datetime.fromisoformat(value))
+                for key, value in data.items()
+            }
+        except (ValueError, TypeError, KeyError, AttributeError) as exc:
+            if not locked:
+                with _file_lock(self.path):
+                    return self._read(locked=True)
+            corrupt = self.path.with_name(f"{self.path.name}.corrupt")
+            logger.error(
+                "Scan state in %s is unreadable (%s); moving it to %s",
+                self.path,
+                exc,
+                corrupt,
+            )
+            os.replace(self.path, corrupt)
+            return {}
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self._channels = self._read()
+            self._loaded = True
+
+    def reload(self) -> None:
+        """Pick up changes written by other workers, keeping unsaved ones."""
+        with self._lock:
+            channels = self._read()
+            for channel_id in self._dirty:
+                channels[channel_id] = self._channels[channel_id]
+            self._channels = channels
+            self._loaded = True
+
+    def channel(self, channel_id: str) -> ChannelState:
+        """Return a copy of the state of ``channel_id``."""
+        with self._lock:
+            self._ensure_loaded()
+            return copy.deepcopy(self._channels.get(channel_id, ChannelState()))
+
+    def get_last_run(self, channel_id: str) -> Optional[datetime]:
+        return self.channel(channel_id).last_run
+
+    def get_uploads_cursor(self, channel_id: str) -> Optional[UploadsCursor]:
+        return self.channel(channel_id).uploads_cursor
+
+    def get_cursor(self, channel_id: str, name: str) -> Any:
+        """Return the named cursor of ``channel_id``, or ``None``."""
+        return self.channel(channel_id).cursors.get(name)
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+    def _update(self, channel_id: str, change: Callable[[ChannelState], None]) -> None:
+        with self._lock:
+            self._ensure_loaded()
+            change(self._channels.setdefault(channel_id, ChannelState()))
+            self._dirty.add(channel_id)
+            if not self._batch_depth:
+                self.flush()
+
+    def update_last_run(self, channel_id: str, timestamp: datetime) -> None:
+        self._update(channel_id, lambda state: setattr(state, "last_run", timestamp))
+
+    def update_uploads_cursor(self, channel_id: str, cursor: UploadsCursor) -> None:
+        self._update(channel_id, lambda state: setattr(state, "uploads_cursor", cursor))
+
+    def update_cursor(self, channel_id: str, name: str, value: Any) -> None:
+        """Set the named cursor of ``channel_id``; ``None`` removes it."""
+
+        def change(state: ChannelState) -> None:
+            if value is None:
+                state.cursors.pop(name, None)
+            else:
+                state.cursors[name] = value
+
+        self._update(channel_id, change)
+
+    @contextmanager
+    def batch(self) -> Iterator["ScanStateStore"]:
+        """Defer writes until the outermost ``batch`` block exits.
+
+        The pending updates are written even if the block raises, so a failed
+        scan keeps the progress of the channels that completed.
+        """
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self.flush()
+
+    def flush(self) -> None:
+        """Merge pending updates into the state file atomically.
+
+        Failures are logged and the updates stay pending for the next flush.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                with _file_lock(self.path):
+                    channels = self._read(locked=True)
+                    for channel_id in self._dirty:
+                        channels[channel_id] = self._channels[channel_id]
+                    self._write(channels)
+            except Exception as exc:  # pragma: no cover - logging only
+                logger.error("Failed to persist scan state to %s: %s", self.path, exc)
+                return
+            self._channels = channels
+            logger.info("Persisted scan state of %d channels", len(self._dirty))
+            self._dirty.clear()
+
+    def _write(self, channels: Dict[str, ChannelState]) -> None:
+        payload = {
+            "version": STATE_VERSION,
+            "channels": {
+                key: state.to_dict() for key, state in sorted(channels.items())
+            },
+        }
+        fd, tmp_name = tempfile.mkstemp(
+            prefix=f".{self.path.name}.", dir=self.path.parent
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(payload, fh)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp_name, self.path)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+
+
+_stores: Dict[Path, ScanStateStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_state_store(path: Union[str, Path]) -> ScanStateStore:
+    """Return the shared :class:`ScanStateStore` for ``path``."""
+    key = Path(path).resolve()
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = ScanStateStore(key)
+        return store
+
+
+__all__ = ["ChannelState", "STATE_VERSION", "ScanStateStore", "get_state_store"]
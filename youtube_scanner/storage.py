@@ -1,151 +1,476 @@
+"""Persistence helpers for scan state and the project data models.
+
+Last run timestamps, the newest known upload and other cursors per channel
+are kept in a :class:`~youtube_scanner.state_store.ScanStateStore`, which is
+loaded once, can batch updates and writes atomically under a file lock.
+``VideoMetadata`` and ``ShortMapping`` collections can be read and written
+as JSON files, as append-only JSON Lines files or in a lightweight SQLite
+database.  The storage backend is chosen based on the file extension:
+``.json`` for JSON files, ``.jsonl`` for JSON Lines and ``.sqlite`` or ``.db``
+for SQLite databases.
+
+JSON Lines appends only write the new records.  A record may therefore appear
+several times; readers keep the last one written for each ``video_id`` or
+``short_video_id``, and :func:`compact_video_metadata` /
+:func:`compact_short_mappings` rewrite the file without the superseded lines.
+Appends and compactions take the same ``.lock`` file lock as the scan state,
+so several writers can share a JSON Lines file.
+
+SQLite databases are accessed through a shared :class:`SQLiteStore` per path
+(see :func:`get_store`).  It keeps one connection per thread in WAL mode, so
+readers such as reports never block the scanner's writes, creates and
+migrates the schema once using ``PRAGMA user_version``, and wraps each bulk
+append in a single transaction.
+"""
+
+from __future__ import annotations
+
 import json
 import logging
-from datetime import datetime
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .models import ChannelConfig, ShortMapping, UploadsCursor, VideoMetadata
+from .state_store import ScanStateStore, _file_lock, get_state_store
+
+# ---------------------------------------------------------------------------
+# Scan state
+# ---------------------------------------------------------------------------
 
-# File used to persist last run timestamps per channel
+# File used to persist the scan state (last run timestamps and cursors) per channel
 _STORAGE_FILE = Path("last_run.json")
 
 
-def _load_data() -> Dict[str, datetime]:
-    """Load persisted timestamps from disk."""
-    if _STORAGE_FILE.exists():
-        try:
-            with _STORAGE_FILE.open("r", encoding="utf-8") as fh:
-                data = json.load(fh)
-            return {key: datetime.fromisoformat(value) for key, value in data.items()}
-        except Exception as exc:  # pragma: no cover - logging only
-            logging.error("Failed to load last run timestamps: %s", exc)
-    return {}
+def state_store() -> ScanStateStore:
+    """Return the shared store backing the scan state helpers below."""
+    return get_state_store(_STORAGE_FILE)
 
 
-def _save_data(data: Dict[str, datetime]) -> None:
-    """Persist timestamps to disk."""
-    serialised = {key: value.isoformat() for key, value in data.items()}
-    try:
-        with _STORAGE_FILE.open("w", encoding="utf-8") as fh:
-            json.dump(serialised, fh)
-        logging.info("Persisted last run timestamps")
-    except Exception as exc:  # pragma: no cover - logging only
-        logging.error("Failed to persist last run timestamps: %s", exc)
+def batch_updates() -> ContextManager[ScanStateStore]:
+    """Write scan state updates made inside the block in one go."""
+    return state_store().batch()
 
 
 def get_last_run(channel_id: str) -> Optional[datetime]:
     """Return the last run timestamp for the provided channel."""
-    data = _load_data()
-    return data.get(channel_id)
+    return state_store().get_last_run(channel_id)
 
 
 def update_last_run(channel_id: str, timestamp: datetime) -> None:
     """Update the last run timestamp for the provided channel."""
-    data = _load_data()
-    data[channel_id] = timestamp
-    _save_data(data)
+    state_store().update_last_run(channel_id, timestamp)
 
-from __future__ import annotations
 
-"""Persistence helpers for ``VideoMetadata`` and ``ShortMapping`` collections.
+def get_uploads_cursor(channel_id: str) -> Optional[UploadsCursor]:
+    """Return the newest upload recorded for the provided channel."""
+    return state_store().get_uploads_cursor(channel_id)
 
-The functions in this module can read and write the project data models either
-as JSON files or in a lightweight SQLite database.  The storage backend is
-chosen based on the file extension: ``.json`` for JSON files and ``.sqlite`` or
-``.db`` for SQLite databases.
-"""
 
-from dataclasses import asdict
-from datetime import datetime
-import json
-import sqlite3
-from pathlib import Path
-from typing import Iterable, List
-
-from .models import ShortMapping, VideoMetadata
+def update_uploads_cursor(channel_id: str, cursor: UploadsCursor) -> None:
+    """Record ``cursor`` as the newest known upload of the provided channel."""
+    state_store().update_uploads_cursor(channel_id, cursor)
 
 
 # ---------------------------------------------------------------------------
 # Utility helpers
 # ---------------------------------------------------------------------------
 
+
 def _is_sqlite(path: Path) -> bool:
     """Return ``True`` if the path points to an SQLite database."""
     return path.suffix in {".sqlite", ".db"}
 
 
+def _is_jsonl(path: Path) -> bool:
+    """Return ``True`` if the path points to a JSON Lines file."""
+    return path.suffix == ".jsonl"
+
+
+def _iter_jsonl(path: Path, key: str) -> Iterator[Dict[str, Any]]:
+    """Yield the latest record per ``key`` from a JSON Lines file.
+
+    Records are yielded in the order they were last written.  The file is
+    read twice through the same handle: the first pass only remembers which
+    line holds the latest version of each key, so memory grows with the
+    number of distinct keys rather than with the size of the file.  Reusing
+    the handle keeps both passes on one version of the file even if
+    :func:`_compact_jsonl` replaces it in between.  Unparseable lines, such as
+    a line cut short by a crash mid-append, are skipped with a warning.
+    """
+    if not path.exists():
+        return
+    latest: Dict[str, int] = {}
+    with path.open("r", encoding="utf-8") as fh:
+        for number, line in enumerate(fh):
+            if not line.strip():
+                continue
+            try:
+                latest[json.loads(line)[key]] = number
+            except (ValueError, KeyError, TypeError) as exc:
+                logging.warning(
+                    "Skipping invalid line %d of %s: %s", number + 1, path, exc
+                )
+        winners = set(latest.values())
+        del latest
+        fh.seek(0)
+        for number, line in enumerate(fh):
+            if number in winners:
+                yield json.loads(line)
+
+
+def _append_jsonl(path: Path, items: Iterable[Dict[str, Any]]) -> None:
+    """Append one JSON document per line to ``path``.
+
+    The append holds the file lock of ``path`` so that it cannot land in a
+    file that :func:`_compact_jsonl` is about to replace.  If an earlier
+    append was cut short before its newline, the newline is written first so
+    that the new records do not end up on the broken line.
+    """
+    lines = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in items)
+    with _file_lock(path), path.open("a+b") as fh:
+        if fh.seek(0, os.SEEK_END):
+            fh.seek(-1, os.SEEK_END)
+            if fh.read(1) != b"\n":
+                lines = "\n" + lines
+        fh.write(lines.encode("utf-8"))
+
+
+def _compact_jsonl(path: Path, key: str) -> int:
+    """Atomically rewrite ``path`` keeping only the latest record per ``key``.
+
+    The compacted file is written next to the original and moved over it with
+    :func:`os.replace`, so readers see either the old or the new file.  The
+    file lock of ``path`` is held throughout, so appends from other threads
+    or processes wait for the compaction instead of being lost with the old
+    file.
+    """
+    with _file_lock(path):
+        count = 0
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                for item in _iter_jsonl(path, key):
+                    fh.write(json.dumps(item, ensure_ascii=False) + "\n")
+                    count += 1
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp_name, path)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+    logging.info("Compacted %s to %d records", path, count)
+    return count
+
+
+def _iter_json(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield the records of a JSON array file, which has to be read whole."""
+    if path.exists():
+        with path.open("r", encoding="utf-8") as fh:
+            yield from json.load(fh)
+
+
+def _iter_sqlite(
+    path: Path, query: str, params: Iterable[Any], batch_size: int
+) -> Iterator[Tuple]:
+    """Yield the rows of ``query`` in batches of ``batch_size``."""
+    cursor = get_store(path).connection().execute(query, tuple(params))
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+
+
+# ---------------------------------------------------------------------------
+# SQLite connections and schema
+# ---------------------------------------------------------------------------
+
+# Pragmas applied to every connection.  ``synchronous=NORMAL`` is durable in
+# WAL mode except for the last transactions before a power loss.
+SQLITE_PRAGMAS: Tuple[Tuple[str, Any], ...] = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("temp_store", "MEMORY"),
+    ("cache_size", -16_000),
+    ("mmap_size", 256 * 1024 * 1024),
+    ("busy_timeout", 5_000),
+)
+
+# Schema migrations; entry ``n`` upgrades a database to ``user_version`` n + 1
+_MIGRATIONS: List[Tuple[str, ...]] = [
+    (
+        """
+        CREATE TABLE IF NOT EXISTS video_metadata (
+            video_id TEXT PRIMARY KEY,
+            title TEXT,
+            description TEXT,
+            publish_date TEXT,
+            view_count INTEGER,
+            like_count INTEGER,
+            comment_count INTEGER,
+            duration INTEGER,
+            is_short INTEGER
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS short_mappings (
+            short_video_id TEXT PRIMARY KEY,
+            full_video_id TEXT,
+            relation_source TEXT
+        )
+        """,
+    ),
+    (
+        "ALTER TABLE video_metadata ADD COLUMN channel_id TEXT",
+        # Serves per-channel Short selection ordered by views without sorting
+        """
+        CREATE INDEX IF NOT EXISTS idx_video_metadata_channel_short_views
+        ON video_metadata (channel_id, is_short, view_count)
+        """,
+    ),
+]
+SCHEMA_VERSION = len(_MIGRATIONS)
+
+
+class SQLiteStore:
+    """Thread-aware handle on one SQLite database file.
+
+    Each thread gets its own connection, created on first use with
+    :data:`SQLITE_PRAGMAS` applied.  The schema is brought up to
+    :data:`SCHEMA_VERSION` once per store, before the first connection is
+    handed out.
+
+    Args:
+        path: Database file.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self._migrated = False
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode; transactions are opened explicitly
+        conn = sqlite3.connect(
+            str(self.path), isolation_level=None, check_same_thread=False
+        )
+        for name, value in SQLITE_PRAGMAS:
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it if needed."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            with self._lock:
+                if not self._migrated:
+                    self._migrate(conn)
+                    self._migrated = True
+                self._connections.append(conn)
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        """Apply pending migrations in a single transaction."""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for statements in _MIGRATIONS[version:]:
+                for statement in statements:
+                    conn.execute(statement)
+            if version < SCHEMA_VERSION:
+                conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+                logging.info(
+                    "Migrated %s from schema %d to %d",
+                    self.path,
+                    version,
+                    SCHEMA_VERSION,
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run the enclosed statements in one write transaction."""
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self) -> None:
+        """Close the connections of all threads."""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+            self._local = threading.local()
+
+
+_stores: Dict[Path, SQLiteStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(filename: str | Path) -> SQLiteStore:
+    """Return the shared :class:`SQLiteStore` for ``filename``."""
+    key = Path(filename).resolve()
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = SQLiteStore(key)
+        return store
+
+
+def close_stores() -> None:
+    """Close every shared :class:`SQLiteStore`, e.g. at shutdown."""
+    with _stores_lock:
+        for store in _stores.values():
+            store.close()
+        _stores.clear()
+
+
 # ---------------------------------------------------------------------------
 # Video metadata
 # ---------------------------------------------------------------------------
 
-def load_video_metadata(filename: str | Path) -> List[VideoMetadata]:
-    """Load all stored :class:`VideoMetadata` records from ``filename``."""
+# Rows fetched per round trip by the streaming readers
+DEFAULT_BATCH_SIZE = 500
+
+_VIDEO_COLUMNS = (
+    "video_id, title, description, publish_date, view_count, like_count, "
+    "comment_count, duration, is_short, channel_id"
+)
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Return ``value`` as an aware UTC datetime; naive values are taken as UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _video_from_row(row: Tuple) -> VideoMetadata:
+    return VideoMetadata(
+        video_id=row[0],
+        title=row[1],
+        description=row[2] or "",
+        publish_date=datetime.fromisoformat(row[3]) if row[3] else None,
+        view_count=row[4],
+        like_count=row[5],
+        comment_count=row[6],
+        duration=row[7],
+        is_short=bool(row[8]),
+        channel_id=row[9],
+    )
+
+
+def iter_video_metadata(
+    filename: str | Path,
+    channel_id: Optional[str] = None,
+    is_short: Optional[bool] = None,
+    min_views: Optional[int] = None,
+    published_after: Optional[datetime] = None,
+    published_before: Optional[datetime] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[VideoMetadata]:
+    """Stream the :class:`VideoMetadata` records stored at ``filename``.
+
+    Only records matching every given filter are yielded.  For SQLite the
+    filters are part of the query and rows are fetched ``batch_size`` at a
+    time; JSON Lines files are parsed line by line.  Plain JSON files have to
+    be loaded whole and are filtered afterwards.
+
+    Args:
+        filename: Collection to read.
+        channel_id: Only videos uploaded by this channel.
+        is_short: Only Shorts (``True``) or only long-form videos (``False``).
+        min_views: Minimum view count; videos without one are excluded.
+        published_after: Inclusive lower bound of the publish date.
+        published_before: Exclusive upper bound of the publish date.
+            Bounds and stored dates are compared in UTC; naive values are
+            taken as UTC.
+        batch_size: Rows fetched per round trip from SQLite.
+    """
     path = Path(filename)
     if _is_sqlite(path):
-        conn = sqlite3.connect(path)
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS video_metadata (
-                video_id TEXT PRIMARY KEY,
-                title TEXT,
-                description TEXT,
-                publish_date TEXT,
-                view_count INTEGER,
-                like_count INTEGER,
-                comment_count INTEGER,
-                duration INTEGER,
-                is_short INTEGER
-            )
-            """
-        )
-        rows = conn.execute(
-            "SELECT video_id, title, description, publish_date, view_count, like_count, comment_count, duration, is_short FROM video_metadata"
-        ).fetchall()
-        conn.close()
-        records: List[VideoMetadata] = []
-        for row in rows:
-            publish_date = datetime.fromisoformat(row[3]) if row[3] else None
-            records.append(
-                VideoMetadata(
-                    video_id=row[0],
-                    title=row[1],
-                    description=row[2] or "",
-                    publish_date=publish_date,
-                    view_count=row[4],
-                    like_count=row[5],
-                    comment_count=row[6],
-                    duration=row[7],
-                    is_short=bool(row[8]),
-                )
-            )
-        return records
+        clauses: List[str] = []
+        params: List[Any] = []
+        if channel_id is not None:
+            clauses.append("channel_id = ?")
+            params.append(channel_id)
+        if is_short is not None:
+            clauses.append("is_short = ?")
+            params.append(int(is_short))
+        if min_views is not None:
+            clauses.append("view_count >= ?")
+            params.append(min_views)
+        # Dates are stored as ISO 8601 text with or without an offset;
+        # julianday() converts both sides to UTC (naive values count as UTC)
+        if published_after is not None:
+            clauses.append("julianday(publish_date) >= julianday(?)")
+            params.append(_as_utc(published_after).isoformat())
+        if published_before is not None:
+            clauses.append("julianday(publish_date) < julianday(?)")
+            params.append(_as_utc(published_before).isoformat())
+        query = f"SELECT {_VIDEO_COLUMNS} FROM video_metadata"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        for row in _iter_sqlite(path, query, params, batch_size):
+            yield _video_from_row(row)
+        return
 
-    if path.exists():
-        with path.open("r", encoding="utf-8") as fh:
-            raw = json.load(fh)
-    else:
-        raw = []
-    return [VideoMetadata.from_dict(item) for item in raw]
+    after = _as_utc(published_after) if published_after is not None else None
+    before = _as_utc(published_before) if published_before is not None else None
+    items = _iter_jsonl(path, "video_id") if _is_jsonl(path) else _iter_json(path)
+    for item in items:
+        video = VideoMetadata.from_dict(item)
+        if channel_id is not None and video.channel_id != channel_id:
+            continue
+        if is_short is not None and video.is_short != is_short:
+            continue
+        if min_views is not None and (
+            video.view_count is None or video.view_count < min_views
+        ):
+            continue
+        if after is not None or before is not None:
+            if video.publish_date is None:
+                continue
+            published = _as_utc(video.publish_date)
+            if after is not None and published < after:
+                continue
+            if before is not None and published >= before:
+                continue
+        yield video
+
+
+def load_video_metadata(filename: str | Path) -> List[VideoMetadata]:
+    """Load all stored :class:`VideoMetadata` records from ``filename``."""
+    return list(iter_video_metadata(filename))
 
 
-def append_video_metadata(records: Iterable[VideoMetadata], filename: str | Path) -> None:
+def append_video_metadata(
+    records: Iterable[VideoMetadata], filename: str | Path
+) -> None:
     """Append ``records`` to the video metadata collection at ``filename``."""
     path = Path(filename)
     if _is_sqlite(path):
-        conn = sqlite3.connect(path)
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS video_metadata (
-                video_id TEXT PRIMARY KEY,
-                title TEXT,
-                description TEXT,
-                publish_date TEXT,
-                view_count INTEGER,
-                like_count INTEGER,
-                comment_count INTEGER,
-                duration INTEGER,
-                is_short INTEGER
-            )
-            """
-        )
         data = [
             (
                 r.video_id,
@@ -157,96 +482,192 @@ def append_video_metadata(records: Iterable[VideoMetadata], filename: str | Path
                 r.comment_count,
                 r.duration,
                 int(r.is_short),
+                r.channel_id,
             )
             for r in records
         ]
-        conn.executemany(
-            "INSERT OR REPLACE INTO video_metadata VALUES (?,?,?,?,?,?,?,?,?)",
-            data,
-        )
-        conn.commit()
-        conn.close()
+        with get_store(path).transaction() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO video_metadata ({_VIDEO_COLUMNS}) "
+                "VALUES (?,?,?,?,?,?,?,?,?,?)",
+                data,
+            )
+        return
+
+    if _is_jsonl(path):
+        _append_jsonl(path, (r.to_dict() for r in records))
         return
 
     existing = load_video_metadata(path)
     existing.extend(records)
     with path.open("w", encoding="utf-8") as fh:
-        json.dump([asdict(r) for r in existing], fh, ensure_ascii=False, indent=2)
+        json.dump([r.to_dict() for r in existing], fh, ensure_ascii=False, indent=2)
+
+
+def select_target_shorts(
+    channel: ChannelConfig, filename: str | Path
+) -> List[VideoMetadata]:
+    """Return the Shorts of ``channel`` worth mapping, most viewed first.
+
+    A Short is selected when it has at least ``channel.short_view_threshold``
+    views or is among the channel's ``channel.top_n_shorts`` most viewed
+    Shorts.  Shorts without a view count are never selected.  For SQLite this
+    is a single query walking the ``(channel_id, is_short, view_count)``
+    index in descending view order, which stops as soon as both conditions
+    are exhausted.
+    """
+    path = Path(filename)
+    if _is_sqlite(path):
+        query = (
+            f"SELECT {_VIDEO_COLUMNS} FROM video_metadata "
+            "WHERE channel_id = ? AND is_short = 1 AND view_count IS NOT NULL "
+            "ORDER BY view_count DESC"
+        )
+        candidates: Iterable[VideoMetadata] = (
+            _video_from_row(row)
+            for row in _iter_sqlite(
+                path, query, (channel.channel_id,), channel.top_n_shorts or 1
+            )
+        )
+    else:
+        candidates = sorted(
+            (
+                video
+                for video in iter_video_metadata(
+                    path, channel_id=channel.channel_id, is_short=True
+                )
+                if video.view_count is not None
+            ),
+            key=lambda video: video.view_count or 0,
+            reverse=True,
+        )
+
+    selected: List[VideoMetadata] = []
+    for video in candidates:
+        views = video.view_count or 0
+        if (
+            len(selected) >= channel.top_n_shorts
+            and views < channel.short_view_threshold
+        ):
+            break
+        selected.append(video)
+    return selected
 
 
 # ---------------------------------------------------------------------------
 # Short mappings
 # ---------------------------------------------------------------------------
 
-def load_short_mappings(filename: str | Path) -> List[ShortMapping]:
-    """Load all stored :class:`ShortMapping` records from ``filename``."""
+
+def iter_short_mappings(
+    filename: str | Path,
+    relation_source: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[ShortMapping]:
+    """Stream the :class:`ShortMapping` records stored at ``filename``.
+
+    Args:
+        filename: Collection to read.
+        relation_source: Only mappings found through this source.
+        batch_size: Rows fetched per round trip from SQLite.
+    """
     path = Path(filename)
     if _is_sqlite(path):
-        conn = sqlite3.connect(path)
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS short_mappings (
-                short_video_id TEXT PRIMARY KEY,
-                full_video_id TEXT,
-                relation_source TEXT
-            )
-            """
-        )
-        rows = conn.execute(
+        query = (
             "SELECT short_video_id, full_video_id, relation_source FROM short_mappings"
-        ).fetchall()
-        conn.close()
-        return [
-            ShortMapping(
-                short_video_id=row[0],
-                full_video_id=row[1],
-                relation_source=row[2],
+        )
+        params: List[Any] = []
+        if relation_source is not None:
+            query += " WHERE relation_source = ?"
+            params.append(relation_source)
+        for row in _iter_sqlite(path, query, params, batch_size):
+            yield ShortMapping(
+                short_video_id=row[0], full_video_id=row[1], relation_source=row[2]
             )
-            for row in rows
-        ]
+        return
 
-    if path.exists():
-        with path.open("r", encoding="utf-8") as fh:
-            raw = json.load(fh)
-    else:
-        raw = []
-    return [ShortMapping.from_dict(item) for item in raw]
+    items = _iter_jsonl(path, "short_video_id") if _is_jsonl(path) else _iter_json(path)
+    for item in items:
+        mapping = ShortMapping.from_dict(item)
+        if relation_source is None or mapping.relation_source == relation_source:
+            yield mapping
 
 
-def append_short_mappings(records: Iterable[ShortMapping], filename: str | Path) -> None:
+def load_short_mappings(filename: str | Path) -> List[ShortMapping]:
+    """Load all stored :class:`ShortMapping` records from ``filename``."""
+    return list(iter_short_mappings(filename))
+
+
+def append_short_mappings(
+    records: Iterable[ShortMapping], filename: str | Path
+) -> None:
     """Append ``records`` to the short mapping collection at ``filename``."""
     path = Path(filename)
     if _is_sqlite(path):
-        conn = sqlite3.connect(path)
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS short_mappings (
-                short_video_id TEXT PRIMARY KEY,
-                full_video_id TEXT,
-                relation_source TEXT
+        data = [(r.short_video_id, r.full_video_id, r.relation_source) for r in records]
+        with get_store(path).transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO short_mappings VALUES (?,?,?)",
+                data,
             )
-            """
-        )
-        data = [
-            (r.short_video_id, r.full_video_id, r.relation_source) for r in records
-        ]
-        conn.executemany(
-            "INSERT OR REPLACE INTO short_mappings VALUES (?,?,?)",
-            data,
-        )
-        conn.commit()
-        conn.close()
+        return
+
+    if _is_jsonl(path):
+        _append_jsonl(path, (r.to_dict() for r in records))
         return
 
     existing = load_short_mappings(path)
     existing.extend(records)
     with path.open("w", encoding="utf-8") as fh:
-        json.dump([asdict(r) for r in existing], fh, ensure_ascii=False, indent=2)
+        json.dump([r.to_dict() for r in existing], fh, ensure_ascii=False, indent=2)
+
+
+# ---------------------------------------------------------------------------
+# Compaction
+# ---------------------------------------------------------------------------
+
+
+def compact_video_metadata(filename: str | Path) -> int:
+    """Drop superseded records from a ``.jsonl`` video metadata file.
+
+    Returns the number of records left.  Other backends never hold duplicates
+    and are left untouched.
+    """
+    path = Path(filename)
+    if not _is_jsonl(path) or not path.exists():
+        return len(load_video_metadata(path))
+    return _compact_jsonl(path, "video_id")
+
+
+def compact_short_mappings(filename: str | Path) -> int:
+    """Drop superseded records from a ``.jsonl`` short mapping file.
+
+    Returns the number of records left.
+    """
+    path = Path(filename)
+    if not _is_jsonl(path) or not path.exists():
+        return len(load_short_mappings(path))
+    return _compact_jsonl(path, "short_video_id")
 
 
 __all__ = [
+    "SCHEMA_VERSION",
+    "SQLiteStore",
     "append_short_mappings",
     "append_video_metadata",
+    "batch_updates",
+    "close_stores",
+    "compact_short_mappings",
+    "compact_video_metadata",
+    "get_last_run",
+    "get_store",
+    "get_uploads_cursor",
+    "iter_short_mappings",
+    "iter_video_metadata",
     "load_short_mappings",
     "load_video_metadata",
+    "select_target_shorts",
+    "state_store",
+    "update_last_run",
+    "update_uploads_cursor",
 ]
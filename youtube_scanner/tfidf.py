@@ -0,0 +1,13 @@
+"""Compatibility layer for batch TF-IDF scoring.
+
+The implementation lives in ``src.youtube_scanner.tfidf``.
+"""
+
+from src.youtube_scanner.tfidf import (
+    SOURCE_TFIDF,
+    TfidfScorer,
+    rank_tfidf_candidates,
+    term_weights,
+)
+
+__all__ = ["SOURCE_TFIDF", "TfidfScorer", "rank_tfidf_candidates", "term_weights"]
@@ -0,0 +1,26 @@
+"""Compatibility layer for the title token index.
+
+The implementation lives in ``src.youtube_scanner.title_index``.
+"""
+
+from src.youtube_scanner.title_index import (
+    DEFAULT_MIN_SCORE,
+    SOURCE_DESCRIPTION,
+    SOURCE_TITLE,
+    SOURCE_TITLE_EXACT,
+    MatchCandidate,
+    TitleIndex,
+    tokenize,
+    video_fields,
+)
+
+__all__ = [
+    "DEFAULT_MIN_SCORE",
+    "MatchCandidate",
+    "SOURCE_DESCRIPTION",
+    "SOURCE_TITLE",
+    "SOURCE_TITLE_EXACT",
+    "TitleIndex",
+    "tokenize",
+    "video_fields",
+]
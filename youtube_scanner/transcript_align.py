@@ -0,0 +1,12 @@
+"""Compatibility layer for transcript alignment.
+
+The implementation lives in ``src.youtube_scanner.transcript_align``.
+"""
+
+from src.youtube_scanner.transcript_align import (
+    DEFAULT_MIN_CONFIDENCE,
+    Alignment,
+    align_transcripts,
+)
+
+__all__ = ["Alignment", "DEFAULT_MIN_CONFIDENCE", "align_transcripts"]
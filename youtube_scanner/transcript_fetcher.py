@@ -1,26 +1,149 @@
 """Retrieve transcripts using the YouTube caption API or youtube-transcript-api."""
 
-from typing import List
 import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Iterable, List, Mapping, Optional
 
+import youtube_transcript_api
+from requests import exceptions as requests_exceptions
 from youtube_transcript_api import (
-    YouTubeTranscriptApi,
-    TranscriptsDisabled,
-    NoTranscriptFound,
     CouldNotRetrieveTranscript,
+    NoTranscriptFound,
+    TranscriptsDisabled,
     VideoUnavailable,
+    YouTubeRequestFailed,
+    YouTubeTranscriptApi,
 )
-from requests import exceptions as requests_exceptions
+
+from quota import TokenBucket
+
+from .models import TimedTranscript
+from .transcript_store import TranscriptStore
 
 logger = logging.getLogger(__name__)
 if not logger.handlers:
-    handler = RotatingFileHandler("youtube_scanner.log", maxBytes=1_000_000, backupCount=3)
-    formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    handler = RotatingFileHandler(
+        "youtube_scanner.log", maxBytes=1_000_000, backupCount=3
+    )
+    formatter = logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
     handler.setFormatter(formatter)
     logger.addHandler(handler)
 logger.setLevel(logging.INFO)
 
+# Workers fetching transcripts at the same time
+DEFAULT_CONCURRENCY = 8
+# Transcript requests per second shared by all workers, and the burst allowed
+DEFAULT_RATE = 5.0
+DEFAULT_BURST = 10
+# Retries after a throttled request, waiting BACKOFF_BASE * 2**attempt seconds
+MAX_RETRIES = 4
+BACKOFF_BASE = 2.0
+# Priority of IDs not listed in ``fetch_transcripts(priority=...)``
+DEFAULT_PRIORITY = 100
+
+# Rate limiting errors of the installed youtube-transcript-api version
+_THROTTLING_ERRORS = tuple(
+    getattr(youtube_transcript_api, name)
+    for name in ("RequestBlocked", "IpBlocked", "TooManyRequests")
+    if hasattr(youtube_transcript_api, name)
+)
+
+_local = threading.local()
+_rate_limiter: Optional[TokenBucket] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> TokenBucket:
+    """Return the token bucket shared by all transcript requests to YouTube."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = TokenBucket(DEFAULT_BURST, DEFAULT_RATE)
+        return _rate_limiter
+
+
+# Errors meaning the video has no transcript to fetch, as opposed to a
+# request that failed and may succeed later
+_NO_TRANSCRIPT_ERRORS = (TranscriptsDisabled, NoTranscriptFound, VideoUnavailable)
+
+
+class TranscriptThrottled(Exception):
+    """Raised internally when YouTube rate limits transcript requests."""
+
+
+class TranscriptUnavailable(Exception):
+    """Raised internally when a video has no transcript at all."""
+
+
+def _throttled(exc: Exception) -> bool:
+    """Return ``True`` for errors caused by too many transcript requests."""
+    if isinstance(exc, _THROTTLING_ERRORS):
+        return True
+    if isinstance(exc, YouTubeRequestFailed) and "429" in str(exc):
+        return True
+    response = getattr(exc, "response", None)
+    return (
+        isinstance(exc, requests_exceptions.HTTPError)
+        and getattr(response, "status_code", None) == 429
+    )
+
+
+def _api() -> YouTubeTranscriptApi:
+    """Return this thread's client so its HTTP connections are reused."""
+    api = getattr(_local, "api", None)
+    if api is None:
+        api = _local.api = YouTubeTranscriptApi()
+    return api
+
+
+def _fetch_entries(
+    video_id: str, raise_throttled: bool = False, raise_unavailable: bool = False
+) -> List[Dict[str, Any]]:
+    """Return the raw ``text``/``start``/``duration`` entries of ``video_id``.
+
+    Failures are logged and an empty list is returned.  With
+    ``raise_throttled`` rate limiting raises :class:`TranscriptThrottled`
+    instead, so that the caller can back off and retry, and with
+    ``raise_unavailable`` a video without captions raises
+    :class:`TranscriptUnavailable`.
+    """
+    try:
+        fetched: Any = _api().fetch(video_id, languages=["en"])
+        # Recent youtube-transcript-api versions return snippet objects
+        if hasattr(fetched, "to_raw_data"):
+            return fetched.to_raw_data()
+        return list(fetched)
+    except Exception as exc:
+        if not _throttled(exc):
+            _log_failure(video_id, exc)
+            if raise_unavailable and isinstance(exc, _NO_TRANSCRIPT_ERRORS):
+                raise TranscriptUnavailable(str(exc)) from exc
+            return []
+        if raise_throttled:
+            raise TranscriptThrottled(str(exc)) from exc
+        logger.warning("Transcript requests throttled for %s: %s", video_id, exc)
+    return []
+
+
+def _log_failure(video_id: str, exc: Exception) -> None:
+    if isinstance(exc, TranscriptsDisabled):
+        logger.warning("Transcripts disabled for %s", video_id)
+    elif isinstance(
+        exc, (NoTranscriptFound, CouldNotRetrieveTranscript, VideoUnavailable)
+    ):
+        logger.warning("No transcript available for %s: %s", video_id, exc)
+    elif isinstance(exc, requests_exceptions.RequestException):
+        logger.warning("Network error retrieving transcript for %s: %s", video_id, exc)
+    else:  # pragma: no cover - unexpected errors
+        logger.warning("Failed to fetch transcript for %s: %s", video_id, exc)
+
+
 def fetch_transcript(video_id: str) -> List[str]:
     """Fetch the transcript for ``video_id``.
 
@@ -31,16 +154,104 @@ def fetch_transcript(video_id: str) -> List[str]:
     """
 
     logger.info("Fetching transcript for %s", video_id)
+    return [entry["text"] for entry in _fetch_entries(video_id) if entry.get("text")]
 
-    try:
-        entries = YouTubeTranscriptApi().fetch(video_id, languages=["en"])
-        return [entry["text"] for entry in entries if entry.get("text")]
-    except TranscriptsDisabled:
-        logger.warning("Transcripts disabled for %s", video_id)
-    except (NoTranscriptFound, CouldNotRetrieveTranscript, VideoUnavailable) as exc:
-        logger.warning("No transcript available for %s: %s", video_id, exc)
-    except requests_exceptions.RequestException as exc:
-        logger.warning("Network error retrieving transcript for %s: %s", video_id, exc)
-    except Exception as exc:  # pragma: no cover - unexpected errors
-        logger.warning("Failed to fetch transcript for %s: %s", video_id, exc)
+
+def fetch_timed_transcript(video_id: str) -> TimedTranscript:
+    """Fetch the transcript for ``video_id`` keeping each line's timing.
+
+    Errors are handled like :func:`fetch_transcript`; the returned transcript
+    is empty when none is available.
+    """
+
+    logger.info("Fetching timed transcript for %s", video_id)
+    return TimedTranscript.from_entries(video_id, _fetch_entries(video_id))
+
+
+def _fetch_with_backoff(
+    video_id: str, limiter: TokenBucket, max_retries: int, backoff: float
+) -> List[Dict[str, Any]]:
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        try:
+            return _fetch_entries(
+                video_id, raise_throttled=True, raise_unavailable=True
+            )
+        except TranscriptThrottled as exc:
+            if attempt == max_retries:
+                logger.error(
+                    "Giving up on transcript for %s after %d throttled attempts",
+                    video_id,
+                    attempt + 1,
+                )
+                return []
+            # Empty the shared bucket so every worker slows down, not just this one
+            limiter.drain()
+            delay = backoff * 2**attempt * (1 + random.random() / 2)
+            logger.warning(
+                "Transcript requests throttled (%s); retrying %s in %.1fs",
+                exc,
+                video_id,
+                delay,
+            )
+            time.sleep(delay)
     return []
+
+
+def fetch_transcripts(
+    video_ids: Iterable[str],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    priority: Optional[Mapping[str, int]] = None,
+    timed: bool = False,
+    rate_limiter: Optional[TokenBucket] = None,
+    max_retries: int = MAX_RETRIES,
+    backoff: float = BACKOFF_BASE,
+    store: Optional[TranscriptStore] = None,
+) -> Dict[str, Any]:
+    """Fetch the transcripts of many videos concurrently.
+
+    Up to ``concurrency`` requests run at once from a thread pool.  All of
+    them draw from one token bucket (:func:`get_rate_limiter` unless
+    ``rate_limiter`` is given), and a throttled request empties the bucket
+    and is retried with exponential backoff.  Videos are started in
+    ascending ``priority`` (lower values first, unlisted IDs last, input
+    order among equals), so target Shorts and their candidate long videos
+    can be fetched before the rest.  With a ``store``, transcripts already
+    in it are read from disk instead and newly fetched ones are added.
+    Videos whose captions are disabled or missing are stored as empty
+    transcripts so they are not requested again; throttled and failed
+    requests are not stored and are retried by the next call.
+
+    Returns caption lines per video ID, or :class:`TimedTranscript` objects
+    with ``timed``, in input order.  Videos without a transcript map to an
+    empty result.
+    """
+    order = list(dict.fromkeys(vid for vid in video_ids if vid))
+    ids = (
+        sorted(order, key=lambda vid: priority.get(vid, DEFAULT_PRIORITY))
+        if priority
+        else order
+    )
+    limiter = rate_limiter or get_rate_limiter()
+    logger.info("Fetching %d transcripts with %d workers", len(ids), concurrency)
+
+    def fetch(video_id: str) -> Any:
+        transcript = store.get(video_id) if store is not None else None
+        if transcript is None:
+            try:
+                entries = _fetch_with_backoff(video_id, limiter, max_retries, backoff)
+                unavailable = False
+            except TranscriptUnavailable:
+                entries, unavailable = [], True
+            transcript = TimedTranscript.from_entries(video_id, entries)
+            if store is not None and (transcript.lines or unavailable):
+                store.put(transcript)
+        return transcript if timed else transcript.lines
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, concurrency), thread_name_prefix="transcripts"
+    ) as pool:
+        results = dict(zip(ids, pool.map(fetch, ids)))
+    found = sum(1 for result in results.values() if len(result))
+    logger.info("Fetched %d of %d transcripts", found, len(ids))
+    return {vid: results[vid] for vid in order}
@@ -0,0 +1,20 @@
+"""Compatibility layer for the transcript n-gram index.
+
+The implementation lives in ``src.youtube_scanner.transcript_index``.
+"""
+
+from src.youtube_scanner.transcript_index import (
+    DEFAULT_MIN_COVERAGE,
+    SOURCE_TRANSCRIPT,
+    TranscriptIndex,
+    shingle_hashes,
+    transcript_words,
+)
+
+__all__ = [
+    "DEFAULT_MIN_COVERAGE",
+    "SOURCE_TRANSCRIPT",
+    "TranscriptIndex",
+    "shingle_hashes",
+    "transcript_words",
+]
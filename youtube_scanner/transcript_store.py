@@ -0,0 +1,445 @@
+"""Compressed, append-only storage for video transcripts.
+
+Transcripts of long videos are large, so :class:`TranscriptStore` keeps them
+as compressed binary blobs rather than JSON.  A store is a directory with two
+files:
+
+``transcripts.seg``
+    Append-only segment of records.  Each record is a fixed header (video
+    ID, payload length, codec) followed by the zlib- or LZMA-compressed
+    payload: the line count, the start times and durations as packed
+    doubles, the UTF-8 length of every line and finally the line texts.
+
+``transcripts.idx``
+    Open-addressing hash table of fixed-width slots mapping a video ID to the
+    offset and length of its latest payload.  The file is memory-mapped, so
+    a lookup hashes the ID, probes a few slots in place and reads exactly one
+    payload from the segment, however many transcripts the store holds.
+
+Storing a video again appends a new record and repoints its slot; the old
+record stays in the segment but is no longer reachable.  The index records
+how much of the segment it covers.  Records written after that point (for
+example when a crash hit between the two writes) are indexed on the next
+open, and a missing or inconsistent index is rebuilt from the segment.
+
+A store has a single writer; readers in other processes should reopen it to
+see new transcripts.
+"""
+
+import logging
+import lzma
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+from .models import TimedTranscript
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_FILE = "transcripts.seg"
+INDEX_FILE = "transcripts.idx"
+
+CODEC_ZLIB = "zlib"
+CODEC_LZMA = "lzma"
+_CODEC_IDS = {CODEC_ZLIB: 1, CODEC_LZMA: 2}
+_CODEC_NAMES = {value: key for key, value in _CODEC_IDS.items()}
+
+# Video IDs are 11 characters; the slot leaves room for longer keys
+KEY_SIZE = 16
+INITIAL_CAPACITY = 1024
+# The table is doubled once it is more than this full
+MAX_LOAD = 0.5
+
+_MAGIC = b"YTSIDX1\x00"
+_HEADER = struct.Struct("<8sQQQ")  # magic, capacity, count, indexed segment size
+_SLOT = struct.Struct("<16sQIB3x")  # key, payload offset, payload length, codec
+_RECORD = struct.Struct("<16sIB")  # key, payload length, codec
+_COUNT = struct.Struct("<I")
+_EMPTY_KEY = bytes(KEY_SIZE)
+_BIG_ENDIAN = sys.byteorder == "big"
+
+
+def _key(video_id: str) -> bytes:
+    key = video_id.encode("utf-8")
+    if not key or len(key) > KEY_SIZE:
+        raise ValueError(f"Video ID must be 1-{KEY_SIZE} bytes: {video_id!r}")
+    return key.ljust(KEY_SIZE, b"\x00")
+
+
+def _little_endian(values: array) -> bytes:
+    if _BIG_ENDIAN:  # pragma: no cover - platform dependent
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, raw: memoryview) -> array:
+    values = array(typecode)
+    values.frombytes(raw)
+    if _BIG_ENDIAN:  # pragma: no cover - platform dependent
+        values.byteswap()
+    return values
+
+
+def encode_transcript(transcript: TimedTranscript) -> bytes:
+    """Serialise a transcript into the uncompressed payload format."""
+    count = len(transcript.lines)
+    texts = [line.encode("utf-8") for line in transcript.lines]
+    starts = (
+        transcript.starts
+        if len(transcript.starts) == count
+        else array("d", bytes(8 * count))
+    )
+    durations = (
+        transcript.durations
+        if len(transcript.durations) == count
+        else array("d", bytes(8 * count))
+    )
+    return b"".join(
+        [
+            _COUNT.pack(count),
+            _little_endian(array("d", starts)),
+            _little_endian(array("d", durations)),
+            _little_endian(array("I", [len(text) for text in texts])),
+            *texts,
+        ]
+    )
+
+
+def decode_transcript(video_id: str, payload: bytes) -> TimedTranscript:
+    """Rebuild a transcript from an uncompressed payload."""
+    view = memoryview(payload)
+    (count,) = _COUNT.unpack_from(view)
+    position = _COUNT.size
+    starts = _from_little_endian("d", view[position : position + 8 * count])
+    position += 8 * count
+    durations = _from_little_endian("d", view[position : position + 8 * count])
+    position += 8 * count
+    lengths = _from_little_endian("I", view[position : position + 4 * count])
+    position += 4 * count
+    lines = []
+    for length in lengths:
+        lines.append(str(view[position : position + length], "utf-8"))
+        position += length
+    return TimedTranscript(video_id, lines, starts, durations)
+
+
+def _compress(payload: bytes, codec: str) -> bytes:
+    if codec == CODEC_LZMA:
+        return lzma.compress(payload, preset=6)
+    return zlib.compress(payload, 6)
+
+
+def _decompress(blob: bytes, codec_id: int) -> bytes:
+    if _CODEC_NAMES.get(codec_id) == CODEC_LZMA:
+        return lzma.decompress(blob)
+    return zlib.decompress(blob)
+
+
+class TranscriptStore:
+    """Append-only transcript segment with a memory-mapped hash index.
+
+    Args:
+        directory: Directory holding the segment and index files; it is
+            created if needed.
+        codec: ``"zlib"`` (fast) or ``"lzma"`` (smaller) for new records.
+            Records written with either codec can always be read.
+    """
+
+    def __init__(self, directory: Union[str, Path], codec: str = CODEC_ZLIB) -> None:
+        if codec not in _CODEC_IDS:
+            raise ValueError(f"Unknown transcript codec {codec!r}")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.codec = codec
+        self.segment_path = self.directory / SEGMENT_FILE
+        self.index_path = self.directory / INDEX_FILE
+        self._lock = threading.RLock()
+        self._segment = open(self.segment_path, "a+b")
+        self._index_file: Optional[BinaryIO] = None
+        self._index: Optional[mmap.mmap] = None
+        self._capacity = 0
+        self._count = 0
+        self._indexed = 0
+        if not self._open_index():
+            self.rebuild_index()
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+    def _open_index(self) -> bool:
+        """Map an existing index; return ``False`` if it must be rebuilt."""
+        if (
+            not self.index_path.exists()
+            or self.index_path.stat().st_size < _HEADER.size
+        ):
+            return False
+        self._map_index()
+        magic, capacity, count, indexed = _HEADER.unpack_from(self._require_index())
+        valid = (
+            magic == _MAGIC
+            and capacity > 0
+            and capacity & (capacity - 1) == 0
+            and len(self._require_index()) == _HEADER.size + capacity * _SLOT.size
+            and indexed <= self._segment_size()
+        )
+        if not valid:
+            logger.warning(
+                "Transcript index %s does not match the segment; rebuilding it",
+                self.index_path,
+            )
+            self._close_index()
+            return False
+        self._capacity, self._count, self._indexed = capacity, count, indexed
+        # The segment is written before the index, so the index may lag behind
+        if indexed < self._segment_size():
+            self._index_records(indexed)
+        return True
+
+    def _map_index(self) -> None:
+        index_file = open(self.index_path, "r+b")
+        self._index_file = index_file
+        self._index = mmap.mmap(index_file.fileno(), 0)
+
+    def _require_index(self) -> mmap.mmap:
+        """Return the mapped index; it is only unmapped while being replaced."""
+        if self._index is None:
+            raise ValueError(f"Transcript index {self.index_path} is not open")
+        return self._index
+
+    def _close_index(self) -> None:
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+        if self._index_file is not None:
+            self._index_file.close()
+            self._index_file = None
+
+    def _create_index(self, capacity: int) -> None:
+        """Replace the index file with an empty table of ``capacity`` slots."""
+        self._close_index()
+        tmp_path = self.index_path.with_suffix(".idx.tmp")
+        with open(tmp_path, "wb") as fh:
+            fh.write(_HEADER.pack(_MAGIC, capacity, 0, 0))
+            fh.truncate(_HEADER.size + capacity * _SLOT.size)
+        os.replace(tmp_path, self.index_path)
+        self._map_index()
+        self._capacity, self._count, self._indexed = capacity, 0, 0
+
+    def _slot_position(self, slot: int) -> int:
+        return _HEADER.size + slot * _SLOT.size
+
+    def _probe(self, key: bytes) -> Tuple[int, bool]:
+        """Return the slot holding ``key``, or the empty slot it would take."""
+        index = self._require_index()
+        mask = self._capacity - 1
+        slot = zlib.crc32(key) & mask
+        while True:
+            stored = index[
+                self._slot_position(slot) : self._slot_position(slot) + KEY_SIZE
+            ]
+            if stored == key:
+                return slot, True
+            if stored == _EMPTY_KEY:
+                return slot, False
+            slot = (slot + 1) & mask
+
+    def _slots(self) -> Iterator[Tuple[bytes, int, int, int]]:
+        index = self._require_index()
+        for slot in range(self._capacity):
+            key, offset, length, codec_id = _SLOT.unpack_from(
+                index, self._slot_position(slot)
+            )
+            if key != _EMPTY_KEY:
+                yield key, offset, length, codec_id
+
+    def _insert(self, key: bytes, offset: int, length: int, codec_id: int) -> None:
+        if (self._count + 1) > self._capacity * MAX_LOAD:
+            self._grow()
+        slot, found = self._probe(key)
+        index = self._require_index()
+        _SLOT.pack_into(index, self._slot_position(slot), key, offset, length, codec_id)
+        if not found:
+            self._count += 1
+        self._indexed = max(self._indexed, offset + length)
+        _HEADER.pack_into(index, 0, _MAGIC, self._capacity, self._count, self._indexed)
+
+    def _grow(self) -> None:
+        entries = list(self._slots())
+        self._create_index(max(INITIAL_CAPACITY, self._capacity * 2))
+        for entry in entries:
+            self._insert(*entry)
+
+    def _index_records(self, start: int) -> None:
+        """Index the records from ``start`` on, cutting off a torn last record."""
+        end = start
+        for key, offset, length, codec_id in self._records(start):
+            self._insert(key, offset, length, codec_id)
+            end = offset + length
+        if end < self._segment_size():
+            logger.warning(
+                "Truncating incomplete record at the end of %s", self.segment_path
+            )
+            self._segment.truncate(end)
+        self._indexed = end
+        _HEADER.pack_into(
+            self._require_index(), 0, _MAGIC, self._capacity, self._count, self._indexed
+        )
+
+    def rebuild_index(self) -> None:
+        """Recreate the index by scanning the whole segment."""
+        with self._lock:
+            self._create_index(INITIAL_CAPACITY)
+            self._index_records(0)
+            self._require_index().flush()
+            logger.info("Rebuilt transcript index with %d entries", self._count)
+
+    # ------------------------------------------------------------------
+    # Segment
+    # ------------------------------------------------------------------
+    def _segment_size(self) -> int:
+        return os.fstat(self._segment.fileno()).st_size
+
+    def _records(self, start: int = 0) -> Iterator[Tuple[bytes, int, int, int]]:
+        """Yield ``(key, payload offset, length, codec)`` of complete records."""
+        size = self._segment_size()
+        with open(self.segment_path, "rb") as fh:
+            fh.seek(start)
+            position = start
+            while position + _RECORD.size <= size:
+                header = fh.read(_RECORD.size)
+                key, length, codec_id = _RECORD.unpack(header)
+                offset = position + _RECORD.size
+                if offset + length > size or codec_id not in _CODEC_NAMES:
+                    return
+                yield key, offset, length, codec_id
+                fh.seek(length, os.SEEK_CUR)
+                position = offset + length
+
+    def _read(self, offset: int, length: int) -> bytes:
+        return os.pread(self._segment.fileno(), length, offset)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, video_id: str) -> bool:
+        with self._lock:
+            return self._probe(_key(video_id))[1]
+
+    def put(self, transcript: TimedTranscript, codec: Optional[str] = None) -> None:
+        """Append ``transcript`` and point its video ID at it."""
+        key = _key(transcript.video_id)
+        codec_id = _CODEC_IDS[codec or self.codec]
+        blob = _compress(encode_transcript(transcript), codec or self.codec)
+        with self._lock:
+            position = self._segment_size()
+            self._segment.write(_RECORD.pack(key, len(blob), codec_id) + blob)
+            # The record must be on disk before the index points at it
+            self._segment.flush()
+            self._insert(key, position + _RECORD.size, len(blob), codec_id)
+
+    def put_lines(self, video_id: str, lines: List[str]) -> None:
+        """Store a transcript without timing information."""
+        self.put(TimedTranscript(video_id, list(lines)))
+
+    def get(self, video_id: str) -> Optional[TimedTranscript]:
+        """Return the stored transcript of ``video_id``, or ``None``."""
+        key = _key(video_id)
+        with self._lock:
+            slot, found = self._probe(key)
+            if not found:
+                return None
+            _, offset, length, codec_id = _SLOT.unpack_from(
+                self._require_index(), self._slot_position(slot)
+            )
+        return decode_transcript(
+            video_id, _decompress(self._read(offset, length), codec_id)
+        )
+
+    def get_lines(self, video_id: str) -> List[str]:
+        """Return the caption lines of ``video_id``; empty if not stored.
+
+        Suitable as the ``fetch`` callable of ``TranscriptIndex.build``.
+        """
+        transcript = self.get(video_id)
+        return transcript.lines if transcript is not None else []
+
+    def iter_transcripts(self) -> Iterator[TimedTranscript]:
+        """Stream every stored transcript in the order it was written.
+
+        Records are read sequentially from the segment, one at a time, and
+        superseded versions of a video are skipped.
+        """
+        with self._lock:
+            self._segment.flush()
+            live = {key: offset for key, offset, _, _ in self._slots()}
+        with open(self.segment_path, "rb") as fh:
+            for key, offset, length, codec_id in self._records():
+                if live.get(key) != offset:
+                    continue
+                fh.seek(offset)
+                video_id = key.rstrip(b"\x00").decode("utf-8")
+                yield decode_transcript(
+                    video_id, _decompress(fh.read(length), codec_id)
+                )
+
+    def flush(self) -> None:
+        """Force the segment and the index to disk."""
+        with self._lock:
+            self._segment.flush()
+            os.fsync(self._segment.fileno())
+            self._require_index().flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._segment.closed:
+                return
+            self.flush()
+            self._close_index()
+            self._segment.close()
+
+    def __enter__(self) -> "TranscriptStore":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def iter_transcripts(directory: Union[str, Path]) -> Iterator[TimedTranscript]:
+    """Stream the transcripts of the store in ``directory``."""
+    with TranscriptStore(directory) as store:
+        yield from store.iter_transcripts()
+
+
+_stores: Dict[Path, TranscriptStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_transcript_store(directory: Union[str, Path]) -> TranscriptStore:
+    """Return the shared :class:`TranscriptStore` for ``directory``."""
+    key = Path(directory).resolve()
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = TranscriptStore(key)
+        return store
+
+
+__all__ = [
+    "CODEC_LZMA",
+    "CODEC_ZLIB",
+    "TranscriptStore",
+    "decode_transcript",
+    "encode_transcript",
+    "get_transcript_store",
+    "iter_transcripts",
+]